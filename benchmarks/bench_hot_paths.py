@@ -0,0 +1,157 @@
+"""
+Benchmarks of the cart, price, discount and shipping hot paths.
+
+Runs against the in-memory datastore (see :mod:`memory_datastore`) with
+synthetic data of configurable size and reports per operation the median
+wall time, the datastore round trips and the allocations.
+
+Usage::
+
+    cd benchmarks
+    python bench_hot_paths.py --articles 1000 --leafs 100 --json baseline.json
+    # ... after changing the shop:
+    python bench_hot_paths.py --articles 1000 --leafs 100 --compare baseline.json
+
+With ``--compare`` the exit code is 1 if any benchmark needs more round
+trips than the baseline or is slower than ``--threshold`` times the baseline.
+"""
+
+import argparse
+import json
+import sys
+import typing as t
+
+from harness import BenchArticleSkel, Fixtures, Result, Sizes, create_fixtures, measure, setup_shop
+from memory_datastore import MemoryDatastore
+from viur.shop import Shop
+from viur.shop.types import CartPricing, DiscountValidationContext, Price
+
+
+def get_benchmarks(shop: Shop, fixtures: Fixtures) -> dict[str, t.Callable[[], t.Any]]:
+    """The operations to measure, by name"""
+    cart = shop.cart
+    sample_article_keys = fixtures.article_keys[:100]
+
+    def read_articles() -> list:
+        skels = []
+        for key in sample_article_keys:
+            skel = BenchArticleSkel()
+            skel.read(key)
+            skels.append(skel)
+        return skels
+
+    def cart_get_children() -> None:
+        for node_key in fixtures.node_keys:
+            list(cart.get_children(node_key))
+
+    def cart_node_totals() -> None:
+        skel = cart.viewSkel("node")
+        skel.read(fixtures.cart_key)
+        skel["total"], skel["vat"], skel["total_discount_price"]  # noqa, computed bones
+
+    def cart_leaf_prices() -> None:
+        for leaf_key in fixtures.leaf_keys:
+            skel = cart.viewSkel("leaf")
+            skel.read(leaf_key)
+            skel["price"]  # noqa, computed bone
+
+    def price_init() -> None:
+        for skel in read_articles():
+            Price(skel).to_dict()
+
+    def cart_prices_to_dict() -> None:
+        tree = cart.get_cart_tree(fixtures.cart_key)
+        for skel in tree.leafs.values():
+            Price(skel).to_dict()
+
+    def cart_prices_batch() -> None:
+        tree = cart.get_cart_tree(fixtures.cart_key)
+        pricing = CartPricing(tree.leafs.values())
+        for key in tree.leafs:
+            pricing.get(key)
+
+    def discount_can_apply() -> None:
+        discount_skels = list(shop.discount.current_automatically_discounts)
+        for article_skel in read_articles()[:20]:
+            for discount_skel in discount_skels:
+                shop.discount.can_apply(
+                    discount_skel, article_skel=article_skel,
+                    context=DiscountValidationContext.AUTOMATICALLY_LIVE,
+                )
+
+    def shipping_for_cart() -> None:
+        shop.shipping.get_shipping_skels_for_cart(cart_key=fixtures.cart_key, use_cache=True)
+
+    return {
+        "cart.get_children": cart_get_children,
+        "TotalFactory (node totals)": cart_node_totals,
+        "get_price_for_leaf": cart_leaf_prices,
+        "Price.__init__": price_init,
+        "Price.to_dict (whole cart)": cart_prices_to_dict,
+        "CartPricing (whole cart)": cart_prices_batch,
+        "Discount.can_apply": discount_can_apply,
+        "Shipping.get_shipping_skels_for_cart": shipping_for_cart,
+    }
+
+
+def compare(results: list[Result], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """Find the regressions against a baseline"""
+    regressions = []
+    for result in results:
+        if (base := baseline.get(result.name)) is None:
+            continue
+        if result.round_trips > base["round_trips"]:
+            regressions.append(f"{result.name}: {result.round_trips} round trips, baseline {base['round_trips']}")
+        if result.wall_time > base["wall_time"] * threshold:
+            regressions.append(f"{result.name}: {result.wall_time * 1000:.2f} ms, "
+                               f"baseline {base['wall_time'] * 1000:.2f} ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=Sizes.articles)
+    parser.add_argument("--discounts", type=int, default=Sizes.discounts)
+    parser.add_argument("--nodes", type=int, default=Sizes.cart_nodes)
+    parser.add_argument("--leafs", type=int, default=Sizes.cart_leafs)
+    parser.add_argument("--seed", type=int, default=Sizes.seed)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--only", action="append", help="Run only these benchmarks (repeatable)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Compare the results with this baseline file")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Maximum wall time factor against the baseline (default: 1.25)")
+    args = parser.parse_args()
+
+    sizes = Sizes(articles=args.articles, discounts=args.discounts, cart_nodes=args.nodes,
+                  cart_leafs=args.leafs, seed=args.seed)
+    store = MemoryDatastore()
+    results = []
+    with store.install():
+        shop = setup_shop()
+        fixtures = create_fixtures(shop, sizes)
+        print(f"{sizes} -> {len(store.entities)} entities")
+        for name, operation in get_benchmarks(shop, fixtures).items():
+            if args.only and name not in args.only:
+                continue
+            results.append(result := measure(name, operation, store, runs=args.runs))
+            print(f"{name:<40} {result.wall_time * 1000:10.2f} ms {result.round_trips:8.0f} round trips "
+                  f"{result.allocated_bytes / 1024:10.1f} KiB peak {result.allocated_blocks:8d} blocks")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"sizes": vars(sizes), "results": [result.as_dict() for result in results]}, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        if baseline["sizes"] != vars(sizes):
+            print(f"Warning: baseline was measured with {baseline['sizes']}", file=sys.stderr)
+        if regressions := compare(results, {r["name"]: r for r in baseline["results"]}, args.threshold):
+            print("Regressions:", *regressions, sep="\n  ", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
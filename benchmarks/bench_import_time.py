@@ -0,0 +1,87 @@
+"""
+Import-time report of ``viur.shop``.
+
+Imports the shop in fresh interpreters with ``python -X importtime`` and
+reports the median cumulative import time of the package, the slowest
+modules and which payment-provider SDKs got imported.  The SDK-backed
+providers are loaded lazily, so a plain ``import viur.shop`` must not
+import any of them.
+
+Usage::
+
+    cd benchmarks
+    python bench_import_time.py --json baseline.json
+    # ... after changing the shop:
+    python bench_import_time.py --compare baseline.json
+
+The exit code is 1 if an SDK was imported or, with ``--compare``, if the
+import is slower than ``--threshold`` times the baseline.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SDK_PACKAGES = ("unzer", "paypalserversdk", "apimatic_core")
+"""Top-level packages of the optional payment-provider SDKs"""
+
+
+def measure_import(module: str) -> dict[str, int]:
+    """Import the module in a fresh interpreter, returns the cumulative time in µs per imported module"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_time, cumulative_time, name = line.removeprefix("import time:").split("|")
+        cumulative[name.strip()] = int(cumulative_time)
+    return cumulative
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="viur.shop")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="Number of the slowest modules to report")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Compare the results with this baseline file")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Maximum import time factor against the baseline (default: 1.25)")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    total = statistics.median(run[args.module] for run in runs)
+    modules = {name: statistics.median(run.get(name, 0) for run in runs) for name in runs[-1]}
+    sdks = sorted(name for name in modules if name.split(".")[0] in SDK_PACKAGES)
+
+    print(f"{args.module:<60} {total / 1000:10.2f} ms (median of {args.runs} runs)")
+    print("\nSlowest modules (cumulative):")
+    for name, duration in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<58} {duration / 1000:10.2f} ms")
+
+    failed = False
+    if sdks:
+        print("\nSDK modules imported:", *sdks, sep="\n  ", file=sys.stderr)
+        failed = True
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"module": args.module, "total": total, "modules": modules, "sdks": sdks}, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        if total > baseline["total"] * args.threshold:
+            print(f"Regression: {total / 1000:.2f} ms against {baseline['total'] / 1000:.2f} ms", file=sys.stderr)
+            failed = True
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
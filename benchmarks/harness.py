@@ -0,0 +1,289 @@
+"""
+Harness for the benchmarks of the shop hot paths.
+
+Sets up a shop instance on top of the :class:`MemoryDatastore`, creates
+synthetic data (catalog, vat rates, discounts, carts) and measures
+operations for wall time, datastore round trips and allocations.
+
+Every measured run is executed in a fresh request context, so request-local
+caches start empty like in a real request; process-wide caches (discounts,
+vat rates) are warmed up by the first run.
+"""
+
+import contextlib
+import dataclasses
+import pathlib
+import random
+import statistics
+import time
+import tracemalloc
+import types
+import typing as t
+
+from viur.core import conf, current, db
+from viur.core.bones import BooleanBone, FileBone, NumericBone, RelationalBone, SelectBone, StringBone, TextBone
+from viur.core.bones.base import setSystemInitialized
+from viur.core.render import vi
+from viur.core.skeleton import Skeleton
+
+from memory_datastore import MemoryDatastore
+from viur.shop import Shop
+from viur.shop.services import Customization, GENERATION_STORE, HOOK_SERVICE, Hook, MemoryGenerationStore
+from viur.shop.skeletons import ArticleAbstractSkel
+from viur.shop.types import (
+    ApplicationDomain,
+    ArticleAvailability,
+    CartType,
+    CodeType,
+    ConditionOperator,
+    DiscountType,
+    VatRateCategory,
+)
+
+# The viur-core accepts skeletons only from its search path, allow this module like the shop allows its skeletons
+_path = str(pathlib.Path(__file__))
+conf.skeleton_search_path.append(
+    _path.replace(str(conf.instance.project_base_path), "").replace(str(conf.instance.core_base_path), "")
+)
+
+
+class BenchArticleSkel(ArticleAbstractSkel, Skeleton):
+    kindName = "bench_article"
+
+    shop_name = StringBone()
+    shop_description = TextBone()
+    shop_price_retail = NumericBone(precision=2)
+    shop_price_recommended = NumericBone(precision=2)
+    shop_availability = SelectBone(values=ArticleAvailability)
+    shop_listed = BooleanBone()
+    shop_image = FileBone()
+    shop_art_no_or_gtin = StringBone()
+    shop_shipping_config = RelationalBone(kind="{{viur_shop_modulename}}_shipping_config")
+    """The placeholder is only replaced in the shop's own skeletons, see :func:`setup_shop`"""
+    shop_is_weee = BooleanBone()
+    shop_is_low_price = BooleanBone()
+
+
+@dataclasses.dataclass(frozen=True)
+class Sizes:
+    """Size of the synthetic data"""
+
+    articles: int = 1_000
+    discounts: int = 50
+    cart_nodes: int = 10
+    cart_leafs: int = 100
+    seed: int = 42
+
+
+@dataclasses.dataclass
+class Fixtures:
+    """Keys of the synthetic data"""
+
+    article_keys: list[db.Key]
+    discount_keys: list[db.Key]
+    cart_key: db.Key
+    node_keys: list[db.Key]
+    leaf_keys: list[db.Key]
+
+
+@dataclasses.dataclass(frozen=True)
+class Result:
+    """Metrics of one benchmark, per operation"""
+
+    name: str
+    runs: int
+    wall_time: float
+    """Median wall time in seconds"""
+    round_trips: float
+    """Median datastore round trips"""
+    allocated_bytes: int
+    """Peak of the traced memory"""
+    allocated_blocks: int
+    """Memory blocks still allocated at the end of the operation"""
+
+    def as_dict(self) -> dict[str, t.Any]:
+        return dataclasses.asdict(self)
+
+
+@contextlib.contextmanager
+def request_context(language: str = "de") -> t.Iterator[dict]:
+    """Simulate a request: fresh request data, no session, no user"""
+    # Just what the viur-core reads from a request; deferred tasks (e.g. updateRelations) are collected, not executed
+    request = types.SimpleNamespace(is_deferred=False, kwargs={}, context={}, template_style=None, pendingTasks=[])
+    tokens = [
+        (current.request, current.request.set(request)),
+        (current.request_data, current.request_data.set({})),
+        (current.language, current.language.set(language)),
+        (current.user, current.user.set(None)),
+    ]
+    try:
+        yield current.request_data.get()
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_country(context: str) -> str:
+    """The site context of the benchmarks, carts without a shipping address are priced for Germany"""
+    return "DE"
+
+
+def setup_shop() -> Shop:
+    """Create and register the shop instances; must be called once, inside an installed datastore"""
+    GENERATION_STORE.set(MemoryGenerationStore())
+    HOOK_SERVICE.register(Customization.from_method(current_country, Hook.CURRENT_COUNTRY, memoize=True))
+    shop_module = Shop(
+        name="benchshop",
+        article_skel=BenchArticleSkel,
+        payment_providers=[],
+        suppliers=[],
+    )
+    # Instantiate it like the viur-core does per renderer, prices are rendered by the vi instance
+    shop = shop_module("shop", "/shop")
+    shop_vi = shop_module("shop", "/vi/shop")
+    shop_vi.render = vi.default(parent=shop_vi)
+    # The article skeleton belongs to the project, so the shop doesn't resolve its kind placeholder
+    BenchArticleSkel.shop_shipping_config.kind = f"{shop.moduleName}_shipping_config"
+    BenchArticleSkel.shop_shipping_config.module = f"{shop.moduleName}/shipping_config"
+    setSystemInitialized()
+    return shop
+
+
+def create_fixtures(shop: Shop, sizes: Sizes) -> Fixtures:
+    """Write the synthetic catalog, vat rates, discounts and one cart"""
+    rnd = random.Random(sizes.seed)
+
+    with request_context():
+        for country, rates in {"DE": (19.0, 7.0), "AT": (20.0, 10.0)}.items():
+            skel = shop.vat_rate.addSkel()
+            skel["country"] = country
+            skel.setBoneValue("configuration", [
+                {"category": VatRateCategory.STANDARD, "percentage": rates[0]},
+                {"category": VatRateCategory.REDUCED, "percentage": rates[1]},
+            ])
+            skel.write()
+
+        article_keys = []
+        for idx in range(sizes.articles):
+            skel = BenchArticleSkel()
+            retail = rnd.randrange(100, 100_000) / 100
+            skel["shop_name"] = f"Article {idx}"
+            skel["shop_price_retail"] = retail
+            skel["shop_price_recommended"] = retail if rnd.random() < 0.8 else round(retail * 1.2, 2)
+            skel["shop_availability"] = ArticleAvailability.IN_STOCK
+            skel["shop_listed"] = True
+            skel["shop_art_no_or_gtin"] = f"{idx:013d}"
+            skel["shop_vat_rate_category"] = rnd.choice((VatRateCategory.STANDARD, VatRateCategory.REDUCED))
+            skel["shop_is_low_price"] = skel["shop_price_retail"] != skel["shop_price_recommended"]
+            article_keys.append(skel.write()["key"])
+
+        discount_keys = []
+        for idx in range(sizes.discounts):
+            condition_skel = shop.discount_condition.addSkel()
+            condition_skel["name"] = f"Condition {idx}"
+            condition_skel["code_type"] = CodeType.NONE
+            condition_skel["application_domain"] = ApplicationDomain.ARTICLE
+            condition_skel["scope_combinable_other_discount"] = True
+            if idx % 2:  # every second discount is restricted to a few articles
+                condition_skel.setBoneValue("scope_article", rnd.sample(article_keys, 3))
+            condition_skel.write()
+
+            skel = shop.discount.addSkel()
+            skel["name"] = f"Discount {idx}"
+            skel["discount_type"] = DiscountType.PERCENTAGE
+            skel["percentage"] = float(rnd.randrange(1, 50))
+            skel["condition_operator"] = ConditionOperator.ALL
+            skel["activate_automatically"] = idx % 3 == 0
+            skel.setBoneValue("condition", [condition_skel["key"]])
+            discount_keys.append(skel.write()["key"])
+
+        cart = shop.cart
+        root_skel = cart.addSkel("node")
+        root_skel["name"] = "Benchmark basket"
+        root_skel["cart_type"] = CartType.BASKET
+        root_skel["is_root_node"] = True
+        root_skel.write()
+        root_skel["parentrepo"] = root_skel["key"]
+        root_skel.write()
+
+        node_keys = [root_skel["key"]]
+        for idx in range(sizes.cart_nodes):
+            skel = cart.addSkel("node")
+            skel["name"] = f"Node {idx}"
+            skel["cart_type"] = CartType.BASKET
+            skel["parententry"] = rnd.choice(node_keys)
+            skel["parentrepo"] = root_skel["key"]
+            skel["sortindex"] = float(idx)
+            if discount_keys and rnd.random() < 0.3:
+                skel.setBoneValue("discount", rnd.choice(discount_keys))
+            node_keys.append(skel.write()["key"])
+
+        leaf_keys = []
+        for idx in range(sizes.cart_leafs):
+            article_skel = BenchArticleSkel()
+            article_skel.read(rnd.choice(article_keys))
+            skel = cart.addSkel("leaf")
+            skel.setBoneValue("article", article_skel["key"])
+            cart.copy_article_values(article_skel, skel)
+            skel["quantity"] = rnd.randrange(1, 5)
+            skel["parententry"] = rnd.choice(node_keys)
+            skel["parentrepo"] = root_skel["key"]
+            skel["sortindex"] = float(idx)
+            leaf_keys.append(skel.write()["key"])
+
+    return Fixtures(
+        article_keys=article_keys,
+        discount_keys=discount_keys,
+        cart_key=root_skel["key"],
+        node_keys=node_keys,
+        leaf_keys=leaf_keys,
+    )
+
+
+def measure(
+    name: str,
+    operation: t.Callable[[], t.Any],
+    store: MemoryDatastore,
+    *,
+    runs: int = 5,
+    warmup: int = 1,
+) -> Result:
+    """
+    Measure an operation.
+
+    The wall time and the round trips are the median of *runs* runs;
+    the allocations are measured in an additional run, since tracing
+    the allocations slows down the operation.
+    """
+    for _ in range(warmup):
+        with request_context():
+            operation()
+
+    timings = []
+    round_trips = []
+    for _ in range(runs):
+        with request_context():
+            store.reset_stats()
+            start = time.perf_counter()
+            operation()
+            timings.append(time.perf_counter() - start)
+            round_trips.append(store.round_trips)
+
+    with request_context():
+        tracemalloc.start()
+        try:
+            operation()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+
+    return Result(
+        name=name,
+        runs=runs,
+        wall_time=statistics.median(timings),
+        round_trips=statistics.median(round_trips),
+        allocated_bytes=peak,
+        allocated_blocks=blocks,
+    )
@@ -0,0 +1,244 @@
+"""
+In-memory stand-in for the datastore, used by the benchmarks.
+
+The functions of ``viur.datastore.transport`` which talk to the datastore
+API (``Get``, ``Put``, ``Delete``, ``RunInTransaction``, ``AllocateIDs``,
+``Count`` and ``runSingleFilter``) are replaced by implementations working
+on a dict.  Everything above them -- ``db.Query``, skeletons, the shop
+modules -- runs unchanged, so the benchmarks measure the real code paths.
+
+Every call which would be a request to the datastore API is counted as a
+round trip (see :attr:`MemoryDatastore.stats`).  Like the real transport,
+reads return copies, so mutating a fetched entity doesn't change the store.
+
+Usage::
+
+    store = MemoryDatastore()
+    with store.install():
+        ...  # all db.Get(), db.Put(), queries, ... run against the store
+    print(store.stats)
+"""
+
+import collections
+import contextlib
+import copy
+import itertools
+import typing as t
+
+from viur.datastore import types as db_types
+from viur.datastore.types import Entity, Key, QueryDefinition
+
+PATCHED_MODULES: t.Final[tuple[str, ...]] = (
+    "viur.datastore.transport",
+    "viur.datastore.query",
+    "viur.datastore.utils",
+    "viur.datastore",
+    "viur.core.db",
+)
+"""Modules which hold references to the transport functions"""
+
+GET_BATCH_SIZE: t.Final[int] = 300
+"""Maximum keys per lookup round trip (like the datastore API)"""
+
+QUERY_BATCH_SIZE: t.Final[int] = 300
+"""Maximum entities per query round trip (like the datastore API)"""
+
+_MISSING = object()
+
+
+def _get_property(entity: Entity, name: str) -> t.Any:
+    """Get a (dotted) property, like the datastore resolves embedded entities"""
+    if name == "__key__":
+        return entity.key
+    value = entity
+    for part in name.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _sort_value(value: t.Any) -> tuple:
+    """Order values of different types like the datastore: None first, then by type"""
+    if value is _MISSING or value is None:
+        return 0, ""
+    if isinstance(value, bool):
+        return 1, value
+    if isinstance(value, (int, float)):
+        return 2, value
+    if isinstance(value, Key):
+        return 4, (value.kind, value.id or 0, value.name or "")
+    if isinstance(value, (str, bytes)):
+        return 3, value
+    return 5, str(value)
+
+
+def _matches(value: t.Any, op: str, expected: t.Any) -> bool:
+    if value is _MISSING:
+        return False
+    if isinstance(value, list):  # a list property matches if any of its values matches
+        return any(_matches(single, op, expected) for single in value)
+    if op == "=":
+        return value == expected
+    try:
+        if op == "<":
+            return value < expected
+        if op == "<=":
+            return value <= expected
+        if op == ">":
+            return value > expected
+        if op == ">=":
+            return value >= expected
+    except TypeError:  # different types are never equal or ordered against each other
+        return False
+    raise ValueError(f"Invalid op {op}")
+
+
+class MemoryDatastore:
+    """A dict-based datastore with the interface of ``viur.datastore.transport``"""
+
+    def __init__(self):
+        super().__init__()
+        self.entities: dict[Key, Entity] = {}
+        self.stats: collections.Counter[str] = collections.Counter()
+        self._ids = itertools.count(1)
+
+    @property
+    def round_trips(self) -> int:
+        """Total number of requests to the datastore API"""
+        return sum(self.stats.values())
+
+    def reset_stats(self) -> None:
+        self.stats.clear()
+
+    # --- transport interface --------------------------------------------------
+
+    def Get(self, keys: Key | list[Key]) -> Entity | None | list[Entity | None]:
+        is_multi = not isinstance(keys, Key)
+        key_list = list(keys) if is_multi else [keys]
+        self._log_access(key_list)
+        self.stats["get"] += max(1, -(-len(key_list) // GET_BATCH_SIZE))
+        result = [copy.deepcopy(self.entities.get(key)) for key in key_list]
+        return result if is_multi else result[0]
+
+    def Put(self, entities: Entity | list[Entity]) -> Entity | list[Entity] | None:
+        entity_list = [entities] if isinstance(entities, Entity) else list(entities)
+        for entity in entity_list:
+            if entity.key.is_partial:
+                entity.key = Key(entity.key.kind, next(self._ids), parent=entity.key.parent)
+            self.entities[entity.key] = copy.deepcopy(entity)
+        self._log_access([entity.key for entity in entity_list])
+        if (txn := db_types.currentTransaction.get()) is not None:
+            txn["affectedEntities"].extend(entity_list)
+            return None
+        self.stats["put"] += 1
+        return entities
+
+    def Delete(self, keys: Key | Entity | list[Key | Entity]) -> None:
+        if isinstance(keys, (Key, Entity)):
+            keys = [keys]
+        keys = [key.key if isinstance(key, Entity) else key for key in keys]
+        if not keys:
+            return
+        self._log_access(keys)
+        for key in keys:
+            self.entities.pop(key, None)
+        if db_types.currentTransaction.get() is None:
+            self.stats["delete"] += 1
+
+    def RunInTransaction(self, callback: t.Callable, *args, **kwargs) -> t.Any:
+        allow_overriding = kwargs.pop("__allowOverriding__", None)
+        if db_types.currentTransaction.get() is not None and not allow_overriding:
+            raise RecursionError("Cannot call runInTransaction while inside a transaction!")
+        self.stats["begin_transaction"] += 1
+        # Rolling back means restoring the snapshot -- good enough for benchmarks
+        snapshot = dict(self.entities)
+        token = db_types.currentTransaction.set({
+            "key": f"txn-{next(self._ids)}", "mutations": [], "affectedEntities": [],
+        })
+        try:
+            result = callback(*args, **kwargs)
+        except Exception:
+            self.entities = snapshot
+            self.stats["rollback"] += 1
+            raise
+        finally:
+            db_types.currentTransaction.reset(token)
+        self.stats["commit"] += 1
+        return result
+
+    def AllocateIDs(self, keys: Key | list[Key]) -> Key | list[Key]:
+        self.stats["allocate_ids"] += 1
+        if isinstance(keys, Key):
+            return Key(keys.kind, next(self._ids), parent=keys.parent)
+        return [Key(key.kind, next(self._ids), parent=key.parent) for key in keys]
+
+    def Count(self, kind: str = None, up_to: int = 2 ** 63 - 1, queryDefinition: QueryDefinition = None) -> int:
+        self.stats["count"] += 1
+        if queryDefinition is None:
+            queryDefinition = QueryDefinition(kind, {}, [])
+        return min(len(self._query(queryDefinition)), up_to)
+
+    def runSingleFilter(self, queryDefinition: QueryDefinition, limit: int) -> list[Entity]:
+        offset = int(queryDefinition.startCursor or 0)
+        matches = self._query(queryDefinition)
+        result = matches[offset:offset + limit]
+        self.stats["query"] += max(1, -(-len(result) // QUERY_BATCH_SIZE))
+        # Like the real transport: a cursor is set as long as there may be more results
+        end = offset + len(result)
+        queryDefinition.currentCursor = str(end) if end < len(matches) and result else None
+        self._log_access([entity.key for entity in result])
+        return [copy.deepcopy(entity) for entity in result]
+
+    # --- internals ------------------------------------------------------------
+
+    def _query(self, query: QueryDefinition) -> list[Entity]:
+        filters = [(name.split(" ", 1), value) for name, value in (query.filters or {}).items()]
+        result = []
+        for key, entity in self.entities.items():
+            if query.kind and key.kind != query.kind:
+                continue
+            if all(
+                all(_matches(_get_property(entity, name), op, single)
+                    for single in (expected if isinstance(expected, list) else [expected]))
+                for (name, op), expected in filters
+            ):
+                result.append(entity)
+        for name, order in reversed(query.orders or []):  # stable sort, the first order wins
+            result.sort(key=lambda entity: _sort_value(_get_property(entity, name)),
+                        reverse=order.value in (2, 3))  # Descending or InvertedAscending
+        if query.orders and query.orders[0][1].value > 2:  # Inverted* orders are flipped afterwards
+            result.reverse()
+        if query.distinct:
+            seen = set()
+            distinct_result = []
+            for entity in result:
+                marker = tuple(repr(_get_property(entity, name)) for name in query.distinct)
+                if marker not in seen:
+                    seen.add(marker)
+                    distinct_result.append(entity)
+            result = distinct_result
+        return result
+
+    @staticmethod
+    def _log_access(keys: list[Key]) -> None:
+        if isinstance(access_log := db_types.currentDbAccessLog.get(), set):
+            access_log.update(keys)
+
+    @contextlib.contextmanager
+    def install(self) -> t.Iterator[t.Self]:
+        """Replace the transport functions with this store while the context is active"""
+        import importlib
+
+        originals = []
+        for module_name in PATCHED_MODULES:
+            module = importlib.import_module(module_name)
+            for name in ("Get", "Put", "Delete", "RunInTransaction", "AllocateIDs", "Count", "runSingleFilter"):
+                if hasattr(module, name):
+                    originals.append((module, name, getattr(module, name)))
+                    setattr(module, name, getattr(self, name))
+        try:
+            yield self
+        finally:
+            for module, name, original in reversed(originals):
+                setattr(module, name, original)
@@ -0,0 +1,108 @@
+"""
+Benchmark of the float and the exact (integer cents) money mode.
+
+Computes the price values of every leaf (current, net, vat) and the total
+and vat sum of large synthetic carts with the arithmetic of
+:class:`viur.shop.types.Price` (float mode) and of
+:mod:`viur.shop.types.money` (exact mode) and reports the runtime and the
+number of carts whose totals differ between both modes.
+
+Usage::
+
+    python benchmarks/money_mode.py [--carts 200] [--leafs 500] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from viur import toolkit
+from viur.shop.types import Price, money
+from viur.shop.types.enums import DiscountType
+from viur.shop.types.money import PRICE_PRECISION
+
+VAT_RATES = (0.0, 0.055, 0.07, 0.19)
+
+
+def make_carts(carts: int, leafs: int, seed: int = 42) -> list[list[tuple]]:
+    """Create carts of (retail, quantity, vat rate, discount) tuples"""
+    rnd = random.Random(seed)
+    discounts = [
+        None,
+        {"discount_type": DiscountType.PERCENTAGE, "percentage": 10.0},
+        {"discount_type": DiscountType.PERCENTAGE, "percentage": 33.33},
+        {"discount_type": DiscountType.ABSOLUTE, "absolute": 1.99},
+    ]
+    return [
+        [
+            (
+                rnd.randrange(1, 100_000) / 100,
+                rnd.randrange(1, 10),
+                rnd.choice(VAT_RATES),
+                rnd.choice(discounts),
+            )
+            for _ in range(leafs)
+        ]
+        for _ in range(carts)
+    ]
+
+
+def run_float(cart: list[tuple]) -> tuple[float, float]:
+    total = vat_total = 0
+    for retail, quantity, vat, discount in cart:
+        current = retail
+        if discount is not None:
+            current = toolkit.round_decimal(Price.apply_discount(discount, retail), PRICE_PRECISION)
+        toolkit.round_decimal(Price.gross_to_net(current, vat), PRICE_PRECISION)
+        vat_included = toolkit.round_decimal(Price.gross_to_vat(current, vat), PRICE_PRECISION)
+        total += current * quantity
+        vat_total += vat_included * quantity
+    return round(total, PRICE_PRECISION), round(vat_total, PRICE_PRECISION)
+
+
+def run_exact(cart: list[tuple]) -> tuple[float, float]:
+    total = vat_total = 0
+    for retail, quantity, vat, discount in cart:
+        current = money.to_cents(retail)
+        if discount is not None:
+            current = money.apply_discount(discount, current)
+        money.gross_to_net(current, vat)
+        vat_included = money.gross_to_vat(current, vat)
+        total += current * quantity
+        vat_total += vat_included * quantity
+    return money.from_cents(total), money.from_cents(vat_total)
+
+
+def measure(func, carts: list[list[tuple]], repeat: int) -> tuple[float, list]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(cart) for cart in carts]
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carts", type=int, default=200)
+    parser.add_argument("--leafs", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    carts = make_carts(args.carts, args.leafs)
+    float_time, float_results = measure(run_float, carts, args.repeat)
+    exact_time, exact_results = measure(run_exact, carts, args.repeat)
+
+    # Float errors accumulate in the sums; rounding half away from zero differs from round() too
+    differing = sum(1 for float_result, exact_result in zip(float_results, exact_results)
+                    if float_result != exact_result)
+
+    print(f"{args.carts} carts with {args.leafs} leafs, median of {args.repeat} runs")
+    print(f"float mode: {float_time * 1000:10.2f} ms")
+    print(f"exact mode: {exact_time * 1000:10.2f} ms ({float_time / exact_time:.2f}x)")
+    print(f"carts with differing totals: {differing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Equivalence of the batched cart pricing (:class:`CartPricing`) and :meth:`Price.to_dict`.
+
+Runs against the in-memory datastore with the synthetic data of the
+benchmarks (see :mod:`harness`): every leaf of the cart must get a
+byte-identical price dict from the batch and from its own price.
+
+Usage::
+
+    cd benchmarks
+    python -m pytest test_cart_pricing.py
+"""
+
+import typing as t
+
+import pytest
+from viur.core import db, utils
+
+from harness import Fixtures, Sizes, create_fixtures, request_context, setup_shop
+from memory_datastore import MemoryDatastore
+from viur.shop import Shop
+from viur.shop.globals import EXACT_MONEY
+from viur.shop.types import CartPricing, Price
+
+SIZES = Sizes(articles=200, discounts=30, cart_nodes=10, cart_leafs=150)
+
+
+@pytest.fixture(scope="module")
+def shop() -> t.Iterator[Shop]:
+    with MemoryDatastore().install():
+        yield setup_shop()
+
+
+@pytest.fixture(scope="module")
+def fixtures(shop: Shop) -> Fixtures:
+    return create_fixtures(shop, SIZES)
+
+
+def ship_to(shop: Shop, node_key: db.Key, country: str) -> None:
+    """Set a shipping address on a cart node, its leafs get the vat rates of this country"""
+    with request_context():
+        address_skel = shop.address.addSkel()
+        address_skel["country"] = country
+        address_skel.write()
+        node_skel = shop.cart.editSkel("node")
+        assert node_skel.read(node_key)
+        node_skel.setBoneValue("shipping_address", address_skel["key"])
+        node_skel.write()
+
+
+def assert_equivalent(shop: Shop, fixtures: Fixtures) -> None:
+    with request_context():
+        tree = shop.cart.get_cart_tree(fixtures.cart_key)
+        pricing = CartPricing(tree.leafs.values())
+        assert len(pricing) == len(tree.leafs) == SIZES.cart_leafs
+        for leaf_key, leaf_skel in tree.leafs.items():
+            expected = Price(leaf_skel).to_dict()
+            assert utils.json.dumps(pricing.get(leaf_key)) == utils.json.dumps(expected), leaf_key
+            for name, value in expected.items():
+                if name not in ("cart_discounts", "article_discount"):
+                    assert pricing.get_value(leaf_key, name) == value, (leaf_key, name)
+
+
+def test_batch_equals_to_dict(shop: Shop, fixtures: Fixtures) -> None:
+    assert_equivalent(shop, fixtures)
+
+
+def test_batch_equals_to_dict_with_shipping_countries(shop: Shop, fixtures: Fixtures) -> None:
+    ship_to(shop, fixtures.node_keys[0], "DE")
+    ship_to(shop, fixtures.node_keys[1], "AT")
+    assert_equivalent(shop, fixtures)
+
+
+def test_batch_uses_cart_discounts(shop: Shop, fixtures: Fixtures) -> None:
+    """The fixtures must cover leafs below discounted nodes, otherwise the tests above prove little"""
+    with request_context():
+        tree = shop.cart.get_cart_tree(fixtures.cart_key)
+        pricing = CartPricing(tree.leafs.values())
+        prices = [pricing.get(leaf_key) for leaf_key in tree.leafs]
+    assert any(price["cart_discounts"] for price in prices)
+    assert any(price["current"] != price["retail"] for price in prices)
+
+
+def test_exact_money_is_not_batched(shop: Shop, fixtures: Fixtures) -> None:
+    EXACT_MONEY.set(True)
+    try:
+        with request_context():
+            tree = shop.cart.get_cart_tree(fixtures.cart_key)
+            pricing = CartPricing(tree.leafs.values())
+            assert len(pricing) == 0
+            assert all(pricing.get(leaf_key) is None for leaf_key in tree.leafs)
+    finally:
+        EXACT_MONEY.set(False)
@@ -19,6 +19,8 @@ Components included:
     Only a single shop instance per project is currently supported.
 """
 
+import typing as _t
+
 from .types_global import *
 from .globals import *
 from .modules import *
@@ -26,3 +28,11 @@ from .payment_providers import *
 from .shop import Shop
 from .skeletons import *
 from .types import *
+
+
+def __getattr__(name: str) -> _t.Any:
+    # The SDK-backed payment providers are not star-imported, they're loaded on first access
+    from . import payment_providers
+    if name in payment_providers._LAZY_PROVIDERS:
+        return getattr(payment_providers, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -25,5 +25,8 @@ SENTINEL: t.Final[Sentinel] = Sentinel()
 DEBUG_DISCOUNTS: GlobalVar[bool] = GlobalVar("DEBUG_DISCOUNTS", default=False)
 """Print detailed discount evaluation for debugging"""
 
+EXACT_MONEY: GlobalVar[bool] = GlobalVar("EXACT_MONEY", default=False)
+"""Compute prices and totals exactly in integer minor units (see :mod:`viur.shop.types.money`)"""
+
 MAX_FETCH_LIMIT: int = 100
 """Limit used if all entries should be fetched, but it needs to be limited because it's ViUR."""
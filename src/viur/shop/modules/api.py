@@ -1,14 +1,16 @@
+import json
 import typing as t  # noqa
 
 from google.protobuf.message import DecodeError
 
 import viur.shop.types.exceptions as e
-from viur.core import current, db, errors, exposed, force_post
+from viur.core import access, current, db, errors, exposed, force_post
 from viur.core.render.json.default import DefaultRender as JsonRenderer
 from viur.shop.modules.abstract import ShopModuleAbstract
 from viur.shop.skeletons import ShippingSkel
 from viur.shop.types import *
 from ..globals import SENTINEL, SHOP_INSTANCE_VI, SHOP_LOGGER
+from ..services import METRICS_SINK, MemoryMetricsSink
 
 if t.TYPE_CHECKING:
     from viur.shop import SkeletonInstance_T
@@ -130,6 +132,51 @@ class Api(ShopModuleAbstract):
             **kwargs,
         )
 
+    @exposed
+    @force_post
+    def articles_bulk_update(
+        self,
+        *,
+        operations: str | list[dict],
+    ):
+        """Add, update and remove many articles at once
+
+        All operations are applied in one transaction -- all or none.
+
+        :param operations: List (or its JSON string) of operations, each an object
+            with the parameters of :meth:`article_add`: ``article_key``,
+            ``quantity``, ``quantity_mode`` (optional), ``parent_cart_key``
+            (use "BASKET" for the basket of the current session) and
+            optional additional values.
+        :return: The leafs in the order of the operations, ``null`` for removed leafs.
+        """
+        if isinstance(operations, str):
+            try:
+                operations = json.loads(operations)
+            except ValueError:
+                raise InvalidArgumentException("operations", operations)
+        if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+            raise InvalidArgumentException("operations", operations)
+        basket_key = None
+        normalized = []
+        for operation in operations:
+            operation = dict(operation)
+            if operation.get("parent_cart_key") == "BASKET":
+                if basket_key is None:
+                    basket_key = self.shop.cart.get_current_session_cart_key(create_if_missing=True)
+                operation["parent_cart_key"] = basket_key
+            operation["article_key"] = self._normalize_external_key(
+                operation.get("article_key"), "article_key")
+            operation["parent_cart_key"] = self._normalize_external_key(
+                operation.get("parent_cart_key"), "parent_cart_key")
+            try:
+                operation["quantity"] = int(operation["quantity"])
+                operation["quantity_mode"] = QuantityMode(operation.get("quantity_mode", QuantityMode.REPLACE))
+            except (KeyError, TypeError, ValueError):
+                raise InvalidArgumentException("operations", operation)
+            normalized.append(operation)
+        return JsonResponse(self.shop.cart.articles_bulk_update(normalized))
+
     @exposed
     @force_post
     def article_move(
@@ -311,6 +358,8 @@ class Api(ShopModuleAbstract):
         cart_key = self.shop.cart.get_current_session_cart_key(create_if_missing=create_if_missing)
         if cart_key is None:
             raise errors.PreconditionFailed("No basket created yet for this session")
+        if self._is_cart_not_modified(cart_key):
+            return ""
         return JsonResponse(self.shop.cart.cart_get(
             cart_key=cart_key, skel_type="node",
         ))
@@ -334,19 +383,24 @@ class Api(ShopModuleAbstract):
             return JsonResponse(self.shop.cart.getAvailableRootNodes())
         # key provided: list children (nodes and leafs)
         cart_key = self._normalize_external_key(cart_key, "cart_key")
+        if self._is_cart_not_modified(cart_key):
+            return ""
+        cart = self.shop.cart
+        if (rendered := cart.get_frozen_render(cart_key, "children")) is not None:
+            return RenderedJsonResponse(rendered)
+        # The computed bones of the children load the tree anyway, render them from it
+        if (tree := cart.get_cart_tree(cart_key)) is None or (node_skel := tree.get_node(cart_key)) is None:
+            return JsonResponse([])
+        if (rendered := cart.get_frozen_render(cart_key, "children", node_skel=node_skel)) is not None:
+            return RenderedJsonResponse(rendered)
         children = []
-        for child_skel in self.shop.cart.get_children(cart_key):
-            assert issubclass(child_skel.skeletonCls, (self.shop.cart.nodeSkelCls, self.shop.cart.leafSkelCls))
+        for child_skel in tree.get_children(cart_key):
             child = self.json_renderer.renderSkelValues(child_skel)
-            # if issubclass(child_skel.skeletonCls, self.shop.cart.leafSkelCls):
-            #     logger.debug(f'{child_skel = }')
-            #     logger.debug(f'{child_skel["price"] = }')
-            #     logger.debug(f'{child_skel.price = }')
-            #     logger.debug(f'{child_skel.price.compute = }')
-            #     logger.debug(f'{child_skel.accessedValues = }')
-            child["skel_type"] = "leaf" if issubclass(child_skel.skeletonCls, self.shop.cart.leafSkelCls) else "node"
+            child["skel_type"] = "node" if child_skel["key"] in tree.nodes else "leaf"
             children.append(child)
-        return JsonResponse(children)
+        rendered = JsonResponse(children).dumps()
+        cart.set_frozen_render(cart_key, "children", rendered, node_skel=node_skel)
+        return RenderedJsonResponse(rendered)
 
     @exposed
     def cart_view(
@@ -358,9 +412,78 @@ class Api(ShopModuleAbstract):
         See also :meth:`basket_view` to view the current basket.
         """
         cart_key = self._normalize_external_key(cart_key, "cart_key")
-        return JsonResponse(self.shop.cart.cart_get(
-            cart_key=cart_key, skel_type="node",
-        ))
+        if (rendered := self.shop.cart.get_frozen_render(cart_key, "node")) is not None:
+            return RenderedJsonResponse(rendered)
+        if (skel := self.shop.cart.cart_get(cart_key=cart_key, skel_type="node")) is None:
+            return JsonResponse(skel)
+        if (rendered := self.shop.cart.get_frozen_render(cart_key, "node", node_skel=skel)) is not None:
+            return RenderedJsonResponse(rendered)
+        rendered = JsonResponse(skel).dumps()
+        self.shop.cart.set_frozen_render(cart_key, "node", rendered, node_skel=skel)
+        return RenderedJsonResponse(rendered)
+
+    @exposed
+    def basket_tree(
+        self,
+    ):
+        """View the basket (the cart stored in the session) with all its sub-carts and articles nested
+
+        :raises errors.PreconditionFailed: If no basket created yet for this session
+
+        See also :meth:`cart_tree` to view any cart.
+        """
+        if (cart_key := self.shop.cart.current_session_cart_key) is None:
+            raise errors.PreconditionFailed("No basket created yet for this session")
+        return self.cart_tree(cart_key=cart_key)
+
+    @exposed
+    def cart_tree(
+        self,
+        cart_key: str | db.Key,
+    ):
+        """
+        View a cart with all its sub-carts and articles nested in one document
+
+        The tree is loaded at once (see :meth:`Cart.get_cart_tree`), so the
+        totals, prices and shippings of all entries are computed with the
+        same request-local caches.  Each node and leaf is rendered like in
+        :meth:`cart_list` (with its ``skel_type``), the nodes have their
+        rendered ``children`` in addition.
+
+        :param cart_key: Key of the (sub-)cart to view.
+        :raises errors.NotFound: If the cart doesn't exist or is not viewable.
+        """
+        cart_key = self._normalize_external_key(cart_key, "cart_key")
+        if self._is_cart_not_modified(cart_key):
+            return ""
+        if (rendered := self.shop.cart.get_frozen_render(cart_key, "tree")) is not None:
+            return RenderedJsonResponse(rendered)
+        if (skel := self.shop.cart.cart_get(cart_key=cart_key, skel_type="node")) is None:
+            raise errors.NotFound("Cart not found")
+        if (rendered := self.shop.cart.get_frozen_render(cart_key, "tree", node_skel=skel)) is not None:
+            return RenderedJsonResponse(rendered)
+        if (tree := self.shop.cart.get_cart_tree(cart_key)) is None:
+            raise errors.NotFound("Cart not found")
+        rendered = JsonResponse(self._render_cart_tree(tree, cart_key)).dumps()
+        self.shop.cart.set_frozen_render(cart_key, "tree", rendered, node_skel=skel)
+        return RenderedJsonResponse(rendered)
+
+    def _render_cart_tree(
+        self,
+        tree: CartTree,
+        node_key: db.Key,
+    ) -> dict[str, t.Any]:
+        node = self.json_renderer.renderSkelValues(tree.get_node(node_key))
+        node["skel_type"] = "node"
+        node["children"] = []
+        for child_skel in tree.get_children(node_key):
+            if child_skel["key"] in tree.leafs:
+                child = self.json_renderer.renderSkelValues(child_skel)
+                child["skel_type"] = "leaf"
+            else:
+                child = self._render_cart_tree(tree, child_skel["key"])
+            node["children"].append(child)
+        return node
 
     @exposed
     @force_post
@@ -529,8 +652,49 @@ class Api(ShopModuleAbstract):
         cart_key = self._normalize_external_key(cart_key, "cart_key")
         return JsonResponse(self.shop.shipping.get_shipping_skels_for_cart(cart_key=cart_key))
 
+    # --- Debugging -----------------------------------------------------------
+
+    @exposed
+    @access("root")
+    def event_metrics(
+        self,
+    ) -> JsonResponse[list[dict[str, t.Any]]]:
+        """Get the call metrics of the event observers, aggregated by this instance
+
+        Durations are in seconds, the most time-consuming observers first.
+        See :mod:`viur.shop.services.metrics`.
+
+        :raises errors.NotImplemented: If the metrics sink in use doesn't aggregate in memory.
+        """
+        if not isinstance(sink := METRICS_SINK.get(), MemoryMetricsSink):
+            raise errors.NotImplemented(f"The metrics sink {sink!r} doesn't aggregate in memory")
+        return JsonResponse([metrics.as_dict() for metrics in sink.get_metrics()])
+
     # --- Internal helpers  ----------------------------------------------------
 
+    def _is_cart_not_modified(self, cart_key: db.Key) -> bool:
+        """
+        Set the ETag of a cart and check whether the client has this version already.
+
+        If the ``If-None-Match`` header of the request matches the ETag,
+        the response status is set to ``304 Not Modified``.
+
+        See :attr:`Cart.cart_versions`.
+        """
+        if (etag := self.shop.cart.get_cart_etag(cart_key)) is None:
+            return False
+        request = current.request.get()
+        request.response.headers["ETag"] = etag
+        # Weak comparison, as the ETags are weak
+        if_none_match = {
+            tag.strip().removeprefix("W/")
+            for tag in request.request.headers.get("If-None-Match", "").split(",")
+        }
+        if etag.removeprefix("W/") not in if_none_match and "*" not in if_none_match:
+            return False
+        request.response.status = "304 Not Modified"
+        return True
+
     def _normalize_external_key(
         self,
         external_key: str,
@@ -1,9 +1,17 @@
+import collections
+import datetime
+import functools
+import hashlib
+import threading
+import time
 import typing as t  # noqa
 
+import cachetools
+
 import viur.shop.types.exceptions as e
 from viur import toolkit
-from viur.core import conf, current, db, errors, exposed, translate
-from viur.core.bones import BaseBone, RelationalConsistency
+from viur.core import conf, current, db, errors, exposed, tasks, translate, utils
+from viur.core.bones import BaseBone, RelationalBone, RelationalConsistency
 from viur.core.prototypes import Tree
 from viur.core.prototypes.tree import SkelType
 from viur.core.session import Session
@@ -11,13 +19,22 @@ from viur.core.skeleton import Skeleton, SkeletonInstance
 from viur.shop.modules.abstract import ShopModuleAbstract
 from viur.shop.types import *
 from ..globals import MAX_FETCH_LIMIT, SENTINEL, SHOP_INSTANCE, SHOP_LOGGER
-from ..services import EVENT_SERVICE, Event
+from ..services import EVENT_SERVICE, GENERATION_STORE, Event
 from ..skeletons.article import ArticleAbstractSkel
 from ..skeletons.cart import CartItemSkel, CartNodeSkel
 from ..types.response import make_json_dumpable
 
 logger = SHOP_LOGGER.getChild(__name__)
 
+lock_article_lru = threading.Lock()
+"""Lock to make the article LRU cache thread-safe"""
+
+lock_frozen_render_cache = threading.Lock()
+"""Lock to make the render cache of frozen carts thread-safe"""
+
+FrozenRenderView = t.Literal["node", "children", "tree"]
+"""The rendered views of a frozen cart: the node itself, its direct children or the entire nested subtree"""
+
 if conf.version >= (3, 8, 16):
     from viur.core.skeleton.utils import without_render_preparation
 else:
@@ -29,6 +46,113 @@ class Cart(ShopModuleAbstract, Tree):
     nodeSkelCls = CartNodeSkel
     leafSkelCls = CartItemSkel
 
+    materialize_totals: bool = False
+    """Store the aggregated values (totals, vat, shipping, ...) on each cart node.
+
+    Instead of recomputing the entire subtree on each read of a node, the
+    aggregates are recomputed on each mutation of the cart and stored in
+    ``materialized_values`` (see :meth:`refresh_materialized_values`).
+    A node read becomes then a single entity read.
+
+    Changes outside the cart (article prices, discounts, shippings, vat
+    rates, ...) are not propagated; the values become live computed again
+    after :attr:`materialized_totals_max_age`."""
+
+    materialized_totals_max_age: datetime.timedelta | None = datetime.timedelta(hours=1)
+    """Maximum age of materialized values, older values are ignored. ``None`` means unlimited."""
+
+    batch_pricing: bool = False
+    """Compute the prices of all leafs of a loaded cart tree in one batch (see :class:`CartPricing`).
+
+    The batch is used for the ``price`` of the leafs and for the values the
+    totals and vat of the nodes take from the leafs.  It is only built for
+    carts whose tree is loaded anyway, single leafs are priced one by one."""
+
+    verify_batch_pricing: bool = False
+    """Compare each batch with :meth:`Price.to_dict` and log the differences.
+
+    This is a debugging aid, it computes every price twice."""
+
+    article_lru_maxsize: int = 0
+    """Size of a process-wide LRU cache of the article skeletons used by carts, ``0`` disables it.
+
+    The entries are keyed by article key and ``changedate``, so changed
+    articles are never served from it.  It saves the unserialization of
+    the articles, not the datastore round trip (see :meth:`prefetch_articles`).
+    The cached skeletons are shared across requests, so enable it only if
+    the article skeleton has no request-dependent computed bones."""
+
+    leaf_lookup_by_query: bool = True
+    """Look up the leaf of an article in a cart node also by a query.
+
+    Leafs are stored under a deterministic key (see :meth:`get_leaf_key`),
+    so adding or updating an article is a single keyed read and write in a
+    transaction.  Leafs written before have random ids and are only found
+    by a query, which runs if there's no leaf under the deterministic key
+    (so on each add of a new article) -- disable this, once no such leafs
+    are changed anymore."""
+
+    bulk_update_max_operations: int = 100
+    """Maximum number of operations of one :meth:`articles_bulk_update`, they are written in one transaction."""
+
+    subtree_delete_chunk_size: int = 100
+    """Number of cart entries deleted per deferred task when removing or clearing a cart."""
+
+    subtree_delete_defer_threshold: int | None = 200
+    """Removing or clearing more cart entries than this is done in deferred tasks, ``None`` never defers.
+
+    The request returns immediately; the entries disappear once the tasks
+    are done, the removed node itself at last."""
+
+    freeze_transaction_chunk_size: int | None = 50
+    """Number of cart entries written per transaction when freezing a cart, ``None`` writes each on its own.
+
+    Each entry costs some mutations (the entry and its relations); a
+    transaction allows up to 500 of them."""
+
+    cart_versions: bool = True
+    """Count the mutations of each cart and expose the version as ``ETag`` in the API.
+
+    Every mutation through this module (articles, sub carts, discounts,
+    shipping, ...) bumps a counter of the root node in the
+    :data:`GENERATION_STORE`.  A poll of an unchanged cart with
+    ``If-None-Match`` is answered with ``304 Not Modified`` after reading
+    only this counter.  Changes outside the cart (article prices, discounts,
+    vat rates) don't bump it, see :attr:`cart_etag_max_age`."""
+
+    cart_etag_max_age: datetime.timedelta | None = datetime.timedelta(minutes=5)
+    """Maximum time an ETag stays valid, so changes outside the cart become visible too. ``None`` means unlimited."""
+
+    frozen_render_cache_maxsize: int = 256
+    """Number of rendered frozen carts kept in the process, ``0`` disables the render cache.
+
+    A frozen cart doesn't change anymore, so the JSON of ``cart_view``,
+    ``cart_list`` and ``cart_tree`` is rendered once and served from this cache afterwards,
+    without reading or computing any cart skeleton."""
+
+    frozen_render_cache_ttl: datetime.timedelta = datetime.timedelta(minutes=10)
+    """Maximum age of a rendered frozen cart in the process.
+
+    Edits in the admin invalidate the cache of the instance which handled
+    them (and the persistent tier); other instances notice the change after this time."""
+
+    frozen_render_cache_persistent: bool = True
+    """Keep the rendered frozen carts also in the datastore, shared by all instances."""
+
+    frozen_render_cache_kind: str = "viur-shop-frozen-render"
+    """Kind of the persistent tier of the render cache."""
+
+    session_guest_carts: bool = False
+    """Keep the basket of anonymous visitors in the session instead of the datastore.
+
+    The guest cart is a compact list of article keys and quantities in the
+    session.  It is addressed by a virtual root node key, so viewing and
+    listing the basket and adding, updating and removing articles work as
+    before -- but without writing any cart entity.  Any other change of the
+    cart (sub carts, discounts, shippings, ...), :meth:`Order.order_add`
+    and the login of the visitor materialize it into cart nodes and leafs
+    (see :meth:`materialize_guest_cart`)."""
+
     def adminInfo(self) -> dict:
         admin_info = super().adminInfo()
         admin_info["icon"] = "cart3"
@@ -59,7 +183,27 @@ class Cart(ShopModuleAbstract, Tree):
         else:
             assert skelType == "node"
             nearest_node_key = skel["key"]
-        return self.is_valid_node(nearest_node_key)
+        if self.is_valid_node(nearest_node_key):
+            return True
+        # The cart of an order is detached from the session on checkout start,
+        # but stays viewable for everyone who may view the order.
+        return self.is_viewable_order_cart(self._get_root_key(skel))
+
+    def onAdded(self, skelType: SkelType, skel: SkeletonInstance) -> None:
+        super().onAdded(skelType, skel)
+        self.bump_cart_version(self._get_root_key(skel))
+
+    def onEdited(self, skelType: SkelType, skel: SkeletonInstance) -> None:
+        super().onEdited(skelType, skel)
+        self.bump_cart_version(self._get_root_key(skel))
+        if skel["is_frozen"]:
+            self.clear_frozen_render(self._get_root_key(skel))
+
+    def onDeleted(self, skelType: SkelType, skel: SkeletonInstance) -> None:
+        super().onDeleted(skelType, skel)
+        self.bump_cart_version(self._get_root_key(skel))
+        if skel["is_frozen"]:
+            self.clear_frozen_render(self._get_root_key(skel))
 
     # --- Session -------------------------------------------------------------
 
@@ -69,19 +213,50 @@ class Cart(ShopModuleAbstract, Tree):
 
     def get_current_session_cart_key(self, *, create_if_missing: bool = False) -> db.Key | None:
         if user := current.user.get():
-            user_skel = conf.main_app.vi.user.viewSkel()
-            user_skel.read(user["key"])
-            if user_skel["basket"]:
-                self.session["session_cart_key"] = user_skel["basket"]["dest"]["key"]
-                current.session.get().markChanged()
+            self._sync_session_cart_key(user["key"])
+            if self.session.get("guest_cart") is not None:
+                self._adopt_guest_cart()
+        elif self.session_guest_carts and not self.session.get("session_cart_key"):
+            if (guest_cart := self._get_guest_cart(create_if_missing=create_if_missing)) is None:
+                return None
+            return self._guest_cart_key(guest_cart)
         if create_if_missing:
             self._ensure_current_session_cart()
         return self.session.get("session_cart_key")
 
+    @staticmethod
+    def _basket_generation_name(user_key: db.Key) -> str:
+        return f"basket-{user_key.id_or_name}"
+
+    def _sync_session_cart_key(self, user_key: db.Key) -> None:
+        """
+        Take over the basket of the user into the session.
+
+        The user skeleton is read only if the basket generation of the user
+        (bumped by :meth:`_set_basket`) differs from the one the session
+        has been synced with; the check itself happens once per request.
+        """
+        request_data = current.request_data.get()
+        if request_data.get("shop_basket_synced_user") == user_key:
+            return
+        generation = GENERATION_STORE.get().get(self._basket_generation_name(user_key))
+        stamp = f"{user_key}:{generation}"
+        if self.session.get("basket_generation") != stamp:
+            user_skel = conf.main_app.vi.user.viewSkel()
+            user_skel.read(user_key)
+            if user_skel["basket"]:
+                self.session["session_cart_key"] = user_skel["basket"]["dest"]["key"]
+            self.session["basket_generation"] = stamp
+            current.session.get().markChanged()
+        request_data["shop_basket_synced_user"] = user_key
+
     @property
     def current_session_cart(self) -> SkeletonInstance_T[CartNodeSkel]:  # TODO: Caching
+        cart_key = self.get_current_session_cart_key(create_if_missing=True)
+        if self.is_guest_cart_key(cart_key):
+            return self.get_guest_cart_tree().root_skel
         skel = self.viewSkel("node")
-        if not skel.read(self.get_current_session_cart_key(create_if_missing=True)):
+        if not skel.read(cart_key):
             logger.critical(f"Invalid session_cart_key {self.current_session_cart_key} ?! Not in DB!")
             self.detach_session_cart()
             return self.current_session_cart
@@ -89,6 +264,7 @@ class Cart(ShopModuleAbstract, Tree):
 
     def _ensure_current_session_cart(self) -> db.Key:
         if not self.session.get("session_cart_key"):
+            guest_cart = self.session.pop("guest_cart", None)
             root_node = self.addSkel("node")
             root_node["is_root_node"] = True
             root_node["name"] = root_node.name.getDefaultValue(root_node)
@@ -98,7 +274,10 @@ class Cart(ShopModuleAbstract, Tree):
             current.session.get().markChanged()
             # Store basket at the user skel, it will be shared over multiple sessions / devices
             if user := current.user.get():
-                self._set_basket_txn(user_key=user["key"], basket_key=root_node["key"])
+                self._set_basket(user_key=user["key"], basket_key=root_node["key"])
+                self.session["basket_generation"] = None  # re-sync on the next request
+            if guest_cart:
+                self._write_guest_articles(guest_cart, root_node["key"])
         return self.session["session_cart_key"]
 
     def detach_session_cart(self) -> db.Key | None:
@@ -114,9 +293,25 @@ class Cart(ShopModuleAbstract, Tree):
         self.session["session_cart_key"] = None
         current.session.get().markChanged()
         if user := current.user.get():
-            self._set_basket_txn(user_key=user["key"], basket_key=None)
+            self._set_basket(user_key=user["key"], basket_key=None)
+            self.session["basket_generation"] = None  # re-sync on the next request
         return key
 
+    @staticmethod
+    def _set_basket(user_key: db.Key, basket_key: db.Key | None) -> SkeletonInstance:
+        """
+        Set the basket of a user.
+
+        The basket bone must only be changed by this method: it bumps the basket
+        generation of the user, so all sessions of the user re-sync their
+        basket key (see :meth:`_sync_session_cart_key`).
+        The generation is bumped after the transaction has been committed,
+        the generation store may use a transaction on its own.
+        """
+        user_skel = Cart._set_basket_txn(user_key=user_key, basket_key=basket_key)
+        GENERATION_STORE.get().bump(Cart._basket_generation_name(user_key))
+        return user_skel
+
     @staticmethod
     def _set_basket_txn(user_key: db.Key, basket_key: db.Key | None) -> SkeletonInstance:
         if not db.IsInTransaction():
@@ -127,6 +322,240 @@ class Cart(ShopModuleAbstract, Tree):
         user_skel.write()
         return user_skel
 
+    # --- Guest cart (see session_guest_carts) ---------------------------------
+
+    def _get_guest_cart(self, *, create_if_missing: bool = False) -> dict | None:
+        if (guest_cart := self.session.get("guest_cart")) is None and create_if_missing:
+            guest_cart = self.session["guest_cart"] = {
+                "token": utils.string.random(16),
+                # {"article": article_key, "quantity": quantity} entries, in the order they were added.
+                # Dicts instead of pairs, the session is stored as entity and arrays can't contain arrays.
+                "articles": [],
+            }
+            current.session.get().markChanged()
+        return guest_cart
+
+    def _guest_cart_key(self, guest_cart: dict) -> db.Key:
+        return db.Key(CartNodeSkel.kindName, f"guest-{guest_cart['token']}")
+
+    def _guest_leaf_key(self, guest_cart: dict, article_key: db.Key) -> db.Key:
+        return db.Key(CartItemSkel.kindName, f"guest-{guest_cart['token']}-{article_key.id_or_name}")
+
+    def is_guest_cart_key(self, key: db.Key | None) -> bool:
+        """Is this the (virtual) key of the guest cart stored in the current session?"""
+        return (
+            isinstance(key, db.Key)
+            and key.kind == CartNodeSkel.kindName
+            and current.session.get() is not None  # e.g. deferred tasks
+            and (guest_cart := self.session.get("guest_cart")) is not None
+            and key == self._guest_cart_key(guest_cart)
+        )
+
+    def get_guest_cart_tree(self) -> CartTree | None:
+        """
+        Get the guest cart of the current session as cart tree.
+
+        The node and leaf skeletons are built in memory, with one multi-get
+        for the articles, and the tree is cached request-local like the trees
+        of :meth:`get_cart_tree`.  So the computed bones (prices, totals, vat,
+        shipping, ...) of the guest cart work without any cart entity.
+        Articles which don't exist anymore are dropped from the guest cart.
+
+        :return: The tree or ``None`` if the session has no guest cart.
+        """
+        if current.session.get() is None or (guest_cart := self.session.get("guest_cart")) is None:
+            return None
+        root_key = self._guest_cart_key(guest_cart)
+        cache = current.request_data.get().setdefault("shop_cache_cart_tree", {})
+        if (tree := cache.get(root_key)) is not None:
+            return tree
+
+        article_cache = CartItemSkel.get_article_cache()
+        if keys := [entry["article"] for entry in guest_cart["articles"] if entry["article"] not in article_cache]:
+            for key, entity in zip(keys, db.Get(keys)):
+                if entity is not None:
+                    article_cache[key] = self._get_article_skel_from_entity(entity)
+        if missing := [entry["article"] for entry in guest_cart["articles"] if entry["article"] not in article_cache]:
+            logger.warning(f"Dropping deleted articles {missing=} from the guest cart")
+            guest_cart["articles"] = [entry for entry in guest_cart["articles"] if entry["article"] in article_cache]
+            current.session.get().markChanged()
+
+        root_skel = self.viewSkel("node")
+        root_skel["key"] = root_key
+        root_skel["name"] = root_skel.name.getDefaultValue(root_skel)
+        root_skel["is_root_node"] = True
+        root_skel["cart_type"] = CartType.BASKET
+        root_skel["parentrepo"] = root_key
+
+        leaf_skels = []
+        article_bone = self.viewSkel("leaf").article
+        for idx, entry in enumerate(guest_cart["articles"]):
+            article_skel = article_cache[entry["article"]]
+            skel = self.viewSkel("leaf")
+            skel["key"] = self._guest_leaf_key(guest_cart, entry["article"])
+            skel["article"] = self._get_article_relskel(article_bone, article_skel)
+            skel = self.copy_article_values(article_skel, skel)
+            skel["quantity"] = entry["quantity"]
+            skel["parententry"] = root_key
+            skel["parentrepo"] = root_key
+            skel["sortindex"] = float(idx)
+            leaf_skels.append(skel)
+
+        cache[root_key] = tree = CartTree(root_skel, [], leaf_skels)
+        return tree
+
+    def _guest_add_or_update_article(
+        self,
+        article_key: db.Key,
+        *,
+        quantity: int,
+        quantity_mode: QuantityMode,
+    ) -> SkeletonInstance_T[CartItemSkel] | None:
+        """Like :meth:`add_or_update_article`, but on the guest cart stored in the session"""
+        guest_cart = self._get_guest_cart(create_if_missing=True)
+        leaf_key = self._guest_leaf_key(guest_cart, article_key)
+        skel = self.get_guest_cart_tree().leafs.get(leaf_key)
+        self._update_guest_articles(
+            guest_cart["articles"], article_key,
+            quantity=quantity, quantity_mode=quantity_mode,
+        )
+        current.session.get().markChanged()
+        self.clear_children_cache()
+
+        if (new_skel := self.get_guest_cart_tree().leafs.get(leaf_key)) is None:
+            if skel is not None:
+                EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=True)
+            return None
+        EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=new_skel, deleted=False)
+        return new_skel
+
+    def _update_guest_articles(
+        self,
+        articles: list[dict],
+        article_key: db.Key,
+        *,
+        quantity: int,
+        quantity_mode: QuantityMode,
+    ) -> None:
+        """
+        Apply an operation to the article entries of a guest cart.
+
+        The entries are changed only if the operation is valid.
+
+        :param articles: The ``articles`` of the guest cart (or a copy of them).
+        """
+        for idx, entry in enumerate(articles):
+            if entry["article"] == article_key:
+                current_quantity = entry["quantity"]
+                break
+        else:
+            idx, current_quantity = None, 0
+            article_skel: SkeletonInstance_T[ArticleAbstractSkel] = self.shop.article_skel()  # type: ignore
+            if not article_skel.read(article_key):
+                raise errors.NotFound(f"Article with key {article_key=} does not exist!")
+            if not article_skel["shop_listed"]:
+                raise errors.UnprocessableEntity(f"Article is not listed for the shop!")
+            CartItemSkel.get_article_cache()[article_key] = article_skel
+        if quantity == 0 and quantity_mode in (QuantityMode.INCREASE, QuantityMode.DECREASE):
+            raise e.InvalidArgumentException(
+                "quantity",
+                descr_appendix="Increase/Decrease quantity by zero is pointless",
+            )
+        if quantity_mode == QuantityMode.REPLACE:
+            new_quantity = quantity
+        elif quantity_mode == QuantityMode.DECREASE:
+            new_quantity = current_quantity - quantity
+        elif quantity_mode == QuantityMode.INCREASE:
+            new_quantity = current_quantity + quantity
+        else:
+            raise e.InvalidArgumentException("quantity_mode", quantity_mode)
+        if new_quantity < 0:
+            raise e.InvalidArgumentException(
+                "quantity",
+                descr_appendix=f"Quantity cannot be negative! (reached {new_quantity})"
+            )
+
+        if new_quantity == 0:
+            if idx is not None:
+                del articles[idx]
+        elif idx is None:
+            articles.append({"article": article_key, "quantity": new_quantity})
+        else:
+            articles[idx]["quantity"] = new_quantity
+
+    def _store_guest_articles(
+        self,
+        articles: list[dict],
+        operations: list[tuple[int, dict]],
+        results: list[SkeletonInstance_T[CartItemSkel] | None],
+    ) -> None:
+        """Store the guest cart articles updated by :meth:`articles_bulk_update` in the session"""
+        guest_cart = self._get_guest_cart()
+        old_leafs = self.get_guest_cart_tree().leafs
+        guest_cart["articles"] = articles
+        current.session.get().markChanged()
+        self.clear_children_cache()
+        leafs = self.get_guest_cart_tree().leafs
+        for article_key in dict.fromkeys(operation["article_key"] for _, operation in operations):
+            leaf_key = self._guest_leaf_key(guest_cart, article_key)
+            if (skel := leafs.get(leaf_key)) is not None:
+                EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=False)
+            elif (skel := old_leafs.get(leaf_key)) is not None:
+                EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=True)
+        for idx, operation in operations:
+            results[idx] = leafs.get(self._guest_leaf_key(guest_cart, operation["article_key"]))
+
+    def _write_guest_articles(self, guest_cart: dict, parent_cart_key: db.Key) -> None:
+        """Write the articles of a guest cart as leafs of a cart node"""
+        for entry in guest_cart["articles"]:
+            try:
+                self.add_or_update_article(
+                    entry["article"], parent_cart_key,
+                    quantity=entry["quantity"], quantity_mode=QuantityMode.REPLACE,
+                )
+            except (errors.NotFound, errors.UnprocessableEntity) as exc:
+                logger.warning(f"Dropping article_key={entry['article']!r} of the guest cart: {exc}")
+
+    def materialize_guest_cart(self) -> db.Key | None:
+        """
+        Write the guest cart of the current session as cart node and leafs.
+
+        The written cart becomes the basket of the session (and of the user,
+        if logged in); the guest cart is removed from the session.
+
+        :return: The key of the written root node or ``None`` if the session has no guest cart.
+        """
+        if self.session.get("guest_cart") is None:
+            return None
+        return self._ensure_current_session_cart()
+
+    def resolve_cart_key(self, cart_key: db.Key | None) -> db.Key | None:
+        """
+        Resolve the virtual key of the guest cart to a key of a cart entity.
+
+        Operations which need the cart as entity call this first; it
+        materializes the guest cart (see :meth:`materialize_guest_cart`).
+        Any other key is returned as is.
+        """
+        if self.is_guest_cart_key(cart_key):
+            return self.materialize_guest_cart()
+        return cart_key
+
+    def _adopt_guest_cart(self) -> None:
+        """
+        Take over the guest cart of the session after the login of the visitor.
+
+        Like a guest cart stored in the datastore, it becomes the basket of
+        the user -- unless the user has already a basket, that one wins.
+        """
+        if self.session.get("session_cart_key"):
+            logger.info("Dropping the guest cart, the user has already a basket")
+            del self.session["guest_cart"]
+            current.session.get().markChanged()
+            self.clear_children_cache()
+        else:
+            self.materialize_guest_cart()
+
     def get_available_root_nodes(self, *args, **kwargs) -> list[dict[t.Literal["name", "key"], str]]:
         root_nodes = []
         if self.current_session_cart_key is not None:
@@ -194,6 +623,11 @@ class Cart(ShopModuleAbstract, Tree):
             return False
         return True
 
+    def is_viewable_order_cart(self, root_key: db.Key) -> bool:
+        """Is this the root node of the cart of an order which the current user can view?"""
+        order_skel = self.shop.order.viewSkel().all().filter("cart.dest.__key__ =", root_key).getSkel()
+        return order_skel is not None and self.shop.order.canView(order_skel)
+
     def get_children(
         self,
         parent_cart_key: db.Key,
@@ -201,6 +635,9 @@ class Cart(ShopModuleAbstract, Tree):
     ) -> t.Iterator[SkeletonInstance]:
         if not isinstance(parent_cart_key, db.Key):
             raise TypeError(f"parent_cart_key must be an instance of db.Key. Got {parent_cart_key!r} instead")
+        if self.is_guest_cart_key(parent_cart_key):
+            yield from self.get_guest_cart_tree().get_children(parent_cart_key)
+            return
         for skel_type in ("node", "leaf"):
             skel = self.viewSkel(skel_type)
             query = skel.all().mergeExternalFilter(filters)
@@ -215,17 +652,234 @@ class Cart(ShopModuleAbstract, Tree):
         self,
         parent_cart_key: db.Key
     ) -> list[SkeletonInstance]:
-        cache = current.request_data.get().setdefault("shop_cache_cart_children", {})
-        try:
-            return [without_render_preparation(s) for s in cache[parent_cart_key]]
-        except KeyError:
-            pass
-        children = list(self.get_children(parent_cart_key))
-        cache[parent_cart_key] = children
-        return children
+        """
+        Get the children of a cart node from the request-local cached cart tree.
+
+        The first access loads the entire tree the node belongs to
+        (see :meth:`get_cart_tree`), all further accesses -- to this or
+        any other node of the same cart -- are served from memory.
+        """
+        if not isinstance(parent_cart_key, db.Key):
+            raise TypeError(f"parent_cart_key must be an instance of db.Key. Got {parent_cart_key!r} instead")
+        if (tree := self.get_cart_tree(parent_cart_key)) is None:
+            return []
+        return [without_render_preparation(s) for s in tree.get_children(parent_cart_key)]
 
     def clear_children_cache(self) -> None:
-        current.request_data.get()["shop_cache_cart_children"] = {}
+        """Invalidate the request-local cached cart trees (must be called after each cart mutation)"""
+        current.request_data.get()["shop_cache_cart_tree"] = {}
+        current.request_data.get()["shop_cache_cart_pricing"] = {}
+
+    def get_cart_tree(
+        self,
+        node: db.Key | SkeletonInstance_T[CartNodeSkel],
+        *,
+        use_cache: bool = True,
+    ) -> CartTree | None:
+        """
+        Get the entire cart tree the given node belongs to.
+
+        All nodes and leafs of the cart are loaded at once via their
+        ``parentrepo`` (see :class:`CartTree`).  With *use_cache* the tree is
+        kept request-local, so all computed bones of the cart (totals, vat,
+        shipping, ...) share this single load.
+
+        :param node: Key or skeleton of any node inside the tree.
+        :param use_cache: Use (and fill) the request-local cache.
+        :return: The tree or ``None`` if the node does not exist (anymore).
+        """
+        if isinstance(node, db.Key):
+            node_key, node_skel = node, None
+        else:
+            node_skel = without_render_preparation(node)
+            node_key = node_skel["key"]
+        if not isinstance(node_key, db.Key):
+            raise TypeError(f"node must be a db.Key or a skeleton with a key. Got {node_key!r} instead")
+        if self.is_guest_cart_key(node_key):
+            return self.get_guest_cart_tree()
+
+        cache = current.request_data.get().setdefault("shop_cache_cart_tree", {}) if use_cache else {}
+        for tree in cache.values():
+            if node_key in tree.nodes:
+                return tree
+
+        if node_skel is None or "parentrepo" not in node_skel:
+            node_skel = self.viewSkel("node")
+            if not node_skel.read(node_key):
+                logger.warning(f"Cart node {node_key=} doesn't exist (anymore)")
+                return None
+        if node_skel["is_root_node"] or not node_skel["parentrepo"]:
+            root_key = node_skel["key"]
+        else:
+            root_key = node_skel["parentrepo"]
+
+        # A cached tree of this root which doesn't know the node is outdated
+        if (tree := CartTree.load(root_key)) is None:
+            return None
+        self.prefetch_articles(tree.leafs.values())
+        self.prefetch_discounts(tree.nodes.values())
+        if use_cache:
+            cache[root_key] = tree
+        return tree
+
+    def get_cart_pricing(self, leaf_skel: SkeletonInstance_T[CartItemSkel]) -> CartPricing | None:
+        """
+        Get the batched prices of the cart the given leaf belongs to.
+
+        The batch is built once per request-local cached cart tree and
+        only if the tree has already been loaded (see :attr:`batch_pricing`).
+
+        :param leaf_skel: Skeleton of any leaf of the cart.
+        :return: The batch or ``None`` if batch pricing is disabled
+            or the tree of the leaf is not loaded.
+        """
+        if not self.batch_pricing:
+            return None
+        request_data = current.request_data.get()
+        for tree in request_data.get("shop_cache_cart_tree", {}).values():
+            if leaf_skel["key"] in tree.leafs:
+                break
+        else:
+            return None
+        cache = request_data.setdefault("shop_cache_cart_pricing", {})
+        # A reloaded tree (same root, new instance) needs a new batch
+        if (cached := cache.get(tree.key)) is not None and cached[0] is tree:
+            return cached[1]
+        pricing = CartPricing(tree.leafs.values())
+        if self.verify_batch_pricing and (mismatches := pricing.verify(tree.leafs.values())):
+            logger.error(f"Batch pricing of {tree!r} differs from Price.to_dict for {mismatches=}")
+        cache[tree.key] = tree, pricing
+        return pricing
+
+    def prefetch_articles(self, leaf_skels: t.Iterable[SkeletonInstance_T[CartItemSkel]]) -> None:
+        """
+        Load the full article skeletons of many cart leafs with one multi-get.
+
+        Fills the request-local cache of :attr:`CartItemSkel.article_skel_full`,
+        so the price and shipping computations of the leafs don't read each
+        article on its own.  Missing articles are skipped.
+
+        :param leaf_skels: The cart leafs whose articles are needed.
+        """
+        article_cache = CartItemSkel.get_article_cache()
+        keys = list({
+            leaf_skel["article"]["dest"]["key"]
+            for leaf_skel in leaf_skels
+            if leaf_skel["article"]
+        } - article_cache.keys())
+        if not keys:
+            return
+        for key, entity in zip(keys, db.Get(keys)):
+            if entity is not None:
+                article_cache[key] = self._get_article_skel_from_entity(entity)
+
+    def prefetch_discounts(self, node_skels: t.Iterable[SkeletonInstance_T[CartNodeSkel]]) -> None:
+        """
+        Load the full discount skeletons of many cart nodes with one multi-get.
+
+        Fills the request-local cache used by :meth:`get_discount_skels`.
+
+        :param node_skels: The cart nodes whose discounts are needed.
+        """
+        self._load_discount_skels(
+            node_skel["discount"]["dest"]["key"]
+            for node_skel in node_skels
+            if node_skel["discount"]
+        )
+
+    def _load_discount_skels(self, keys: t.Iterable[db.Key]) -> dict[db.Key, SkeletonInstance | None]:
+        cache = current.request_data.get().setdefault("shop_cache_discount_skel", {})
+        if keys := list(set(keys) - cache.keys()):
+            for key, entity in zip(keys, db.Get(keys)):
+                if entity is None:
+                    cache[key] = None
+                else:
+                    cache[key] = skel = self.shop.discount.viewSkel()
+                    skel.setEntity(entity)
+        return cache
+
+    def get_discount_skels(self, ref_skels: list[SkeletonInstance]) -> list[SkeletonInstance]:
+        """
+        Resolve discount ref-skels to the full discount skeletons.
+
+        Uses a request-local cache, missing discounts are loaded with one multi-get.
+        Dangling relations (the discount entity has been deleted meanwhile,
+        e.g. with RelationalConsistency.Ignore) are dropped.
+
+        :param ref_skels: The discount ref-skels (e.g. from :meth:`get_discount_for_leaf`).
+        :return: The full discount skeletons, in the same order.
+        """
+        cache = self._load_discount_skels(ref_skel["key"] for ref_skel in ref_skels)
+        discount_skels = []
+        for ref_skel in ref_skels:
+            if (skel := cache[ref_skel["key"]]) is None:
+                logger.warning(f'Ignoring dangling discount relation {ref_skel["key"]!r}')
+                continue
+            discount_skels.append(skel)
+        return discount_skels
+
+    def get_discount_skels_for_leaf(
+        self,
+        leaf_skel: SkeletonInstance_T[CartItemSkel],
+    ) -> list[SkeletonInstance]:
+        """
+        Get the full discount skeletons of all cart nodes above the given leaf.
+
+        Like :meth:`get_discount_for_leaf`, but the ancestors are taken from the
+        request-local cart tree (shared by all leafs of the cart) and resolved
+        with :meth:`get_discount_skels`.  Falls back to walking the
+        ``parententry`` chain if the leaf is not part of a loadable tree.
+
+        :param leaf_skel: Skeleton of the cart leaf to start from.
+        :return: The full discount skeletons found on the ancestor nodes.
+        """
+        if (
+            (parent_key := leaf_skel["parententry"])
+            and (tree := self.get_cart_tree(parent_key)) is not None
+            and parent_key in tree.nodes
+        ):
+            ref_skels = tree.get_ancestor_discounts(parent_key)
+        else:
+            ref_skels = self.get_discount_for_leaf(leaf_skel)
+        return self.get_discount_skels(ref_skels)
+
+    @functools.cached_property
+    def _article_lru(self) -> cachetools.LRUCache | None:
+        if self.article_lru_maxsize <= 0:
+            return None
+        return cachetools.LRUCache(maxsize=self.article_lru_maxsize)
+
+    @staticmethod
+    def _get_article_relskel(
+        article_bone: RelationalBone,
+        article_skel: SkeletonInstance_T[ArticleAbstractSkel],
+    ) -> dict[t.Literal["dest", "rel"], t.Any]:
+        """
+        Build the value of the article bone from an already loaded article.
+
+        Like :meth:`RelationalBone.relskels_from_keys`, but without fetching
+        the article again.
+        """
+        dest_skel = article_bone._refSkelCache()
+        dest_skel.unserialize(article_skel.dbEntity)
+        for bone_name in dest_skel:
+            # Unserialize all bones from refKeys, then drop dbEntity - otherwise all properties will be copied
+            _ = dest_skel[bone_name]
+        dest_skel.dbEntity = None
+        return {"dest": dest_skel, "rel": None}
+
+    def _get_article_skel_from_entity(self, entity: db.Entity) -> SkeletonInstance_T[ArticleAbstractSkel]:
+        lru_key = (entity.key, entity.get("changedate"))
+        if (lru := self._article_lru) is not None:
+            with lock_article_lru:
+                if (skel := lru.get(lru_key)) is not None:
+                    return skel
+        skel = self.shop.article_skel()
+        skel.setEntity(entity)
+        if lru is not None:
+            with lock_article_lru:
+                lru[lru_key] = skel
+        return skel
 
     # --- (internal) API methods ----------------------------------------------
 
@@ -236,6 +890,8 @@ class Cart(ShopModuleAbstract, Tree):
     ) -> SkeletonInstance_T[CartNodeSkel | CartItemSkel] | None:
         if not isinstance(cart_key, db.Key):
             raise TypeError(f"cart_key must be an instance of db.Key")
+        if skel_type == "node" and self.is_guest_cart_key(cart_key):
+            return self.get_guest_cart_tree().root_skel
         skel = self.viewSkel(skel_type)
         if not skel.read(cart_key):
             logger.debug(f"Cart {cart_key} does not exist")
@@ -256,9 +912,21 @@ class Cart(ShopModuleAbstract, Tree):
             raise TypeError(f"article_key must be an instance of db.Key")
         if not isinstance(parent_cart_key, db.Key):
             raise TypeError(f"parent_cart_key must be an instance of db.Key")
+        if self.is_guest_cart_key(parent_cart_key):
+            tree = self.get_guest_cart_tree()
+            skel = tree.leafs.get(self._guest_leaf_key(self.session["guest_cart"], article_key))
+            if skel is None or (must_be_listed and not skel["shop_listed"]):
+                return None
+            return skel
         if not self.is_valid_node(parent_cart_key):
             raise e.InvalidArgumentException("parent_cart_key", parent_cart_key)
         skel = self.viewSkel("leaf")
+        if skel.read(self.get_leaf_key(parent_cart_key, article_key)):
+            if must_be_listed and not skel["shop_listed"]:
+                return None
+            return skel  # type: ignore
+        if not self.leaf_lookup_by_query:
+            return None
         query: db.Query = skel.all()
         query.filter("parententry =", parent_cart_key)
         query.filter("article.dest.__key__ =", article_key)
@@ -267,6 +935,24 @@ class Cart(ShopModuleAbstract, Tree):
         skel = query.getSkel()
         return skel  # type: ignore
 
+    @staticmethod
+    def get_leaf_key(parent_cart_key: db.Key, article_key: db.Key) -> db.Key:
+        """
+        Get the deterministic key of the leaf of an article in a cart node.
+
+        An article exists at most once per cart node, so parallel requests
+        adding the same article end up at the same leaf (entity) instead of
+        creating two leafs.
+
+        :param parent_cart_key: Key of the cart node.
+        :param article_key: Key of the article.
+        """
+        digest = hashlib.sha256(
+            f"{parent_cart_key.kind}:{parent_cart_key.id_or_name}"
+            f"/{article_key.kind}:{article_key.id_or_name}".encode()
+        ).hexdigest()
+        return db.Key(CartItemSkel.kindName, f"leaf-{digest}")
+
     def add_or_update_article(
         self,
         article_key: db.Key,
@@ -282,32 +968,16 @@ class Cart(ShopModuleAbstract, Tree):
             raise TypeError(f"parent_cart_key must be an instance of db.Key")
         if not isinstance(quantity_mode, QuantityMode):
             raise TypeError(f"quantity_mode must be an instance of QuantityMode")
+        if self.is_guest_cart_key(parent_cart_key):
+            if not kwargs:
+                return self._guest_add_or_update_article(article_key, quantity=quantity, quantity_mode=quantity_mode)
+            # Additional values can't be kept in the session
+            parent_cart_key = self.materialize_guest_cart()
         if not self.is_valid_node(parent_cart_key):
             raise e.InvalidArgumentException("parent_cart_key", parent_cart_key)
-        parent_skel = None
-        if not (skel := self.get_article(article_key, parent_cart_key, must_be_listed=False)):
-            # FIXME: This part between get_article() and skel.write() is open for race conditions
-            #        parallel request might result into two different cart leafs with the same article.
-            logger.info("This is an add")
-            skel: SkeletonInstance_T[CartItemSkel] = self.addSkel("leaf")  # type:ignore
-            res = skel.setBoneValue("article", article_key)
-            skel["parententry"] = parent_cart_key
-            parent_skel = self.viewSkel("node")
-            assert parent_skel.read(parent_cart_key)
-            if parent_skel["is_root_node"]:
-                skel["parentrepo"] = parent_skel["key"]
-            else:
-                skel["parentrepo"] = parent_skel["parentrepo"]
-            article_skel: SkeletonInstance_T[ArticleAbstractSkel] = self.shop.article_skel()  # type: ignore
-            if not article_skel.read(article_key):
-                raise errors.NotFound(f"Article with key {article_key=} does not exist!")
-            if not article_skel["shop_listed"]:
-                # logger.debug(f"not listed: {article_skel=}")
-                raise errors.UnprocessableEntity(f"Article is not listed for the shop!")
-            skel = self.copy_article_values(article_skel, skel)
-        else:
-            parent_skel = skel.parent_skel
-        if parent_skel and parent_skel["is_frozen"]:
+        parent_skel = self.viewSkel("node")
+        assert parent_skel.read(parent_cart_key)
+        if parent_skel["is_frozen"]:
             # The cart belongs to a placed order and must not change anymore
             raise errors.Forbidden(
                 translate("viur.shop.error.cart.is_frozen",
@@ -318,6 +988,73 @@ class Cart(ShopModuleAbstract, Tree):
                 "quantity",
                 descr_appendix="Increase/Decrease quantity by zero is pointless",
             )
+
+        leaf_key = self.get_leaf_key(parent_cart_key, article_key)
+        article_skel = None
+        lookup_by_query = self.leaf_lookup_by_query
+        while (result := db.RunInTransaction(
+            self._upsert_article_txn, leaf_key, parent_skel, article_skel,
+            quantity=quantity, quantity_mode=quantity_mode, kwargs=kwargs,
+        )) is None:
+            # There's no leaf under the deterministic key, only now the query is worth it
+            if lookup_by_query:
+                lookup_by_query = False
+                if (
+                    legacy_leaf := self.viewSkel("leaf").all().filter("parententry =", parent_cart_key)
+                        .filter("article.dest.__key__ =", article_key).getEntry()
+                ) is not None:
+                    leaf_key = legacy_leaf.key  # a leaf written before the deterministic keys
+                    continue
+            # The leaf doesn't exist (yet), it will be added.
+            leaf_key = self.get_leaf_key(parent_cart_key, article_key)
+            # The article is read outside the transaction, so adding a popular
+            # article doesn't lock it for the transactions of all other carts.
+            logger.info("This is an add")
+            article_skel = self.shop.article_skel()
+            if not article_skel.read(article_key):
+                raise errors.NotFound(f"Article with key {article_key=} does not exist!")
+            if not article_skel["shop_listed"]:
+                raise errors.UnprocessableEntity(f"Article is not listed for the shop!")
+        skel, deleted = result
+
+        self.clear_children_cache()
+        self.refresh_materialized_values(skel["parententry"])
+        self.bump_cart_version(skel["parentrepo"])
+        EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=deleted)
+        # TODO: Validate quantity with hook (stock availability)
+        return None if deleted else skel
+
+    def _upsert_article_txn(
+        self,
+        leaf_key: db.Key,
+        parent_skel: SkeletonInstance_T[CartNodeSkel],
+        article_skel: SkeletonInstance_T[ArticleAbstractSkel] | None,
+        *,
+        quantity: int,
+        quantity_mode: QuantityMode,
+        kwargs: dict[str, t.Any],
+    ) -> tuple[SkeletonInstance_T[CartItemSkel], bool] | None:
+        """
+        Add or update the leaf of an article inside a transaction.
+
+        :return: The leaf and whether it has been deleted (quantity reached zero)
+            or ``None`` if the leaf must be added, but no *article_skel* is given.
+        """
+        skel: SkeletonInstance_T[CartItemSkel] = self.editSkel("leaf")  # type:ignore
+        if not (exists := bool(skel.read(leaf_key))):
+            if article_skel is None:
+                return None
+            skel = self.addSkel("leaf")  # type:ignore
+            skel["key"] = leaf_key
+            # Built from the article read before, so the article is not read inside the transaction
+            skel["article"] = self._get_article_relskel(skel.article, article_skel)
+            skel["parententry"] = parent_skel["key"]
+            if parent_skel["is_root_node"]:
+                skel["parentrepo"] = parent_skel["key"]
+            else:
+                skel["parentrepo"] = parent_skel["parentrepo"]
+            skel = self.copy_article_values(article_skel, skel)
+
         if quantity_mode == QuantityMode.REPLACE:
             skel["quantity"] = quantity
         elif quantity_mode == QuantityMode.DECREASE:
@@ -332,9 +1069,9 @@ class Cart(ShopModuleAbstract, Tree):
                 descr_appendix=f'Quantity cannot be negative! (reached {skel["quantity"]})'
             )
         if skel["quantity"] == 0:
-            skel.delete()
-            EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=True)
-            return None
+            if exists:
+                skel.delete()
+            return skel, True
         try:
             discount_type = parent_skel["discount"]["dest"]["discount_type"]
         except (TypeError, KeyError) as exc:
@@ -347,10 +1084,194 @@ class Cart(ShopModuleAbstract, Tree):
             )
         skel = self.additional_add_or_update_article(skel, **kwargs)
         skel.write()
-        EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=False)
+        return skel, False
+
+    def articles_bulk_update(
+        self,
+        operations: list[ArticleOperation],
+    ) -> list[SkeletonInstance_T[CartItemSkel] | None]:
+        """
+        Add, update and remove many articles at once.
+
+        Like :meth:`add_or_update_article` for each operation, but every cart
+        node is validated only once (against the loaded cart tree), the new
+        articles are read with one multi-get and all leafs are written in one
+        transaction: either all operations are applied or none.
+        Operations on the guest cart are validated up front and stored in the
+        session after the transaction.
+        Operations on the same article in the same node are applied in order.
+
+        :param operations: The operations; additional keys are passed as
+            additional values to :meth:`additional_add_or_update_article`.
+        :return: The leafs in the order of the operations, ``None`` for removed leafs.
+        """
+        if len(operations) > self.bulk_update_max_operations:
+            raise e.InvalidArgumentException(
+                "operations",
+                descr_appendix=f"More than {self.bulk_update_max_operations} operations",
+            )
+        operations = [{"quantity_mode": QuantityMode.REPLACE} | operation for operation in operations]
+        for operation in operations:
+            if not isinstance(operation["article_key"], db.Key):
+                raise TypeError(f"article_key must be an instance of db.Key")
+            if not isinstance(operation["parent_cart_key"], db.Key):
+                raise TypeError(f"parent_cart_key must be an instance of db.Key")
+            if not isinstance(operation["quantity_mode"], QuantityMode):
+                raise TypeError(f"quantity_mode must be an instance of QuantityMode")
+            if operation["quantity"] == 0 and operation["quantity_mode"] != QuantityMode.REPLACE:
+                raise e.InvalidArgumentException(
+                    "quantity",
+                    descr_appendix="Increase/Decrease quantity by zero is pointless",
+                )
+            if (
+                self.is_guest_cart_key(operation["parent_cart_key"])
+                and operation.keys() - ArticleOperation.__annotations__.keys()
+            ):
+                # Additional values can't be kept in the session
+                operation["parent_cart_key"] = self.materialize_guest_cart()
+
+        results: list[SkeletonInstance_T[CartItemSkel] | None] = [None] * len(operations)
+        pending: list[tuple[int, dict]] = []
+        guest_pending: list[tuple[int, dict]] = []
+        for idx, operation in enumerate(operations):
+            if self.is_guest_cart_key(operation["parent_cart_key"]):
+                guest_pending.append((idx, operation))
+            else:
+                pending.append((idx, operation))
+
+        # Validate the guest cart operations on a copy, the session is changed after the transaction only
+        guest_articles: list[dict] = []
+        if guest_pending:
+            guest_articles = [dict(entry) for entry in self._get_guest_cart()["articles"]]
+            for _, operation in guest_pending:
+                self._update_guest_articles(
+                    guest_articles, operation["article_key"],
+                    quantity=operation["quantity"], quantity_mode=operation["quantity_mode"],
+                )
+        if not pending:
+            if guest_pending:
+                self._store_guest_articles(guest_articles, guest_pending, results)
+            return results
+
+        # Validate each node once, the tree is loaded once per cart
+        parent_skels: dict[db.Key, SkeletonInstance_T[CartNodeSkel]] = {}
+        for _, operation in pending:
+            if (parent_key := operation["parent_cart_key"]) in parent_skels:
+                continue
+            if not self.is_valid_node(parent_key) or (tree := self.get_cart_tree(parent_key)) is None:
+                raise e.InvalidArgumentException("parent_cart_key", parent_key)
+            parent_skels[parent_key] = parent_skel = tree.get_node(parent_key)
+            if parent_skel["is_frozen"]:
+                # The cart belongs to a placed order and must not change anymore
+                raise errors.Forbidden(
+                    translate("viur.shop.error.cart.is_frozen",
+                              default_variables={"cart_key": parent_key})
+                )
+
+        # Find the leafs; leafs without a deterministic key are found in the tree too
+        leaf_keys: list[db.Key] = []
+        new_article_keys: set[db.Key] = set()
+        for _, operation in pending:
+            parent_key, article_key = operation["parent_cart_key"], operation["article_key"]
+            leaf_key = self.get_leaf_key(parent_key, article_key)
+            if leaf_key not in (tree := self.get_cart_tree(parent_key)).leafs:
+                for child in tree.get_children(parent_key):
+                    if child["key"] in tree.leafs and child["article"]["dest"]["key"] == article_key:
+                        leaf_key = child["key"]
+                        break
+                else:
+                    new_article_keys.add(article_key)
+            leaf_keys.append(leaf_key)
+
+        article_skels: dict[db.Key, SkeletonInstance_T[ArticleAbstractSkel]] = {}
+        if new_article_keys:
+            new_article_keys = list(new_article_keys)
+            for article_key, entity in zip(new_article_keys, db.Get(new_article_keys)):
+                if entity is None:
+                    raise errors.NotFound(f"Article with key {article_key=} does not exist!")
+                article_skels[article_key] = skel = self._get_article_skel_from_entity(entity)
+                if not skel["shop_listed"]:
+                    raise errors.UnprocessableEntity(f"Article {article_key=} is not listed for the shop!")
+
+        changes = db.RunInTransaction(
+            self._articles_bulk_update_txn, pending, leaf_keys, parent_skels, article_skels,
+        )
+        if guest_pending:
+            self._store_guest_articles(guest_articles, guest_pending, results)
+
         self.clear_children_cache()
-        # TODO: Validate quantity with hook (stock availability)
-        return skel
+        self.refresh_materialized_values(*parent_skels)
+        self.bump_cart_version(*map(self._get_root_key, parent_skels.values()))
+        for skel, deleted in changes.values():
+            EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=deleted)
+        for (idx, _), leaf_key in zip(pending, leaf_keys):
+            skel, deleted = changes[leaf_key]
+            results[idx] = None if deleted else skel
+        return results
+
+    def _articles_bulk_update_txn(
+        self,
+        pending: list[tuple[int, dict]],
+        leaf_keys: list[db.Key],
+        parent_skels: dict[db.Key, SkeletonInstance_T[CartNodeSkel]],
+        article_skels: dict[db.Key, SkeletonInstance_T[ArticleAbstractSkel]],
+    ) -> dict[db.Key, tuple[SkeletonInstance_T[CartItemSkel], bool]]:
+        """Apply the operations of :meth:`articles_bulk_update` to the leafs inside a transaction"""
+        unique_keys = list(dict.fromkeys(leaf_keys))
+        skels: dict[db.Key, tuple[SkeletonInstance_T[CartItemSkel], bool]] = {}
+        for leaf_key, entity in zip(unique_keys, db.Get(unique_keys)):
+            skel = self.editSkel("leaf")
+            if entity is not None:
+                skel.setEntity(entity)
+            skels[leaf_key] = skel, entity is not None
+
+        changed_skels = {}
+        for (_, operation), leaf_key in zip(pending, leaf_keys):
+            skel, exists = skels[leaf_key]
+            parent_skel = parent_skels[operation["parent_cart_key"]]
+            if not exists and leaf_key not in changed_skels:
+                skel["key"] = leaf_key
+                skel["article"] = skel.article.createRelSkelFromKey(operation["article_key"])
+                skel["parententry"] = parent_skel["key"]
+                if parent_skel["is_root_node"]:
+                    skel["parentrepo"] = parent_skel["key"]
+                else:
+                    skel["parentrepo"] = parent_skel["parentrepo"]
+                skel = self.copy_article_values(article_skels[operation["article_key"]], skel)
+            if operation["quantity_mode"] == QuantityMode.REPLACE:
+                skel["quantity"] = operation["quantity"]
+            elif operation["quantity_mode"] == QuantityMode.DECREASE:
+                skel["quantity"] -= operation["quantity"]
+            elif operation["quantity_mode"] == QuantityMode.INCREASE:
+                skel["quantity"] += operation["quantity"]
+            if skel["quantity"] < 0:
+                raise e.InvalidArgumentException(
+                    "quantity",
+                    descr_appendix=f'Quantity cannot be negative! (reached {skel["quantity"]})'
+                )
+            try:
+                discount_type = parent_skel["discount"]["dest"]["discount_type"]
+            except (TypeError, KeyError):
+                discount_type = None
+            if discount_type == DiscountType.FREE_ARTICLE and skel["quantity"] > 1:
+                raise e.InvalidArgumentException(
+                    "quantity",
+                    descr_appendix=f'Quantity of free article cannot be greater than 1! (reached {skel["quantity"]})'
+                )
+            additional_values = {k: v for k, v in operation.items() if k not in ArticleOperation.__annotations__}
+            changed_skels[leaf_key] = skel = self.additional_add_or_update_article(skel, **additional_values)
+            skels[leaf_key] = skel, exists
+
+        changes = {}
+        for leaf_key, skel in changed_skels.items():
+            if skel["quantity"] == 0:
+                if skels[leaf_key][1]:
+                    skel.delete()
+                changes[leaf_key] = skel, True
+            else:
+                skel.write()
+                changes[leaf_key] = skel, False
+        return changes
 
     def copy_article_values(
         self,
@@ -383,6 +1304,8 @@ class Cart(ShopModuleAbstract, Tree):
             raise TypeError(f"parent_cart_key must be an instance of db.Key")
         if not isinstance(new_parent_cart_key, db.Key):
             raise TypeError(f"parent_cart_key must be an instance of db.Key")
+        parent_cart_key = self.resolve_cart_key(parent_cart_key)
+        new_parent_cart_key = self.resolve_cart_key(new_parent_cart_key)
         if not (skel := self.get_article(article_key, parent_cart_key, must_be_listed=False)):
             raise e.InvalidArgumentException(
                 "article_key",
@@ -409,9 +1332,42 @@ class Cart(ShopModuleAbstract, Tree):
                 translate("viur.shop.error.cart.is_frozen",
                           default_variables={"cart_key": frozen_cart_key})
             )
+        skel = db.RunInTransaction(
+            self._move_article_txn, skel["key"],
+            self.get_leaf_key(new_parent_cart_key, article_key), new_parent_cart_key,
+        )
+        self.clear_children_cache()
+        self.refresh_materialized_values(parent_cart_key, new_parent_cart_key)
+        self.bump_cart_version(skel["parentrepo"])
+        EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=False)
+        return skel
+
+    def _move_article_txn(
+        self,
+        leaf_key: db.Key,
+        new_leaf_key: db.Key,
+        new_parent_cart_key: db.Key,
+    ) -> SkeletonInstance_T[CartItemSkel]:
+        """Move a leaf to its deterministic key in the new cart node (see :meth:`get_leaf_key`)"""
+        skel = self.editSkel("leaf")
+        assert skel.read(leaf_key)
         skel["parententry"] = new_parent_cart_key
+        if new_leaf_key == leaf_key:
+            skel.write()
+            return skel
+        if db.Get(new_leaf_key) is not None:
+            raise e.InvalidArgumentException(
+                "new_parent_cart_key", new_parent_cart_key,
+                f"Article exists already in the target cart node"
+            )
+        for bone_name, bone in skel.items():
+            if not bone.compute:
+                _ = skel[bone_name]  # carry all values over to the new entity
+        skel["key"] = new_leaf_key
         skel.write()
-        EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=skel, deleted=False)
+        old_skel = self.editSkel("leaf")
+        if old_skel.read(leaf_key):
+            old_skel.delete()
         return skel
 
     def cart_add(
@@ -432,6 +1388,7 @@ class Cart(ShopModuleAbstract, Tree):
             raise TypeError(f"cart_type must be an instance of CartType")
         if discount_key is not SENTINEL and not isinstance(discount_key, (db.Key, type(None))):
             raise TypeError(f"discount_key must be an instance of db.Key")
+        parent_cart_key = self.resolve_cart_key(parent_cart_key)
         skel = self.addSkel("node")
         skel = self._cart_set_values(
             skel=skel,
@@ -445,8 +1402,10 @@ class Cart(ShopModuleAbstract, Tree):
         )
         skel = self.additional_cart_add(skel, **kwargs)
         skel.write()
+        self.clear_children_cache()
+        self.refresh_materialized_values(skel["key"])
+        self.onAdded("node", skel)  # bumps the cart version
         EVENT_SERVICE.call(Event.CART_CHANGED, skel=skel, deleted=False)
-        self.onAdded("node", skel)
         return skel
 
     def cart_update(
@@ -470,6 +1429,9 @@ class Cart(ShopModuleAbstract, Tree):
             raise TypeError(f"parent_cart_key must be an instance of db.Key")
         if discount_key is not SENTINEL and not isinstance(discount_key, (db.Key, type(None))):
             raise TypeError(f"discount_key must be an instance of db.Key")
+        cart_key = self.resolve_cart_key(cart_key)
+        if parent_cart_key is not SENTINEL:
+            parent_cart_key = self.resolve_cart_key(parent_cart_key)
         skel = self.editSkel("node")
         # TODO: must be inside a own root node ...
         # if not self.canEdit(skel):
@@ -481,6 +1443,7 @@ class Cart(ShopModuleAbstract, Tree):
                 translate("viur.shop.error.cart.is_frozen",
                           default_variables={"cart_key": cart_key})
             )
+        old_parent_cart_key = skel["parententry"]
         skel = self._cart_set_values(
             skel=skel,
             parent_cart_key=parent_cart_key,
@@ -492,6 +1455,9 @@ class Cart(ShopModuleAbstract, Tree):
         )
         self.additional_cart_update(skel, **kwargs)
         skel.write()
+        self.clear_children_cache()
+        self.refresh_materialized_values(skel["key"], old_parent_cart_key)
+        self.bump_cart_version(self._get_root_key(skel))
         EVENT_SERVICE.call(Event.CART_CHANGED, skel=skel, deleted=False)
         return skel
 
@@ -569,6 +1535,10 @@ class Cart(ShopModuleAbstract, Tree):
         points to an already deleted node (orphaned entries).  A repeated
         call simply continues the work (idempotent).
 
+        The keys of the subtree are collected at once (see
+        :meth:`_collect_subtree_keys`); large subtrees are deleted in deferred
+        tasks (see :attr:`subtree_delete_defer_threshold`), keeping that order.
+
         Frozen carts belong to an order and cannot be removed.
 
         This also checks upfront whether the node is locked by a
@@ -584,6 +1554,13 @@ class Cart(ShopModuleAbstract, Tree):
         :raises errors.Locked: If the cart node is referenced by a
             PreventDeletion relation (e.g. an order).
         """
+        if self.is_guest_cart_key(cart_key):
+            skel = self.get_guest_cart_tree().root_skel
+            del self.session["guest_cart"]
+            current.session.get().markChanged()
+            self.clear_children_cache()
+            EVENT_SERVICE.call(Event.CART_CHANGED, skel=skel, deleted=True)
+            return
         skel = self.editSkel("node")
         if not skel.read(cart_key):
             raise errors.NotFound
@@ -599,8 +1576,12 @@ class Cart(ShopModuleAbstract, Tree):
                 .getEntry()
         ) is not None:
             raise errors.Locked("This entry is still referenced by other Skeletons, which prevents deleting!")
-        self._delete_children(cart_key)
-        skel.delete()
+        leaf_keys, node_keys = self._collect_subtree_keys(skel)
+        node_keys.append(skel["key"])  # the node itself last
+        self._delete_entries(
+            leaf_keys, node_keys, refresh_key=skel["parententry"], root_key=self._get_root_key(skel),
+        )
+        self.clear_children_cache()
         if skel["parententry"] is None or skel["is_root_node"]:
             logger.info(f"{skel['key']} was a root node!")
             # raise NotImplementedError("Cannot delete root node")
@@ -611,34 +1592,116 @@ class Cart(ShopModuleAbstract, Tree):
                 # current.session.get().markChanged()
         EVENT_SERVICE.call(Event.CART_CHANGED, skel=skel, deleted=True)
 
-    def _delete_children(self, parent_cart_key: db.Key) -> None:
+    def _collect_subtree_keys(
+        self,
+        node_skel: SkeletonInstance_T[CartNodeSkel],
+        *,
+        recursive: bool = True,
+    ) -> tuple[list[db.Key], list[db.Key]]:
+        """
+        Collect the keys of the leafs and nodes below a cart node.
+
+        The entries of the entire cart are fetched with one query per kind
+        via their ``parentrepo`` -- instead of two queries per node -- and
+        the subtree is resolved in memory.
+
+        :param node_skel: The cart node, it is not part of the result.
+        :param recursive: Collect the entire subtree or only the direct leafs.
+        :return: The keys of the leafs and of the nodes; the nodes are ordered
+            bottom-up, every node after all nodes below it.
         """
-        Delete all children of a cart node bottom-up and synchronously.
+        if not recursive:
+            query = self.viewSkel("leaf").all().filter("parententry =", node_skel["key"])
+            return [entity.key for entity in query.iter()], []
 
-        Leafs of *parent_cart_key* are deleted first, then each sub-node is
-        processed recursively (its own children before the sub-node itself).
+        if node_skel["is_root_node"] or not node_skel["parentrepo"]:
+            root_key = node_skel["key"]
+        else:
+            root_key = node_skel["parentrepo"]
+        child_leafs: dict[db.Key, list[db.Key]] = collections.defaultdict(list)
+        child_nodes: dict[db.Key, list[db.Key]] = collections.defaultdict(list)
+        for skel_type, children in (("leaf", child_leafs), ("node", child_nodes)):
+            for entity in self.viewSkel(skel_type).all().filter("parentrepo =", root_key).iter():
+                children[entity["parententry"]].append(entity.key)
+
+        leaf_keys: list[db.Key] = []
+        node_keys: list[db.Key] = []
+        seen_keys = {node_skel["key"]}
+
+        def collect(parent_key: db.Key) -> None:
+            leaf_keys.extend(child_leafs.get(parent_key, ()))
+            for key in child_nodes.get(parent_key, ()):
+                if key not in seen_keys:  # guard against broken (cyclic) data
+                    seen_keys.add(key)
+                    collect(key)
+                    node_keys.append(key)
+
+        collect(node_skel["key"])
+        return leaf_keys, node_keys
+
+    def _delete_entries(
+        self,
+        leaf_keys: list[db.Key],
+        node_keys: list[db.Key],
+        *,
+        refresh_key: db.Key | None = None,
+        root_key: db.Key | None = None,
+    ) -> None:
+        """
+        Delete cart entries: all leafs first, then the nodes in the given order.
 
-        Deliberately does not call the inherited :meth:`deleteRecursive` of
-        the Tree prototype: that method is ``@CallDeferred`` and only deletes
-        the children, while the node itself is deleted synchronously by the
-        caller right away (see :meth:`Tree.delete` / :meth:`cart_remove`).
-        If that deferred task gets lost (queue purge, crash, or the task
-        being pinned to an App Engine version that no longer exists), the
-        node is gone but its children survive it forever -- orphaned
-        entries whose broken ``parententry`` chain crashes price
-        computations and ``update_relations`` tasks later. Cart trees are
-        small (a handful of nodes/leafs), so there is no need to defer this
-        work at all; running it synchronously, bottom-up and before the
-        node itself is deleted removes the race entirely instead of just
-        narrowing it.
+        Above :attr:`subtree_delete_defer_threshold` entries the work is handed
+        over to :meth:`delete_entries_deferred`, so the request returns at once.
 
-        :param parent_cart_key: Key of the cart node whose subtree gets deleted.
+        :param refresh_key: Node whose materialized values must be refreshed afterward.
+        :param root_key: Root node of the cart, its version is bumped after each deletion.
         """
-        for leaf_skel in toolkit.iter_skel(self.editSkel("leaf").all().filter("parententry =", parent_cart_key)):
-            leaf_skel.delete()
-        for node_skel in toolkit.iter_skel(self.editSkel("node").all().filter("parententry =", parent_cart_key)):
-            self._delete_children(node_skel["key"])
-            node_skel.delete()
+        threshold = self.subtree_delete_defer_threshold
+        if threshold is not None and len(leaf_keys) + len(node_keys) > threshold:
+            logger.info(f"Deferring the deletion of {len(leaf_keys)} leafs and {len(node_keys)} nodes")
+            self.delete_entries_deferred(leaf_keys, node_keys, refresh_key, root_key)
+            return
+        self._delete_chunk(leaf_keys, node_keys)
+        self.refresh_materialized_values(refresh_key)
+        self.bump_cart_version(root_key)
+
+    @tasks.CallDeferred
+    def delete_entries_deferred(
+        self,
+        leaf_keys: list[db.Key],
+        node_keys: list[db.Key],
+        refresh_key: db.Key | None = None,
+        root_key: db.Key | None = None,
+    ) -> None:
+        """
+        Delete cart entries chunk by chunk, one chunk per deferred task (see :meth:`_delete_entries`).
+
+        Each task deletes :attr:`subtree_delete_chunk_size` entries and defers
+        the rest.  The order is kept across the tasks, so a node is deleted only
+        after its children: if the chain breaks, no orphaned entries are left
+        behind and removing the cart again continues the work.
+        """
+        size = self.subtree_delete_chunk_size
+        leaf_chunk, leaf_keys = leaf_keys[:size], leaf_keys[size:]
+        size -= len(leaf_chunk)
+        node_chunk, node_keys = node_keys[:size], node_keys[size:]
+        self._delete_chunk(leaf_chunk, node_chunk)
+        self.bump_cart_version(root_key)
+        if leaf_keys or node_keys:
+            self.delete_entries_deferred(leaf_keys, node_keys, refresh_key, root_key)
+        else:
+            self.refresh_materialized_values(refresh_key)
+
+    def _delete_chunk(self, leaf_keys: list[db.Key], node_keys: list[db.Key]) -> None:
+        # Each entry goes through Skeleton.delete, which cleans up the relations,
+        # unique values and blob locks of the entry.
+        for skel_type, keys in (("leaf", leaf_keys), ("node", node_keys)):
+            skel = self.editSkel(skel_type)
+            for key in keys:
+                try:
+                    skel.delete(key)
+                except ValueError:  # deleted meanwhile, e.g. by a retried task
+                    logger.debug(f"Cart entry {key=} doesn't exist (anymore)")
 
     def cart_clear(
         self,
@@ -646,6 +1709,20 @@ class Cart(ShopModuleAbstract, Tree):
         *,
         keep_sub_carts: bool = False,
     ) -> None:
+        """
+        Remove the children of a cart node.
+
+        :param cart_key: Key of the cart node to clear.
+        :param keep_sub_carts: Remove only the leafs directly below the
+            node and keep the sub-nodes (with their children).
+        """
+        if self.is_guest_cart_key(cart_key):
+            # A guest cart has no sub carts, only articles
+            self.session["guest_cart"]["articles"] = []
+            current.session.get().markChanged()
+            self.clear_children_cache()
+            EVENT_SERVICE.call(Event.CART_CHANGED, skel=self.get_guest_cart_tree().root_skel, cleared=True)
+            return
         cart_skel = self.editSkel("node")
         if not cart_skel.read(cart_key):
             raise errors.NotFound
@@ -655,15 +1732,198 @@ class Cart(ShopModuleAbstract, Tree):
                           default_variables={"cart_key": cart_key})
             )
 
-        for leaf_skel in toolkit.iter_skel(self.editSkel("leaf").all().filter("parententry =", cart_skel["key"])):
-            leaf_skel.delete()
+        leaf_keys, node_keys = self._collect_subtree_keys(cart_skel, recursive=not keep_sub_carts)
+        self._delete_entries(
+            leaf_keys, node_keys, refresh_key=cart_skel["key"], root_key=self._get_root_key(cart_skel),
+        )
+        self.clear_children_cache()
+        EVENT_SERVICE.call(Event.CART_CHANGED, skel=cart_skel, cleared=True)
+
+    # --- Cart versions (see cart_versions) -----------------------------------
 
-        if not keep_sub_carts:
-            for node_skel in toolkit.iter_skel(self.editSkel("node").all().filter("parententry =", cart_skel["key"])):
-                self.cart_clear(node_skel["key"], keep_sub_carts=keep_sub_carts)
-                node_skel.delete()
+    @staticmethod
+    def _cart_version_name(root_key: db.Key) -> str:
+        return f"cart-{root_key.id_or_name}"
 
-        EVENT_SERVICE.call(Event.CART_CHANGED, skel=cart_skel, cleared=True)
+    @staticmethod
+    def _get_root_key(skel: SkeletonInstance) -> db.Key:
+        """Get the key of the root node of a cart node or leaf"""
+        if ("is_root_node" in skel and skel["is_root_node"]) or not skel["parentrepo"]:
+            return skel["key"]
+        return skel["parentrepo"]
+
+    def bump_cart_version(self, *root_keys: db.Key | None) -> None:
+        """
+        Increase the version of carts, must be called after each cart mutation.
+
+        :param root_keys: Keys of the root nodes of the changed carts,
+            ``None`` values and guest carts are ignored.
+        """
+        if not self.cart_versions:
+            return
+        for root_key in dict.fromkeys(root_keys):
+            if root_key is not None and not self.is_guest_cart_key(root_key):
+                GENERATION_STORE.get().bump(self._cart_version_name(root_key))
+
+    def get_cart_etag(self, cart_key: db.Key) -> str | None:
+        """
+        Get the ETag of the current version of a cart.
+
+        The ETag covers the entire cart of the node.  For the basket it costs
+        a single read of the version counter, any other node is read before
+        to find its root node.  Guest carts are versioned by their content.
+
+        :param cart_key: Key of any node of the cart.
+        :return: The (weak) ETag or ``None`` if the versions are disabled or the cart doesn't exist.
+        """
+        if not self.cart_versions:
+            return None
+        if self.is_guest_cart_key(cart_key):
+            if (guest_cart := self._get_guest_cart(create_if_missing=False)) is None:
+                return None
+            version = utils.json.dumps(guest_cart)
+        else:
+            if cart_key == self.current_session_cart_key:
+                root_key = cart_key
+            elif (entity := db.Get(cart_key)) is None:
+                return None
+            elif entity.get("is_root_node") or not entity.get("parentrepo"):
+                root_key = cart_key
+            else:
+                root_key = entity["parentrepo"]
+            version = GENERATION_STORE.get().get(self._cart_version_name(root_key))
+        max_age = self.cart_etag_max_age
+        period = int(time.time() // max_age.total_seconds()) if max_age else 0
+        digest = hashlib.sha256(f"{cart_key}|{version}|{period}|{current.language.get()}".encode()).hexdigest()
+        return f'W/"{digest[:32]}"'
+
+    # --- Render cache of frozen carts ---------------------------------------
+
+    @functools.cached_property
+    def _frozen_render_cache(self) -> cachetools.TTLCache | None:
+        if self.frozen_render_cache_maxsize <= 0:
+            return None
+        return cachetools.TTLCache(
+            maxsize=self.frozen_render_cache_maxsize,
+            ttl=self.frozen_render_cache_ttl.total_seconds(),
+        )
+
+    def _get_frozen_render_key(self, cart_key: db.Key, view: FrozenRenderView) -> db.Key:
+        return db.Key(
+            self.frozen_render_cache_kind,
+            f"{view}-{current.language.get()}-{cart_key.to_legacy_urlsafe().decode()}",
+        )
+
+    def get_frozen_render(
+        self,
+        cart_key: db.Key,
+        view: FrozenRenderView,
+        *,
+        node_skel: SkeletonInstance_T[CartNodeSkel] | None = None,
+    ) -> str | None:
+        """
+        Get the rendered JSON of a frozen cart from the render cache.
+
+        Without *node_skel* only the in-memory tier is consulted, which costs
+        no datastore access.  The persistent tier is read only for a node
+        known to be frozen, so live carts never pay for it.
+
+        Hits are served with the same rule as :meth:`canView`: to users with
+        view access to the module, for the available root nodes of the
+        current session and for the carts of orders the user can view.
+
+        :param cart_key: Key of the (sub-)cart node.
+        :param view: The rendered view.
+        :param node_skel: The skeleton of the node, if already read.
+        :return: The rendered JSON or ``None`` on a cache miss.
+        """
+        if (cache := self._frozen_render_cache) is None or self.is_guest_cart_key(cart_key):
+            return None
+        render_key = self._get_frozen_render_key(cart_key, view)
+        with lock_frozen_render_cache:
+            entry = cache.get(render_key)
+        if (
+            entry is None
+            and self.frozen_render_cache_persistent
+            and node_skel is not None
+            and node_skel["is_frozen"]
+        ):
+            if (entity := db.Get(render_key)) is not None:
+                entry = (entity["root"], entity["json"])
+                with lock_frozen_render_cache:
+                    cache[render_key] = entry
+        if entry is None:
+            return None
+        root_key, rendered = entry
+        if not self._can_view_frozen_root(root_key):
+            return None
+        return rendered
+
+    def _can_view_frozen_root(self, root_key: db.Key) -> bool:
+        """The rule of :meth:`canView` for an entry of the cart, without reading the entry"""
+        if self.listFilter(self.viewSkel("node").all()) is not None:
+            return True
+        available_root_keys = {self.current_session_cart_key}
+        if user := current.user.get():
+            available_root_keys.update(wishlist["key"] for wishlist in user["wishlist"] or ())
+        return root_key in available_root_keys or self.is_viewable_order_cart(root_key)
+
+    def set_frozen_render(
+        self,
+        cart_key: db.Key,
+        view: FrozenRenderView,
+        rendered: str,
+        *,
+        node_skel: SkeletonInstance_T[CartNodeSkel],
+    ) -> bool:
+        """
+        Put the rendered JSON of a cart into the render cache, if the cart is frozen.
+
+        :param cart_key: Key of the (sub-)cart node.
+        :param view: The rendered view.
+        :param rendered: The rendered JSON.
+        :param node_skel: The skeleton of the node, as read for the rendering.
+        :return: Whether the rendered JSON has been cached.
+        """
+        if (cache := self._frozen_render_cache) is None or self.is_guest_cart_key(cart_key):
+            return False
+        if not node_skel["is_frozen"]:
+            return False
+        render_key = self._get_frozen_render_key(cart_key, view)
+        root_key = self._get_root_key(node_skel)
+        with lock_frozen_render_cache:
+            # get_frozen_render() has taken over an existing persistent entry into the memory tier
+            is_stored = render_key in cache
+            cache[render_key] = (root_key, rendered)
+        # An entity can hold up to 1 MiB
+        if self.frozen_render_cache_persistent and not is_stored and len(rendered) < 1_000_000:
+            entity = db.Entity(render_key, exclude_from_indexes={"json"})
+            entity["cart"] = cart_key
+            entity["root"] = root_key
+            entity["json"] = rendered
+            entity["creationdate"] = utils.utcNow()
+            db.Put(entity)
+        return True
+
+    def clear_frozen_render(self, *root_keys: db.Key | None) -> None:
+        """
+        Drop the rendered JSON (all nodes, views and languages) of carts from the render cache.
+
+        The persistent tier is cleared for all instances, the in-memory tier
+        only in this process (see :attr:`frozen_render_cache_ttl`).
+
+        :param root_keys: Keys of the root nodes of the carts, ``None`` values are ignored.
+        """
+        if (cache := self._frozen_render_cache) is None:
+            return
+        root_keys = set(filter(None, root_keys))
+        with lock_frozen_render_cache:
+            for render_key in [key for key, (root_key, _) in cache.items() if root_key in root_keys]:
+                cache.pop(render_key, None)
+        if self.frozen_render_cache_persistent:
+            for root_key in root_keys:
+                while entities := db.Query(self.frozen_render_cache_kind).filter("root =", root_key).run(100):
+                    db.Delete([entity.key for entity in entities])
 
     # --- Hooks ---------------------------------------------------------------
 
@@ -744,28 +2004,58 @@ class Cart(ShopModuleAbstract, Tree):
     ) -> SkeletonInstance_T[CartNodeSkel]:
         """Freeze (lock) cart values and children items.
 
+        The cart tree is loaded once, the snapshots (``frozen_values``) of all
+        nodes and leafs are computed from it in memory and then all entries
+        are written, in transactions of :attr:`freeze_transaction_chunk_size`
+        entries: first the leafs, then the nodes bottom-up, the node itself last.
+
         :param cart_key: Key of the (sub-)cart skeleton.
         :return: The frozen CartNode skeleton.
         """
-        # Iterate the children without a fetch limit: a partially frozen
+        # Load the entire tree (without a fetch limit): a partially frozen
         # cart would keep recomputing (and thereby changing) the totals of
         # the unfrozen entries after the order has been placed.
-        child: SkeletonInstance_T[CartNodeSkel | CartItemSkel]
-        for skel_type in ("node", "leaf"):
-            for child in toolkit.iter_skel(
-                self.viewSkel(skel_type).all().filter("parententry =", cart_key)
-            ):
-                if skel_type == "node":
-                    self.freeze_cart(child["key"])
-                else:
-                    self.freeze_leaf(child)
-
         self.clear_children_cache()
+        if (tree := self.get_cart_tree(cart_key)) is None:
+            raise errors.NotFound(f"Cart {cart_key} does not exist")
+        cart_skel = tree.get_node(cart_key)
+
+        nodes: list[SkeletonInstance_T[CartNodeSkel]] = []
+        leafs: list[SkeletonInstance_T[CartItemSkel]] = []
+        for child in tree.iter_subtree(cart_key):
+            if child["key"] in tree.leafs:
+                leafs.append(child)
+            else:
+                nodes.append(child)
+        nodes.reverse()  # pre-order reversed: every node after all nodes below it
+        nodes.append(cart_skel)
+
+        # Compute all snapshots before changing any entry, every computation sees the live cart
+        node_values = [self._get_frozen_node_values(skel) for skel in nodes]
+        for skel in leafs:
+            self._set_frozen_leaf_values(skel)
+        for skel, frozen_values in zip(nodes, node_values):
+            skel["frozen_values"] = frozen_values
+            skel["is_frozen"] = True
+
+        skels = [*leafs, *nodes]
+        if not (size := self.freeze_transaction_chunk_size):
+            for skel in skels:
+                skel.write()
+        else:
+            for start in range(0, len(skels), size):
+                db.RunInTransaction(self._write_skels_txn, skels[start:start + size])
+        self.clear_children_cache()
+        self.bump_cart_version(self._get_root_key(cart_skel))
+        return cart_skel  # type: ignore
 
-        cart_skel = self.editSkel("node")
-        assert cart_skel.read(cart_key)
+    @staticmethod
+    def _write_skels_txn(skels: list[SkeletonInstance]) -> None:
+        for skel in skels:
+            skel.write()
 
-        cart_skel["frozen_values"] = {
+    def _get_frozen_node_values(self, cart_skel: SkeletonInstance_T[CartNodeSkel]) -> dict[str, t.Any]:
+        return {
             "total": cart_skel["total"],
             "total_raw": cart_skel["total_raw"],
             "total_discount_price": cart_skel["total_discount_price"],
@@ -780,20 +2070,114 @@ class Cart(ShopModuleAbstract, Tree):
             ),
             "discount": make_json_dumpable(cart_skel["discount"]),
         }
-        cart_skel["is_frozen"] = True
-        cart_skel.write()
-        return cart_skel  # type: ignore
 
-    def freeze_leaf(self, leaf_skel: SkeletonInstance_T[CartItemSkel]):
+    def _set_frozen_leaf_values(self, leaf_skel: SkeletonInstance_T[CartItemSkel]) -> SkeletonInstance_T[CartItemSkel]:
         leaf_skel = self.copy_article_values(leaf_skel.article_skel_full, leaf_skel)
         leaf_skel["frozen_values"] = {
             "price": leaf_skel["price"],
             "shipping": leaf_skel["shipping"],
         }
         leaf_skel["is_frozen"] = True
+        return leaf_skel
+
+    def freeze_leaf(self, leaf_skel: SkeletonInstance_T[CartItemSkel]):
+        leaf_skel = self._set_frozen_leaf_values(leaf_skel)
         leaf_skel.write()
         return leaf_skel
 
+    def refresh_materialized_values(self, *node_keys: db.Key | None) -> None:
+        """
+        Recompute and store the materialized values of cart nodes and all their ancestors.
+
+        Called after each cart mutation, does nothing unless :attr:`materialize_totals`
+        is enabled.  Only the nodes on the ``parententry`` chains of the given nodes
+        are recomputed, all other sub-nodes contribute their stored values.
+        The nodes are recomputed entirely instead of adding up deltas, since
+        discounts and shipping costs are not linear.
+
+        :param node_keys: Keys of the changed nodes, ``None`` values are ignored.
+        """
+        if not self.materialize_totals:
+            return
+        self.clear_children_cache()
+        node_keys = [key for key in node_keys if key is not None]
+        if not node_keys or (tree := self.get_cart_tree(node_keys[0])) is None:
+            return
+
+        chain: dict[db.Key, SkeletonInstance_T[CartNodeSkel]] = {}
+        for key in node_keys:
+            while key in tree.nodes and key not in chain:
+                chain[key] = tree.nodes[key]
+                key = chain[key]["parententry"]
+
+        # Invalidate first, so the chain is computed live, but based on the siblings' stored values
+        for node_skel in chain.values():
+            node_skel["materialized_values"] = None
+        for node_skel in chain.values():
+            if node_skel["is_frozen"]:
+                continue
+            self._write_materialized_values(node_skel)
+        self.clear_children_cache()
+
+    def _write_materialized_values(self, node_skel: SkeletonInstance_T[CartNodeSkel]) -> None:
+        values = {
+            "total": node_skel["total"],
+            "total_raw": node_skel["total_raw"],
+            "total_discount_price": node_skel["total_discount_price"],
+            "vat": node_skel["vat"],
+            "total_quantity": node_skel["total_quantity"],
+            "timestamp": time.time(),
+        }
+        shipping = node_skel["shipping"]
+        shipping_status = node_skel["shipping_status"]
+
+        def set_values(skel: SkeletonInstance_T[CartNodeSkel]) -> None:
+            skel["materialized_values"] = values
+            if shipping_status != ShippingStatus.USER:
+                # Persist the computed shipping, it's used as long as the values are valid
+                skel["shipping"] = shipping
+
+        toolkit.set_status(
+            key=node_skel["key"],
+            skel=self.editSkel("node", sub_skel="materialized"),
+            values=set_values,
+        )
+
+    def check_materialized_values(self, root_key: db.Key) -> list[db.Key]:
+        """
+        Compare the materialized values of a cart with a live computation.
+
+        :param root_key: Key of the root node of the cart.
+        :return: Keys of all nodes whose materialized values are outdated.
+        """
+        self.clear_children_cache()
+        if (tree := self.get_cart_tree(root_key)) is None:
+            return []
+        stored = {key: node_skel["materialized_values"] for key, node_skel in tree.nodes.items()}
+        for node_skel in tree.nodes.values():
+            node_skel["materialized_values"] = None
+        outdated = []
+        for key, node_skel in tree.nodes.items():
+            if node_skel["is_frozen"] or not stored[key]:
+                continue
+            if any(
+                # normalize the live values the same way as the JsonBone stores them
+                stored[key].get(bone_name) != utils.json.loads(utils.json.dumps(node_skel[bone_name]))
+                for bone_name in ("total", "total_raw", "total_discount_price", "vat", "total_quantity")
+            ):
+                outdated.append(key)
+        self.clear_children_cache()
+        return outdated
+
+    @tasks.CallDeferred
+    def repair_materialized_values(self, root_key: db.Key) -> None:
+        """Recompute the materialized values of all nodes of a cart (deferred)"""
+        if not self.materialize_totals:
+            return
+        if outdated := self.check_materialized_values(root_key):
+            logger.warning(f"Repairing outdated materialized values of {outdated=}")
+            self.refresh_materialized_values(*outdated)
+
     # -------------------------------------------------------------------------
 
     def get_discount_for_leaf(
@@ -848,6 +2232,9 @@ class Cart(ShopModuleAbstract, Tree):
         EVENT_SERVICE.call(Event.CART_CHANGED, skel=new_parent_skel, deleted=False)
         leaf_skel["parententry"] = new_parent_skel["key"]
         leaf_skel.write()
+        self.clear_children_cache()
+        self.refresh_materialized_values(new_parent_skel["key"])
+        self.bump_cart_version(leaf_skel["parentrepo"])
         EVENT_SERVICE.call(Event.ARTICLE_CHANGED, skel=leaf_skel, deleted=False)
         return new_parent_skel
 
@@ -862,6 +2249,9 @@ class Cart(ShopModuleAbstract, Tree):
         """
         cache = current.request_data.get().setdefault("shop_cache_cart_skel", {})
         key = db.keyHelper(key, CartNodeSkel.kindName)
+        for tree in current.request_data.get().get("shop_cache_cart_tree", {}).values():
+            if (node_skel := tree.get_node(key)) is not None:
+                return node_skel
         try:
             parent_skel = cache[key]
         except KeyError:
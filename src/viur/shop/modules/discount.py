@@ -1,9 +1,8 @@
+import datetime
+import functools
 import io
-import threading
 import typing as t  # noqa
 
-import cachetools
-
 from viur.core import db, errors
 from viur.core.prototypes import List
 from viur.core.skeleton import SkeletonInstance
@@ -11,19 +10,22 @@ from viur.shop import DEBUG_DISCOUNTS
 from viur.shop.types import *
 from .abstract import ShopModuleAbstract
 from ..globals import MAX_FETCH_LIMIT, SHOP_LOGGER
+from ..services import VersionedCache
 from ..skeletons import CartItemSkel, DiscountSkel
 from ..types.dc_scope import DiscountValidator
 
 logger = SHOP_LOGGER.getChild(__name__)
 
-lock_current_automatically_discounts = threading.Lock()
-"""Lock to make the current_automatically_discounts cache thread-safe"""
+DISCOUNT_CACHE_NAME: t.Final[str] = "discount"
+"""Generation name of all caches which depend on discounts and discount conditions"""
 
 
 class Discount(ShopModuleAbstract, List):
     moduleName = "discount"
     kindName = "{{viur_shop_modulename}}_discount"
 
+    _automatically_discount_index: AutomaticallyDiscountIndex | None = None
+
     def adminInfo(self) -> dict:
         admin_info = super().adminInfo()
         admin_info["icon"] = "percent"
@@ -41,6 +43,22 @@ class Discount(ShopModuleAbstract, List):
         ]
         return admin_info
 
+    def onAdded(self, skel: SkeletonInstance):
+        super().onAdded(skel)
+        self.invalidate_caches()
+
+    def onEdited(self, skel: SkeletonInstance):
+        super().onEdited(skel)
+        self.invalidate_caches()
+
+    def onDeleted(self, skel: SkeletonInstance):
+        super().onDeleted(skel)
+        self.invalidate_caches()
+
+    def onCloned(self, skel: SkeletonInstance, src_skel: SkeletonInstance):
+        super().onCloned(skel, src_skel)
+        self.invalidate_caches()
+
     # --- Apply logic ---------------------------------------------------------
 
     def search(
@@ -92,7 +110,7 @@ class Discount(ShopModuleAbstract, List):
             raise InvalidArgumentException("code", code)
         if discount_key is not None and not discount_key:
             raise InvalidArgumentException("discount_key", discount_key)
-        cart_key = self.shop.cart.current_session_cart_key  # TODO: parameter?
+        cart_key = self.shop.cart.resolve_cart_key(self.shop.cart.current_session_cart_key)  # TODO: parameter?
         if cart_key is None:
             raise errors.PreconditionFailed("No basket created yet for this session")
 
@@ -243,9 +261,30 @@ class Discount(ShopModuleAbstract, List):
 
         return dv.is_fulfilled, dv
 
+    @functools.cached_property
+    def _current_automatically_discounts_cache(self) -> VersionedCache[list[SkeletonInstance_T[DiscountSkel]]]:
+        return VersionedCache(
+            DISCOUNT_CACHE_NAME,
+            self._load_current_automatically_discounts,
+            # The prevalidation depends on the current date too
+            ttl=datetime.timedelta(hours=1),
+        )
+
     @property
-    @cachetools.cached(cache=cachetools.TTLCache(maxsize=1024, ttl=3600), lock=lock_current_automatically_discounts)
     def current_automatically_discounts(self) -> list[SkeletonInstance_T[DiscountSkel]]:
+        """
+        All automatically discounts, which are (or will be soon) active.
+
+        The list is cached in the process until any discount or discount
+        condition has been changed in any instance (see :meth:`invalidate_caches`).
+        """
+        return self._current_automatically_discounts_cache.get()
+
+    def invalidate_caches(self) -> None:
+        """Invalidate all cached discounts and discount conditions in all instances"""
+        self._current_automatically_discounts_cache.invalidate()
+
+    def _load_current_automatically_discounts(self) -> list[SkeletonInstance_T[DiscountSkel]]:
         query = self.viewSkel().all().filter("activate_automatically =", True)
         discounts = []
         for skel in query.fetch(MAX_FETCH_LIMIT):
@@ -256,13 +295,27 @@ class Discount(ShopModuleAbstract, List):
         logger.debug(f'current_automatically_discounts {discounts=}')
         return discounts
 
+    @property
+    def automatically_discount_index(self) -> AutomaticallyDiscountIndex:
+        """
+        The :attr:`current_automatically_discounts` compiled into an index.
+
+        The index is rebuilt whenever the cached list of the
+        :attr:`current_automatically_discounts` has been renewed.
+        """
+        discounts = self.current_automatically_discounts
+        index = self._automatically_discount_index
+        if index is None or index.discounts is not discounts:
+            index = self._automatically_discount_index = AutomaticallyDiscountIndex(discounts)
+        return index
+
     def remove(
         self,
         discount_key: db.Key,
     ) -> t.Any:
         if not isinstance(discount_key, db.Key):
             raise TypeError(f"discount_key must be an instance of db.Key")
-        cart_key = self.shop.cart.current_session_cart_key  # TODO: parameter?
+        cart_key = self.shop.cart.resolve_cart_key(self.shop.cart.current_session_cart_key)  # TODO: parameter?
 
         discount_skel = self.viewSkel()
 
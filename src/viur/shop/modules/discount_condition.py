@@ -10,8 +10,9 @@ from viur.core import db, tasks
 from viur.core.prototypes import List
 from viur.core.skeleton import SkeletonInstance
 from .abstract import ShopModuleAbstract
+from .discount import DISCOUNT_CACHE_NAME
 from ..globals import MAX_FETCH_LIMIT, SHOP_INSTANCE, SHOP_LOGGER
-from ..services import Event, on_event
+from ..services import Event, VersionedCache, on_event
 from ..types import CodeType, SkeletonInstance_T
 
 if t.TYPE_CHECKING:
@@ -26,6 +27,12 @@ SUFFIX_LENGTH = 6
 lock_get_skel = threading.Lock()
 """Lock to make the get_skel cache thread-safe"""
 
+get_skel_cache: VersionedCache[cachetools.TTLCache] = VersionedCache(
+    DISCOUNT_CACHE_NAME,
+    lambda: cachetools.TTLCache(maxsize=1024, ttl=3600),
+)
+"""Cache of :meth:`DiscountCondition.get_skel`, renewed when any discount (condition) changes"""
+
 
 class DiscountCondition(ShopModuleAbstract, List):
     moduleName = "discount_condition"
@@ -92,16 +99,23 @@ class DiscountCondition(ShopModuleAbstract, List):
 
     def onAdded(self, skel: SkeletonInstance):
         super().onAdded(skel)
+        self.shop.discount.invalidate_caches()
         self.on_changed(skel, "added")
 
     def onEdited(self, skel: SkeletonInstance):
         super().onEdited(skel)
+        self.shop.discount.invalidate_caches()
         self.on_changed(skel, "edited")
 
     def onCloned(self, skel: SkeletonInstance, src_skel: SkeletonInstance):
         super().onCloned(skel, src_skel)
+        self.shop.discount.invalidate_caches()
         self.on_changed(skel, "cloned")
 
+    def onDeleted(self, skel: SkeletonInstance):
+        super().onDeleted(skel)
+        self.shop.discount.invalidate_caches()
+
     def on_change(self, skel: SkeletonInstance, event: str) -> None:
         # logger.debug(pprint.pformat(skel, width=120))
         ...
@@ -158,12 +172,19 @@ class DiscountCondition(ShopModuleAbstract, List):
     # --- Helpers  ------------------------------------------------------------
 
     @classmethod
-    @cachetools.cached(cache=cachetools.TTLCache(maxsize=1024, ttl=3600), lock=lock_get_skel)
     def get_skel(cls, key: db.Key) -> SkeletonInstance_T["DiscountConditionSkel"] | None:
+        cache = get_skel_cache.get()
+        with lock_get_skel:
+            try:
+                return cache[key]
+            except KeyError:
+                pass
         # logger.debug(f"get_skel({key=})")
         skel = SHOP_INSTANCE.get().discount_condition.viewSkel()
         if not skel.read(key):
-            return None
+            skel = None
+        with lock_get_skel:
+            cache[key] = skel
         return skel  # type: ignore
 
     # --- Apply logic ---------------------------------------------------------
@@ -190,10 +211,13 @@ class DiscountCondition(ShopModuleAbstract, List):
         # TODO: collect used from price and automatically as well
         return discounts
 
-    @on_event(Event.ORDER_ORDERED)
+    @on_event(Event.ORDER_ORDERED, mode="deferred")
     @staticmethod
     def mark_discount_used(order_skel: SkeletonInstance_T["OrderSkel"], payment, *args, **kwargs) -> None:
-        """Increase quantity_used on discount of an ordered cart"""
+        """Increase quantity_used on discount of an ordered cart
+
+        Runs deferred, so it doesn't add to the latency of the checkout.
+        """
         logger.info(f"Calling mark_discount_used with {order_skel=} {payment=}")
         self = SHOP_INSTANCE.get().discount_condition
         discounts = self.get_discounts_from_cart(order_skel["cart"]["dest"]["key"])
@@ -1,16 +1,16 @@
+import functools
 import logging
-import time
 import typing as t  # noqa
 
 from viur import toolkit
-from viur.core import current, db, errors as core_errors, exposed, force_post
+from viur.core import current, db, errors as core_errors, exposed, force_post, utils
 from viur.core.prototypes import List
 from viur.shop.types import *
 from viur.shop.types.results import PaymentProviderResult
 from .abstract import ShopModuleAbstract
 from ..globals import SENTINEL, SHOP_LOGGER
 from ..payment_providers import PaymentProviderAbstract
-from ..services import EVENT_SERVICE, Event, HOOK_SERVICE, Hook
+from ..services import EVENT_SERVICE, Event, HOOK_SERVICE, Hook, SequenceAllocator
 from ..skeletons.order import OrderSkel
 from ..types import error_handler, exceptions as e
 
@@ -26,6 +26,22 @@ class Order(ShopModuleAbstract, List):
 
     reference_user_created_skeletons_in_session = True
 
+    order_uid_format: str = "{number:08d}"
+    """Format of the order numbers assigned by :meth:`_default_assign_uid`.
+
+    Formatted with ``number`` (the unique number) and ``now`` (the current
+    datetime), e.g. ``"SO-{now:%Y}-{number:08d}"``."""
+
+    order_uid_shards: int = 8
+    """Number of counter entities of the order numbers (see :class:`SequenceAllocator`).
+
+    Must never be changed once order numbers have been assigned."""
+
+    order_uid_block_size: int = 20
+    """Number of order numbers each instance allocates at once (see :class:`SequenceAllocator`).
+
+    Must never be changed once order numbers have been assigned."""
+
     def adminInfo(self) -> dict:
         admin_info = super().adminInfo()
         return admin_info | {
@@ -132,6 +148,8 @@ class Order(ShopModuleAbstract, List):
             raise TypeError(f"billing_address_key must be an instance of db.Key")
         if customer_key is not SENTINEL and not isinstance(customer_key, (db.Key, type(None))):
             raise TypeError(f"customer_key must be an instance of db.Key")
+        # A guest cart stored in the session must become entities to be ordered
+        cart_key = self.shop.cart.resolve_cart_key(cart_key)
         skel = self.addSkel()
         cart_skel = self.shop.cart.viewSkel("node")
         if not self.shop.cart.is_valid_node(cart_key, root_node=True):
@@ -355,6 +373,15 @@ class Order(ShopModuleAbstract, List):
 
         return order_skel
 
+    @functools.cached_property
+    def order_uid_sequence(self) -> SequenceAllocator:
+        """The sequence of the order numbers"""
+        return SequenceAllocator(
+            f"{self.shop.name}_order_uid",
+            shards=self.order_uid_shards,
+            block_size=self.order_uid_block_size,
+        )
+
     def _default_assign_uid(
         self,
         order_skel: "SkeletonInstance",
@@ -362,15 +389,15 @@ class Order(ShopModuleAbstract, List):
         """Default order assign id method.
 
         Called as default/fallback for :attr:`Hook.ORDER_ASSIGN_UID`.
+        Assigns the next number of :attr:`order_uid_sequence`, formatted
+        with :attr:`order_uid_format`.
         """
+        order_uid = self.order_uid_format.format(number=self.order_uid_sequence.next(), now=utils.utcNow())
         order_skel = toolkit.set_status(
             key=order_skel["key"],
             skel=order_skel,
             values={
-                "order_uid": "".join(
-                    f"-{c}" if i % 4 == 0 else c
-                    for i, c in enumerate(str(time.time()).replace(".", ""))
-                ).strip("-"),
+                "order_uid": order_uid,
             },
         )
         return order_skel
@@ -1,4 +1,3 @@
-import collections
 import itertools
 import typing as t
 
@@ -81,7 +80,9 @@ class Shipping(ShopModuleAbstract, List):
         """
         if not ((cart_key is SENTINEL) ^ (cart_skel is SENTINEL)):
             raise ValueError("You must provide cart_key xor cart_skel")
-        if cart_key is not SENTINEL:
+        if cart_key is not SENTINEL and self.shop.cart.is_guest_cart_key(cart_key):
+            cart_skel = self.shop.cart.get_guest_cart_tree().root_skel
+        elif cart_key is not SENTINEL:
             cart_skel = self.shop.cart.viewSkel("node")
             if not cart_skel.read(cart_key):
                 raise errors.NotFound
@@ -89,20 +90,12 @@ class Shipping(ShopModuleAbstract, List):
             assert cart_skel is not SENTINEL
             cart_key = cart_skel["key"]
 
-        if use_cache:
-            get_children = self.shop.cart.get_children_from_cache
-        else:
-            get_children = self.shop.cart.get_children
-
         all_shipping_configs: list[RefSkel] = []
-        # Walk down the entire cart tree and collect leafs in
-        # `all_shipping_configs` and add nodes to the `node_queue`.
-        node_queue = collections.deque([cart_key])
-        while node_queue:
-            for child in get_children(node_queue.pop()):
-                if issubclass(child.skeletonCls, CartNodeSkel):
-                    node_queue.append(child["key"])
-                elif child.article_skel["shop_shipping_config"] is not None:
+        # Collect the leafs of the entire (sub-)cart tree in `all_shipping_configs`.
+        # The tree is loaded at once, with use_cache it's shared with the other computations.
+        if (tree := self.shop.cart.get_cart_tree(cart_key, use_cache=use_cache)) is not None:
+            for child in tree.iter_leafs(cart_key):
+                if child.article_skel["shop_shipping_config"] is not None:
                     all_shipping_configs.append(child.article_skel["shop_shipping_config"]["dest"])
 
         # logger.debug(f"(before de-duplication) <{len(all_shipping_configs)}>{all_shipping_configs=}")
@@ -1,15 +1,28 @@
+import dataclasses
 import functools
 
 from viur.core.prototypes import List
+from viur.core.skeleton import SkeletonInstance
 from .abstract import ShopModuleAbstract
 from ..globals import MAX_FETCH_LIMIT, SHOP_LOGGER
-from ..services import HOOK_SERVICE, Hook
+from ..services import HOOK_SERVICE, Hook, VersionedCache
 from ..types import VatRateCategory
 from ..types.exceptions import ConfigurationError
 
 logger = SHOP_LOGGER.getChild(__name__)
 
 
+@dataclasses.dataclass(frozen=True, slots=True)
+class VatRateTable:
+    """All configured vat rates"""
+
+    rates: dict[tuple[str, VatRateCategory], float]
+    """Percentage by (country, category)"""
+
+    countries: frozenset[str]
+    """Countries with a vat rate configuration"""
+
+
 class VatRate(ShopModuleAbstract, List):
     moduleName = "vat_rate"
     kindName = "{{viur_shop_modulename}}_vat_rate"
@@ -21,28 +34,61 @@ class VatRate(ShopModuleAbstract, List):
         admin_info["icon"] = "cash-stack"
         return admin_info
 
+    def onAdded(self, skel: SkeletonInstance):
+        super().onAdded(skel)
+        self._vat_rate_table_cache.invalidate()
+
+    def onEdited(self, skel: SkeletonInstance):
+        super().onEdited(skel)
+        self._vat_rate_table_cache.invalidate()
+
+    def onDeleted(self, skel: SkeletonInstance):
+        super().onDeleted(skel)
+        self._vat_rate_table_cache.invalidate()
+
+    def onCloned(self, skel: SkeletonInstance, src_skel: SkeletonInstance):
+        super().onCloned(skel, src_skel)
+        self._vat_rate_table_cache.invalidate()
+
     @functools.cached_property
-    def vat_rates(self):
-        """Cache the vat rates
-
-        Since this configuration will not change much,
-        we cache the whole thing persistently within the instance.
-        So after changing the VAT rates, the instance would have to be
-        restarted -- or someone would have to create a pull request
-        with an alternative solution.
+    def _vat_rate_table_cache(self) -> VersionedCache[VatRateTable]:
+        return VersionedCache("vat_rate", self._load_vat_rate_table)
+
+    def _load_vat_rate_table(self) -> VatRateTable:
+        rates = {}
+        countries = set()
+        for skel in self.viewSkel().all().fetch(MAX_FETCH_LIMIT):
+            countries.add(skel["country"])
+            for cfg in skel["configuration"]:
+                rates[(skel["country"], cfg["category"])] = cfg["percentage"]
+        return VatRateTable(rates=rates, countries=frozenset(countries))
+
+    @property
+    def vat_rate_table(self) -> VatRateTable:
         """
-        return {
-            skel["country"]: {
-                cfg["category"]: cfg["percentage"]
-                for cfg in skel["configuration"]
-            }
-            for skel in self.viewSkel().all().fetch(MAX_FETCH_LIMIT)
-        }
+        The configured vat rates.
+
+        The table is cached in the process and reloaded in all
+        instances after any vat rate has been changed.
+        """
+        return self._vat_rate_table_cache.get()
+
+    @property
+    def vat_rates(self) -> dict[str, dict[VatRateCategory, float]]:
+        """The configured vat rates as ``{country: {category: percentage}}``"""
+        vat_rates = {country: {} for country in self.vat_rate_table.countries}
+        for (country, category), percentage in self.vat_rate_table.rates.items():
+            vat_rates[country][category] = percentage
+        return vat_rates
 
     @functools.cached_property
     def _vat_skel(self):
         return self.viewSkel()
 
+    @functools.cached_property
+    def _valid_countries(self) -> frozenset[str]:
+        return frozenset(self._vat_skel.country.values)
+
     def get_vat_rate_for_country(
         self,
         *,
@@ -54,13 +100,15 @@ class VatRate(ShopModuleAbstract, List):
             raise TypeError(f"{category!r} is not a VatRateCategory")
         if country is None:
             country = HOOK_SERVICE.dispatch(Hook.CURRENT_COUNTRY)("vat_rate")
-        if country not in self._vat_skel.country.values:
-            raise ValueError(f"Invalid country code {country}")
-        if country not in self.vat_rates:
-            raise ConfigurationError(f"VatRate Skeleton missing for {country=}")
+        table = self.vat_rate_table
         try:
-            return self.vat_rates[country][category]
+            return table.rates[(country, category)]
         except KeyError:
-            if category == VatRateCategory.ZERO:
-                return 0.0
-            raise ConfigurationError(f"VatRate configuration missing for {country=} and {category=}")
+            pass
+        if country not in self._valid_countries:
+            raise ValueError(f"Invalid country code {country}")
+        if country not in table.countries:
+            raise ConfigurationError(f"VatRate Skeleton missing for {country=}")
+        if category == VatRateCategory.ZERO:
+            return 0.0
+        raise ConfigurationError(f"VatRate configuration missing for {country=} and {category=}")
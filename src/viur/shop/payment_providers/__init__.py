@@ -1,31 +1,58 @@
+import importlib
+import importlib.util
+import time
+import typing as t
+
 from .abstract import PaymentProviderAbstract
 from .amazon_pay import AmazonPay
 from .invoice import Invoice
 from .prepayment import PrePayment, Prepayment
+from ..globals import SHOP_LOGGER
+
+logger = SHOP_LOGGER.getChild(__name__)
+
+__all__ = [
+    "AmazonPay",
+    "Invoice",
+    "PaymentProviderAbstract",
+    "PrePayment",
+    "Prepayment",
+]
+
+# The providers based on an SDK of an optional extra are imported lazily on first access,
+# so deployments which don't use them don't pay for the SDK imports on every cold start.
+# They're not part of __all__, otherwise a star import would import them again.
+_LAZY_PROVIDERS: t.Final[dict[str, tuple[str, str, str]]] = {
+    # name: (module, SDK package, extra)
+    "UnzerAbstract": (".unzer_abstract", "unzer", "unzer"),
+    "UnzerApplepay": (".unzer_applepay", "unzer", "unzer"),
+    "UnzerBancontact": (".unzer_bancontact", "unzer", "unzer"),
+    "UnzerCard": (".unzer_card", "unzer", "unzer"),
+    "UnzerGooglepay": (".unzer_googlepay", "unzer", "unzer"),
+    "UnzerIdeal": (".unzer_ideal", "unzer", "unzer"),
+    "UnzerKlarna": (".unzer_klarna", "unzer", "unzer"),
+    "UnzerPaylaterInvoice": (".unzer_paylater_invoice", "unzer", "unzer"),
+    "UnzerPayPal": (".unzer_paypal", "unzer", "unzer"),
+    "UnzerSofort": (".unzer_sofort", "unzer", "unzer"),
+    "PayPalCheckout": (".paypal_checkout", "paypalserversdk", "paypal"),
+}
+
+
+def __getattr__(name: str) -> t.Any:
+    try:
+        module_name, sdk, extra = _LAZY_PROVIDERS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    if importlib.util.find_spec(sdk) is None:
+        # Like an unknown name, so hasattr() and optional imports keep working
+        raise AttributeError(f"{name} requires the {extra} extra (viur-shop[{extra}])")
+    start = time.perf_counter()
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    logger.debug(f"Imported {name} from {module_name} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    globals()[name] = value
+    return value
+
 
-try:
-    import unzer
-except ImportError:
-    # The unzer extra was not enabled, we don't import the related providers
-    ...
-else:
-    del unzer
-    from .unzer_abstract import UnzerAbstract
-    from .unzer_applepay import UnzerApplepay
-    from .unzer_bancontact import UnzerBancontact
-    from .unzer_card import UnzerCard
-    from .unzer_googlepay import UnzerGooglepay
-    from .unzer_ideal import UnzerIdeal
-    from .unzer_klarna import UnzerKlarna
-    from .unzer_paylater_invoice import UnzerPaylaterInvoice
-    from .unzer_paypal import UnzerPayPal
-    from .unzer_sofort import UnzerSofort
-
-try:
-    import paypalserversdk
-except ImportError:
-    # The paypal extra was not enabled, we don't import the related providers
-    ...
-else:
-    del paypalserversdk
-    from .paypal_checkout import PayPalCheckout
+def __dir__() -> list[str]:
+    return sorted({*globals(), *(name for name, (_, sdk, _) in _LAZY_PROVIDERS.items()
+                                 if importlib.util.find_spec(sdk) is not None)})
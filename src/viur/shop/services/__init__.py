@@ -1,10 +1,26 @@
-from .events import EVENT_SERVICE, Event, EventService, on_event
+from .cache import (
+    DatastoreGenerationStore,
+    GENERATION_STORE,
+    GenerationStore,
+    MemoryGenerationStore,
+    VersionedCache,
+)
+from .events import EVENT_SERVICE, Event, EventMode, EventService, on_event
 from .hooks import Customization, HOOK_SERVICE, Hook, HookService
+from .metrics import METRICS_SINK, MemoryMetricsSink, MetricsSink, ObserverMetrics
+from .sequence import SequenceAllocator
 
 __all__ = [
+    # .cache
+    "DatastoreGenerationStore",
+    "GENERATION_STORE",
+    "GenerationStore",
+    "MemoryGenerationStore",
+    "VersionedCache",
     # .event
     "EVENT_SERVICE",
     "Event",
+    "EventMode",
     "EventService",
     "on_event",
     # .hooks
@@ -12,4 +28,11 @@ __all__ = [
     "HOOK_SERVICE",
     "Hook",
     "HookService",
+    # .metrics
+    "METRICS_SINK",
+    "MemoryMetricsSink",
+    "MetricsSink",
+    "ObserverMetrics",
+    # .sequence
+    "SequenceAllocator",
 ]
@@ -0,0 +1,191 @@
+"""
+Versioned Caching Module
+========================
+
+This module provides process-local caches which are invalidated across
+all instances by a shared generation counter.
+
+Key Components
+--------------
+
+1. **GenerationStore**
+   Stores the generation counters shared by all instances.
+
+   - ``DatastoreGenerationStore``: Counters in the datastore (default).
+   - ``MemoryGenerationStore``: Process-local counters, e.g. for tests.
+
+   The store in use can be replaced via ``GENERATION_STORE.set()``.
+
+2. **VersionedCache**
+   Caches a value computed by a loader function in the process.
+   The value is reused until the generation counter of the cache name
+   changes (checked at most every ``check_interval``) or the optional
+   ``ttl`` expires.  ``invalidate()`` bumps the counter, so every instance
+   reloads the value after its next check.
+
+Usage
+-----
+
+.. code-block:: python
+
+   from viur.shop.services import VersionedCache
+
+   cache = VersionedCache("my_values", load_my_values)
+   values = cache.get()  # loaded on first access, afterwards cached
+
+   # e.g. in onEdited():
+   cache.invalidate()
+
+   # in tests:
+   GENERATION_STORE.set(MemoryGenerationStore())
+"""
+
+import abc
+import collections
+import datetime
+import threading
+import time
+import typing as t  # noqa
+import weakref
+
+from viur import toolkit
+from viur.core import db
+from ..globals import SENTINEL, SHOP_LOGGER
+from ..types_global import GlobalVar
+
+logger = SHOP_LOGGER.getChild(__name__)
+
+_T = t.TypeVar("_T")
+"""The generic type of the cached value"""
+
+
+class GenerationStore(abc.ABC):
+    """Storage of generation counters, shared by all instances"""
+
+    @abc.abstractmethod
+    def get(self, name: str) -> int:
+        """Get the current generation of *name* (0 if it has never been bumped)"""
+        ...
+
+    @abc.abstractmethod
+    def bump(self, name: str) -> int:
+        """Increase the generation of *name* and return the new generation"""
+        ...
+
+
+class MemoryGenerationStore(GenerationStore):
+    """Process-local generation counters, for tests and single-instance setups"""
+
+    def __init__(self):
+        super().__init__()
+        self._generations: collections.Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> int:
+        return self._generations[name]
+
+    def bump(self, name: str) -> int:
+        with self._lock:
+            self._generations[name] += 1
+            return self._generations[name]
+
+
+class DatastoreGenerationStore(GenerationStore):
+    """Generation counters stored as entities in the datastore"""
+
+    kind: str = "viur-shop-generation"
+
+    def get(self, name: str) -> int:
+        if (entity := db.Get(db.Key(self.kind, name))) is None:
+            return 0
+        return entity.get("generation") or 0
+
+    def bump(self, name: str) -> int:
+        return toolkit.increase_counter(db.Key(self.kind, name), "generation") + 1
+
+
+GENERATION_STORE: GlobalVar[GenerationStore] = GlobalVar("GENERATION_STORE", default=DatastoreGenerationStore())
+"""The store of the generation counters used by all :class:`VersionedCache` instances"""
+
+
+class VersionedCache(t.Generic[_T]):
+    """
+    A process-local cached value, invalidated by a shared generation counter.
+
+    All caches with the same *name* share the generation counter.
+    """
+
+    _instances: t.Final[dict[str, weakref.WeakSet["VersionedCache"]]] = collections.defaultdict(weakref.WeakSet)
+
+    def __init__(
+        self,
+        name: str,
+        loader: t.Callable[[], _T],
+        *,
+        ttl: datetime.timedelta | None = None,
+        check_interval: datetime.timedelta = datetime.timedelta(seconds=10),
+    ):
+        """
+        :param name: Name of the generation counter.
+        :param loader: Function which computes the value.
+        :param ttl: Optional maximum age of the value, regardless of the generation.
+            Use it for values which depend on the time too.
+        :param check_interval: Minimum time between two checks of the generation.
+        """
+        super().__init__()
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._value: _T = SENTINEL
+        self._generation: int | None = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        VersionedCache._instances[name].add(self)
+
+    def get(self) -> _T:
+        """Get the cached value, (re-)load it if it has been invalidated or expired"""
+        with self._lock:
+            now = time.monotonic()
+            if self._value is not SENTINEL and not self._is_expired(now):
+                if now - self._checked_at < self.check_interval.total_seconds():
+                    return self._value
+                generation = GENERATION_STORE.get().get(self.name)
+                self._checked_at = now
+                if generation == self._generation:
+                    return self._value
+                logger.debug(f"Generation of {self.name!r} changed from {self._generation} to {generation}")
+            else:
+                generation = GENERATION_STORE.get().get(self.name)
+            # The generation is read before loading, a bump while loading causes a reload on the next check
+            self._value = self.loader()
+            self._generation = generation
+            self._loaded_at = self._checked_at = now
+            return self._value
+
+    def _is_expired(self, now: float) -> bool:
+        return self.ttl is not None and now - self._loaded_at >= self.ttl.total_seconds()
+
+    def clear(self) -> None:
+        """Drop the cached value of this process only"""
+        with self._lock:
+            self._value = SENTINEL
+            self._generation = None
+
+    def invalidate(self) -> int:
+        """
+        Invalidate the value in all instances.
+
+        The caches of this process with the same name are cleared immediately,
+        other instances reload the value after their next generation check.
+
+        :return: The new generation.
+        """
+        generation = GENERATION_STORE.get().bump(self.name)
+        for cache in list(VersionedCache._instances[self.name]):
+            cache.clear()
+        return generation
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} name={self.name!r} generation={self._generation!r}>"
@@ -65,6 +65,28 @@ use the ``call`` method of ``EventService``.
 
    EVENT_SERVICE.call(Event.CHECKOUT_STARTED, order_skel=order_skel)
 
+Deferred Observers
+~~~~~~~~~~~~~~~~~~
+
+Observers which don't need to run inside the request (e.g. statistics,
+counters, notifications) can be registered with ``mode="deferred"``.
+Their call is enqueued as a task, skeletons in the arguments are passed
+by kind and key and read again when the task runs.  Identical calls of
+``ORDER_CHANGED`` and ``CART_CHANGED`` within one request are coalesced
+into one task.
+
+.. code-block:: python
+
+   @on_event(Event.ORDER_PAID, mode="deferred")
+   def update_statistics(order_skel):
+       ...
+
+Metrics
+~~~~~~~
+
+Each observer call is measured (count, errors, duration) and passed to
+the metrics sink, see :mod:`viur.shop.services.metrics`.
+
 Error Handling
 --------------
 
@@ -81,12 +103,18 @@ its core logic.
 
 import collections
 import enum
+import time
 import typing as t
 
+from viur.core import current, skeleton, tasks, utils
+from .metrics import METRICS_SINK
 from ..globals import SHOP_LOGGER
 
 logger = SHOP_LOGGER.getChild(__name__)
 
+EventMode = t.Literal["sync", "deferred"]
+"""How an observer is called: directly inside :meth:`EventService.call` or in a deferred task"""
+
 
 class Event(enum.IntEnum):
     """
@@ -121,18 +149,32 @@ class Event(enum.IntEnum):
 class EventService:
     observer: t.Final[dict[Event, list[t.Callable]]] = collections.defaultdict(list)
 
-    def register(self, event: Event, func: t.Callable) -> t.Callable:
+    observer_modes: t.Final[dict[tuple[Event, t.Callable], EventMode]] = {}
+    """The mode of each registered observer (per event), ``"sync"`` if missing"""
+
+    coalesced_events: t.Final[set[Event]] = {Event.ORDER_CHANGED, Event.CART_CHANGED}
+    """Events whose identical deferred calls are enqueued only once per request"""
+
+    coalesce_countdown: int = 10
+    """Delay (in seconds) of the tasks of coalesced events, so they most likely run after the request ended"""
+
+    def register(self, event: Event, func: t.Callable, *, mode: EventMode = "sync") -> t.Callable:
         """
         Register *func* as observer for *event*.
 
         :param event: The event to listen for.
         :param func: The callable invoked by :meth:`call` for this event.
+        :param mode: Call *func* directly (``"sync"``, default) or enqueue
+            the call as a task (``"deferred"``, see :meth:`call`).
         :return: The unmodified *func* (also usable via the
             :func:`on_event` decorator).
         """
         if not isinstance(event, Event):
             raise TypeError(f"event must be of type Event")
+        if mode not in t.get_args(EventMode):
+            raise ValueError(f"Invalid {mode=}")
         EventService.observer[event].append(func)
+        EventService.observer_modes[(event, func)] = mode
         return func
 
     def unregister(self, func: t.Callable, event: Event = None) -> None:
@@ -150,6 +192,7 @@ class EventService:
                     funcs.remove(func)
                 except ValueError:
                     pass
+                EventService.observer_modes.pop((event_, func), None)
 
     def call(
         self,
@@ -160,6 +203,11 @@ class EventService:
         """
         Call all observers registered for *_event*.
 
+        Deferred observers are not called, but their call is enqueued as a
+        task.  The arguments are serialized to JSON; skeletons are replaced by
+        their kind and key and read again in the task.  If the arguments
+        are not serializable, the observer is called directly instead.
+
         :param _event: The event whose observers get called.
         :param _raise_errors: If ``True``, an exception inside an observer
             is re-raised to the caller (aborting the remaining observers).
@@ -167,23 +215,117 @@ class EventService:
             callers must not rely on all observers having succeeded.
         """
         for func in EventService.observer[_event]:
+            start = time.perf_counter()
+            failed = False
             try:
+                if EventService.observer_modes.get((_event, func)) == "deferred" and self._defer(
+                    _event, func, args, kwargs,
+                ):
+                    continue
                 func(*args, **kwargs)
             except Exception as e:
+                failed = True
                 logger.exception(f"Error while calling {func} at event {_event!r}: {e}")
                 if _raise_errors:
                     raise e
+            finally:
+                self._record(_event, func, time.perf_counter() - start, failed)
+
+    # --- Deferred observers --------------------------------------------------
+
+    @staticmethod
+    def _get_observer_path(func: t.Callable) -> str:
+        return f"{func.__module__}.{func.__qualname__}"
+
+    @staticmethod
+    def _serialize_value(value: t.Any) -> t.Any:
+        if isinstance(value, skeleton.SkeletonInstance):
+            return {".__skel__": value.skeletonCls.kindName, "key": value["key"]}
+        return value
+
+    @staticmethod
+    def _deserialize_value(value: t.Any) -> t.Any:
+        if isinstance(value, dict) and value.keys() == {".__skel__", "key"}:
+            skel = skeleton.skeletonByKind(value[".__skel__"])()
+            if not value["key"] or not skel.read(value["key"]):
+                logger.warning(f"{value['.__skel__']} {value['key']!r} doesn't exist (anymore)")
+                return None
+            return skel
+        return value
+
+    def _defer(self, event: Event, func: t.Callable, args: tuple, kwargs: dict) -> bool:
+        """
+        Enqueue the call of a deferred observer.
+
+        :return: Whether the call has been enqueued; ``False`` if the arguments are not serializable.
+        """
+        try:
+            payload = utils.json.dumps({
+                "args": [self._serialize_value(value) for value in args],
+                "kwargs": {name: self._serialize_value(value) for name, value in kwargs.items()},
+            })
+        except TypeError as exc:
+            logger.warning(f"Cannot defer {func} at event {event!r}, calling it directly: {exc}")
+            return False
+        path = self._get_observer_path(func)
+        countdown = 0
+        if event in EventService.coalesced_events and (request_data := current.request_data.get()) is not None:
+            enqueued = request_data.setdefault("shop_events_deferred", set())
+            if (event, path, payload) in enqueued:
+                logger.debug(f"Coalesced call of {path} at event {event!r}")
+                return True
+            enqueued.add((event, path, payload))
+            countdown = self.coalesce_countdown
+        call_observer_deferred(event.name, path, payload, _countdown=countdown)
+        return True
+
+    def call_deferred_observer(self, event: Event, path: str, payload: str) -> None:
+        """Call a deferred observer, the counterpart of :meth:`_defer` (running inside the task)"""
+        for func in EventService.observer[event]:
+            if self._get_observer_path(func) == path:
+                break
+        else:
+            logger.error(f"Deferred observer {path} is not registered for {event!r} (anymore)")
+            return
+        payload = utils.json.loads(payload)
+        args = [self._deserialize_value(value) for value in payload["args"]]
+        kwargs = {name: self._deserialize_value(value) for name, value in payload["kwargs"].items()}
+        start = time.perf_counter()
+        failed = False
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            failed = True
+            # Not re-raised: a retry of the task could repeat non-idempotent work of the observer
+            logger.exception(f"Error while calling deferred {func} at event {event!r}: {e}")
+        finally:
+            self._record(event, func, time.perf_counter() - start, failed, deferred=True)
+
+    def _record(self, event: Event, func: t.Callable, duration: float, failed: bool, *, deferred: bool = False) -> None:
+        """Pass an observer call to the :data:`METRICS_SINK`"""
+        if (sink := METRICS_SINK.get()) is None:
+            return
+        try:
+            sink.record(event, self._get_observer_path(func), duration, failed, deferred=deferred)
+        except Exception as e:
+            logger.exception(f"Error while recording the call of {func} at event {event!r}: {e}")
 
 
 EVENT_SERVICE = EventService()
 
 
-def on_event(event: Event) -> t.Callable:
+@tasks.CallDeferred
+def call_observer_deferred(event_name: str, path: str, payload: str) -> None:
+    """Task of a deferred observer call (see :meth:`EventService.call`)"""
+    EVENT_SERVICE.call_deferred_observer(Event[event_name], path, payload)
+
+
+def on_event(event: Event, *, mode: EventMode = "sync") -> t.Callable:
     if not isinstance(event, Event):
         raise TypeError
 
     def outer_wrapper(func: t.Callable) -> t.Callable:
-        EVENT_SERVICE.register(event, func)
+        EVENT_SERVICE.register(event, func, mode=mode)
         return func
 
     return outer_wrapper
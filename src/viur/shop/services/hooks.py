@@ -8,9 +8,12 @@ modify objects and return something.
 """
 
 import abc
+import collections
 import enum
+import functools
 import typing as t
 
+from viur.core import current
 from viur.shop.types.exceptions import DispatchError
 from ..globals import SHOP_LOGGER
 
@@ -24,11 +27,18 @@ class Hook(enum.IntEnum):
     """
     Hook that assign a order id on a OrderSkel
     type: (order_skel: SkeletonInstance_T[OrderSkel]) -> SkeletonInstance_T[OrderSkel]
+
+    Without a customization, :meth:`viur.shop.modules.order.Order._default_assign_uid`
+    assigns the next number of a sharded :class:`SequenceAllocator`.
     """
 
     CURRENT_COUNTRY = enum.auto()
     """Provide the country of a global site context
     type: (context: t.Literal["cart", "article", "vat_rate"]) -> str
+
+    It's dispatched per cart leaf and discount, so a customization which
+    resolves the country the same way during a request should enable
+    :attr:`Customization.memoize`.
     """
 
     ORDER_ADD_ADDITION = enum.auto()
@@ -69,6 +79,18 @@ class Hook(enum.IntEnum):
 class Customization(abc.ABC):
     """Abstract base class for own implementations."""
 
+    priority: int = 0
+    """Precedence over other customizations of the same kind, the highest priority wins.
+
+    On equal priorities the customization registered first wins."""
+
+    memoize: bool = False
+    """Cache the results per request and arguments.
+
+    Enable it only for pure customizations, whose result depends on nothing
+    but the arguments within one request -- like :attr:`Hook.CURRENT_COUNTRY`.
+    The arguments must be hashable."""
+
     @property
     @abc.abstractmethod
     def kind(self) -> Hook:
@@ -84,12 +106,19 @@ class Customization(abc.ABC):
         return f"<Customization {self.__class__.__name__} for {self.kind.name}>"
 
     @classmethod
-    def from_method(cls, func: t.Callable, kind: Hook) -> t.Self:
+    def from_method(
+        cls,
+        func: t.Callable,
+        kind: Hook,
+        *,
+        priority: int = 0,
+        memoize: bool = False,
+    ) -> t.Self:
         """Just a handy variant to define an implementation without a class definition"""
         return type(
             f"{kind}_{func.__name__}{cls.__name__}",
             (cls,),
-            {"__call__": staticmethod(func), "kind": kind}
+            {"__call__": staticmethod(func), "kind": kind, "priority": priority, "memoize": memoize}
         )()
 
 
@@ -101,6 +130,9 @@ class HookService:
 
     customizations: t.Final[list[Customization]] = []
 
+    by_kind: t.Final[dict[Hook, list[Customization]]] = collections.defaultdict(list)
+    """The registered customizations per kind, ordered by precedence (see :attr:`Customization.priority`)"""
+
     def register(self, customization: Customization | t.Type[Customization]) -> Customization:
         """Register a customization with this service
 
@@ -114,30 +146,52 @@ class HookService:
 
                 def __call__(self, *args, **kwargs) -> t.Any:
                     ...
+
+        Only one customization per kind is dispatched: the one with the
+        highest :attr:`Customization.priority`, on equal priorities the one
+        registered first.
         """
         if not isinstance(customization, Customization):
             if issubclass(customization, Customization):
                 customization = customization()
             else:
                 raise TypeError(f"customization must be of type Customization")
-        # TODO: What happens on existing hooks for the same kind?
+        if registered := HookService.by_kind[customization.kind]:
+            logger.info(f"{customization!r} is registered in addition to {registered!r}")
         HookService.customizations.append(customization)
+        registered.append(customization)
+        registered.sort(key=lambda c: -c.priority)  # stable: keeps the order of registration
         return customization
 
     def unregister(self, customization: Customization):
         HookService.customizations.remove(customization)
+        HookService.by_kind[customization.kind].remove(customization)
 
     def dispatch(self, kind: Hook, default: t.Callable = None) -> t.Callable:
         """Choose the matching registered customization for this kind"""
-        for customization in HookService.customizations:
-            if kind is customization.kind:  # TODO: add by_kind map
-                logger.debug(f"found {customization=}")
-                return customization
-        logger.debug(f"found no customization")
+        if customizations := HookService.by_kind.get(kind):
+            customization = customizations[0]
+            if customization.memoize:
+                return functools.partial(self._call_memoized, customization)
+            return customization
         if default is None:
             raise DispatchError(f"No customization found for {kind!r}", kind)
-        logger.debug(f"use default customization {default=}")
         return default
 
+    @staticmethod
+    def _call_memoized(customization: Customization, *args, **kwargs) -> t.Any:
+        """Call a customization, but only once per request and arguments (see :attr:`Customization.memoize`)"""
+        if (request_data := current.request_data.get()) is None:
+            return customization(*args, **kwargs)
+        cache = request_data.setdefault("shop_cache_hooks", {})
+        try:
+            cache_key = (id(customization), args, frozenset(kwargs.items()))
+            return cache[cache_key]
+        except KeyError:
+            cache[cache_key] = result = customization(*args, **kwargs)
+            return result
+        except TypeError:  # unhashable arguments
+            return customization(*args, **kwargs)
+
 
 HOOK_SERVICE = HookService()
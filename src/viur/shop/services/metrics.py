@@ -0,0 +1,157 @@
+"""
+Observer Metrics
+================
+
+Measures the calls of the event observers (see :class:`EventService`):
+count, errors and duration per event and observer.
+
+Every call is passed to the :class:`MetricsSink` in :data:`METRICS_SINK`.
+The default :class:`MemoryMetricsSink` aggregates the calls in the process,
+the aggregates of an instance can be viewed via ``Api.event_metrics``.
+Replace it via ``METRICS_SINK.set()`` to forward the measurements to an
+external monitoring, or set ``None`` to disable the measurements.
+
+Usage
+-----
+
+.. code-block:: python
+
+   from viur.shop.services import METRICS_SINK, MemoryMetricsSink
+
+   # log each observer call above 50ms
+   METRICS_SINK.set(MemoryMetricsSink(latency_budget=datetime.timedelta(milliseconds=50)))
+"""
+
+import abc
+import collections
+import dataclasses
+import datetime
+import math
+import threading
+import typing as t  # noqa
+
+from ..globals import SHOP_LOGGER
+from ..types_global import GlobalVar
+
+if t.TYPE_CHECKING:
+    from .events import Event
+
+logger = SHOP_LOGGER.getChild(__name__)
+
+
+class MetricsSink(abc.ABC):
+    """Receiver of the measured observer calls"""
+
+    @abc.abstractmethod
+    def record(
+        self,
+        event: "Event",
+        observer: str,
+        duration: float,
+        failed: bool,
+        *,
+        deferred: bool = False,
+    ) -> None:
+        """
+        Record one observer call.
+
+        :param event: The event the observer has been called for.
+        :param observer: Dotted path of the observer.
+        :param duration: Duration of the call in seconds.
+        :param failed: Whether the observer raised an exception.
+        :param deferred: Whether it's the call inside a deferred task;
+            otherwise it's the time spent in the request (for deferred
+            observers the time to enqueue the task).
+        """
+        ...
+
+
+@dataclasses.dataclass
+class ObserverMetrics:
+    """The aggregated calls of one observer at one event"""
+
+    event: "Event"
+    observer: str
+    deferred: bool
+    calls: int = 0
+    errors: int = 0
+    total_duration: float = 0.0
+    """Cumulative duration in seconds"""
+    max_duration: float = 0.0
+    durations: collections.deque[float] = dataclasses.field(
+        default_factory=lambda: collections.deque(maxlen=1000),
+        repr=False,
+    )
+    """Duration of the most recent calls, used for the percentiles"""
+
+    def add(self, duration: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.durations.append(duration)
+
+    def percentile(self, percent: float) -> float:
+        """Get a percentile of the duration of the most recent calls (nearest rank)"""
+        if not self.durations:
+            return 0.0
+        durations = sorted(self.durations)
+        return durations[max(math.ceil(percent / 100 * len(durations)) - 1, 0)]
+
+    def as_dict(self) -> dict[str, t.Any]:
+        return {
+            "event": self.event.name,
+            "observer": self.observer,
+            "deferred": self.deferred,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_duration": self.total_duration,
+            "mean_duration": self.total_duration / self.calls if self.calls else 0.0,
+            "p95_duration": self.percentile(95),
+            "max_duration": self.max_duration,
+        }
+
+
+class MemoryMetricsSink(MetricsSink):
+    """Aggregates the observer calls in the process"""
+
+    def __init__(self, *, latency_budget: datetime.timedelta | None = None):
+        """
+        :param latency_budget: Log a warning for each call which takes longer.
+        """
+        super().__init__()
+        self.latency_budget = latency_budget
+        self._metrics: dict[tuple["Event", str, bool], ObserverMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        event: "Event",
+        observer: str,
+        duration: float,
+        failed: bool,
+        *,
+        deferred: bool = False,
+    ) -> None:
+        with self._lock:
+            if (metrics := self._metrics.get((event, observer, deferred))) is None:
+                metrics = self._metrics[(event, observer, deferred)] = ObserverMetrics(event, observer, deferred)
+            metrics.add(duration, failed)
+        if self.latency_budget is not None and duration > self.latency_budget.total_seconds():
+            logger.warning(f"Observer {observer} at event {event!r} took {duration * 1000:.1f} ms")
+
+    def get_metrics(self) -> list[ObserverMetrics]:
+        """Get the metrics of all observers, the most time-consuming first"""
+        with self._lock:
+            metrics = [dataclasses.replace(m, durations=collections.deque(m.durations, maxlen=1000))
+                       for m in self._metrics.values()]
+        return sorted(metrics, key=lambda m: m.total_duration, reverse=True)
+
+    def reset(self) -> None:
+        """Drop all aggregated metrics"""
+        with self._lock:
+            self._metrics.clear()
+
+
+METRICS_SINK: GlobalVar[MetricsSink | None] = GlobalVar("METRICS_SINK", default=MemoryMetricsSink())
+"""The sink of the measured observer calls, ``None`` disables the measurement"""
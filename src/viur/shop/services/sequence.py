@@ -0,0 +1,95 @@
+"""
+Sequence Allocator
+==================
+
+Hands out unique numbers (e.g. order numbers) without a single hot
+counter entity.
+
+The numbers are allocated in blocks: each instance takes a block of
+``block_size`` numbers from one of ``shards`` counter entities (chosen at
+random) in a transaction and hands them out from memory afterward.
+Concurrent instances hit different shards, so they don't contend.
+
+Block ``b`` of shard ``s`` covers the numbers starting at
+``(b * shards + s) * block_size + 1``, so the blocks of all shards
+interleave without overlapping.  The numbers are unique, but neither
+gapless (unused numbers of a block get lost when an instance shuts down)
+nor strictly ascending across instances.
+
+Usage
+-----
+
+.. code-block:: python
+
+   from viur.shop.services import SequenceAllocator
+
+   sequence = SequenceAllocator("my_sequence")
+   number = sequence.next()
+"""
+
+import random
+import threading
+import typing as t  # noqa
+
+from viur import toolkit
+from viur.core import db
+from ..globals import SHOP_LOGGER
+
+logger = SHOP_LOGGER.getChild(__name__)
+
+
+class SequenceAllocator:
+    """Unique numbers from sharded counters in the datastore, allocated in blocks per instance"""
+
+    kind: str = "viur-shop-sequence"
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        shards: int = 8,
+        block_size: int = 20,
+    ):
+        """
+        :param name: Name of the sequence.
+        :param shards: Number of counter entities.
+            Must never be changed once numbers have been allocated, otherwise
+            the blocks of the old and the new layout would overlap.
+        :param block_size: Numbers allocated per transaction.
+            Like the shards, it must never be changed.
+        """
+        super().__init__()
+        if shards < 1 or block_size < 1:
+            raise ValueError("shards and block_size must be positive")
+        self.name = name
+        self.shards = shards
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._block: range = range(0)
+
+    def next(self) -> int:
+        """Get the next unique number of this sequence"""
+        with self._lock:
+            if not self._block:
+                self._block = self._allocate_block()
+            number, self._block = self._block[0], self._block[1:]
+            return number
+
+    def _allocate_block(self) -> range:
+        """Take the next block of a random shard, on collisions another shard is tried"""
+        shards = random.sample(range(self.shards), self.shards)
+        for shard in shards[:-1]:
+            try:
+                return self._take_block(shard)
+            except db.CollisionError:
+                logger.warning(f"Collision on shard {shard} of sequence {self.name!r}, trying another shard")
+        return self._take_block(shards[-1])
+
+    def _take_block(self, shard: int) -> range:
+        block = toolkit.increase_counter(db.Key(self.kind, f"{self.name}-{shard}"), "block")
+        first = (block * self.shards + shard) * self.block_size + 1
+        logger.debug(f"Allocated block {block} of shard {shard} of sequence {self.name!r}: {first=}")
+        return range(first, first + self.block_size)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} name={self.name!r} shards={self.shards} block_size={self.block_size}>"
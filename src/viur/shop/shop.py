@@ -1,14 +1,16 @@
 import copy
+import hashlib
+import json
 import typing as t
 
-from viur.core import conf, logging
+from viur.core import conf, db, logging, utils
 from viur.core.bones import RelationalBone
 from viur.core.module import Module
 from viur.core.modules.translation import Creator, TranslationSkel
 from viur.core.modules.user import UserSkel
 from viur.core.prototypes.instanced_module import InstancedModule
 from viur.core.render.abstract import AbstractRenderer
-from viur.core.skeleton import MetaSkel, skeletonByKind
+from viur.core.skeleton import MetaSkel, SkeletonInstance, skeletonByKind
 from viur.shop.data.translations import TRANSLATIONS
 from viur.shop.skeletons.article import ArticleAbstractSkel
 from .globals import SHOP_INSTANCE, SHOP_INSTANCE_VI, SHOP_LOGGER
@@ -47,6 +49,12 @@ class Shop(InstancedModule, Module):
 
     _is_registered_for: t.ClassVar[set[str]] = set()
 
+    translations_sync_kind: str = "viur-shop-translations"
+    """Kind of the entity storing the content hash of the last synced :data:`TRANSLATIONS`"""
+
+    translations_write_chunk_size: int = 25
+    """Number of translations written per transaction when syncing the translations"""
+
     def __init__(
         self,
         *,
@@ -222,36 +230,45 @@ class Shop(InstancedModule, Module):
         self.article_skel.shop_shipping_config.refKeys |= {"name", "shipping"}
 
     def _add_translations(self) -> None:
-        """Setup translations required for the viur-shop"""
+        """Setup translations required for the viur-shop
+
+        All existing translations are loaded with one query and diffed in memory
+        against :data:`TRANSLATIONS`; only new and changed translations are written,
+        in chunks of :attr:`translations_write_chunk_size` per transaction.
+        The content hash of the synced translations is stored afterward,
+        as long as it's unchanged, the whole sync is skipped on the next start.
+        """
         if not conf.i18n.add_missing_translations:
             return
 
-        for key, tr_dict in TRANSLATIONS.items():
-            # Ensure lowercase key
-            key = key.lower()
-            skel = TranslationSkel().all().filter("name =", key).getSkel()
-            if skel is None:
-                skel = TranslationSkel().all().filter("tr_key =", key).getSkel()  # TODO: legacy viur-core
-            if skel is not None:
-                old_translations = copy.deepcopy(
-                    (skel["translations"], skel["default_text"], skel["hint"], skel["public"])
-                )
-                for lang, value in tr_dict.items():
-                    if lang in skel.translations.languages:
-                        skel["translations"][lang] = skel["translations"].get(lang) or value
-                skel["default_text"] = skel["default_text"] or tr_dict.get("_default_text") or ""
-                skel["hint"] = skel["hint"] or tr_dict.get("_hint") or ""
-                skel["public"] = True
-                if old_translations != (skel["translations"], skel["default_text"], skel["hint"], skel["public"]):
+        # Ensure lowercase keys
+        translations = {key.lower(): tr_dict for key, tr_dict in TRANSLATIONS.items()}
+        languages = sorted(TranslationSkel().translations.languages)
+        digest = hashlib.sha256(
+            json.dumps([languages, translations], sort_keys=True).encode()
+        ).hexdigest()
+        sync_key = db.Key(self.translations_sync_kind, "translations")
+        if (sync_entity := db.Get(sync_key)) is not None and sync_entity.get("hash") == digest:
+            logger.debug(f"Translations are up to date ({digest=})")
+            return
+
+        existing: dict[str, db.Entity] = {}
+        for entity in TranslationSkel().all().iter():
+            if (name := entity.get("name")) in translations:
+                existing[name] = entity
+            elif (tr_key := entity.get("tr_key")) in translations:  # TODO: legacy viur-core
+                existing.setdefault(tr_key, entity)
+
+        skels: list[SkeletonInstance] = []
+        for key, tr_dict in translations.items():
+            skel = TranslationSkel()
+            if (entity := existing.get(key)) is not None:
+                skel.setEntity(entity)
+                if self._update_translation_skel(skel, tr_dict):
                     logger.info(f"Update existing translation {key}")
-                    logger.debug(f'{old_translations} --> {skel["translations"], skel["default_text"], skel["hint"]}')
-                    try:
-                        skel.write()
-                    except Exception as exc:
-                        logger.exception(f"Failed to write updated translation {skel=} :: {exc}")
+                    skels.append(skel)
                 continue
             logger.info(f"Add missing translation {key}")
-            skel = TranslationSkel()
             skel["tr_key"] = key  # TODO: legacy viur-core
             skel["name"] = key
             skel["translations"] = tr_dict
@@ -259,10 +276,54 @@ class Shop(InstancedModule, Module):
             skel["hint"] = tr_dict.get("_hint") or None
             skel["creator"] = Creator.VIUR
             skel["public"] = True
+            skels.append(skel)
+
+        failed = False
+        size = self.translations_write_chunk_size
+        for chunk in (skels[start:start + size] for start in range(0, len(skels), size)):
             try:
-                skel.write()
+                db.RunInTransaction(self._write_translation_skels_txn, chunk)
             except Exception as exc:
-                logger.exception(f"Failed to write added translation {skel=} :: {exc}")
+                logger.warning(f"Failed to write {len(chunk)} translations in one transaction :: {exc}")
+                # Write them one by one, so one broken translation doesn't block the others
+                for skel in chunk:
+                    try:
+                        skel.write()
+                    except Exception as exc:
+                        failed = True
+                        logger.exception(f"Failed to write translation {skel=} :: {exc}")
+
+        if failed:
+            # Don't store the hash, the next start shall try again
+            return
+        sync_entity = db.Entity(sync_key)
+        sync_entity["hash"] = digest
+        sync_entity["written"] = len(skels)
+        sync_entity["changedate"] = utils.utcNow()
+        db.Put(sync_entity)
+        logger.info(f"Synced translations: {len(skels)} of {len(translations)} written ({digest=})")
+
+    @staticmethod
+    def _update_translation_skel(skel: SkeletonInstance, tr_dict: dict[str, str]) -> bool:
+        """Fill the missing values of an existing translation, returns whether something changed"""
+        old_translations = copy.deepcopy(
+            (skel["translations"], skel["default_text"], skel["hint"], skel["public"])
+        )
+        for lang, value in tr_dict.items():
+            if lang in skel.translations.languages:
+                skel["translations"][lang] = skel["translations"].get(lang) or value
+        skel["default_text"] = skel["default_text"] or tr_dict.get("_default_text") or ""
+        skel["hint"] = skel["hint"] or tr_dict.get("_hint") or ""
+        skel["public"] = True
+        if old_translations == (skel["translations"], skel["default_text"], skel["hint"], skel["public"]):
+            return False
+        logger.debug(f'{old_translations} --> {skel["translations"], skel["default_text"], skel["hint"]}')
+        return True
+
+    @staticmethod
+    def _write_translation_skels_txn(skels: list[SkeletonInstance]) -> None:
+        for skel in skels:
+            skel.write()
 
     def __repr__(self) -> str:
         cls = type(self)
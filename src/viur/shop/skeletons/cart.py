@@ -1,4 +1,5 @@
 import collections
+import time
 import typing as t  # noqa
 
 from viur import toolkit
@@ -10,8 +11,9 @@ from viur.shop.types import *
 
 from ._bones import SnapshotRelationalBone
 from .vat import VatIncludedSkel
-from ..globals import SHOP_INSTANCE, SHOP_LOGGER
+from ..globals import EXACT_MONEY, SHOP_INSTANCE, SHOP_LOGGER
 from ..skeletons.article import ArticleAbstractSkel
+from ..types import money
 from ..types.response import make_json_dumpable
 
 logger = SHOP_LOGGER.getChild(__name__)
@@ -24,6 +26,42 @@ else:
 Addition = t.Callable[["TotalFactory", float, SkeletonInstance_T["CartNodeSkel"], BaseBone], float]
 
 
+def get_materialized_values(skel: SkeletonInstance_T["CartNodeSkel"]) -> dict | None:
+    """
+    Get the materialized values of a cart node, if they can be used.
+
+    Materialized values are used only if :attr:`Cart.materialize_totals` is
+    enabled and they are not older than :attr:`Cart.materialized_totals_max_age`
+    (see :meth:`Cart.refresh_materialized_values`).
+    """
+    cart = SHOP_INSTANCE.get().cart
+    if not cart.materialize_totals or "materialized_values" not in skel:
+        return None
+    if not (materialized_values := skel["materialized_values"]):
+        return None
+    if (
+        cart.materialized_totals_max_age is not None
+        and time.time() - materialized_values.get("timestamp", 0) > cart.materialized_totals_max_age.total_seconds()
+    ):
+        return None
+    return materialized_values
+
+
+def get_leaf_price_value(skel: SkeletonInstance_T["CartItemSkel"], name: str) -> t.Any:
+    """
+    Get a value of the :class:`Price` of a cart leaf.
+
+    The value is taken from the batched prices of the cart, if available
+    (see :meth:`Cart.get_cart_pricing`), otherwise from the leaf's own price.
+
+    :param skel: The cart leaf.
+    :param name: Name of the :class:`Price` property.
+    """
+    if (pricing := SHOP_INSTANCE.get().cart.get_cart_pricing(skel)) is not None and skel["key"] in pricing:
+        return pricing.get_value(skel["key"], name)
+    return getattr(skel.price_, name)
+
+
 class TotalFactory:
     def __init__(
         self,
@@ -34,15 +72,27 @@ class TotalFactory:
         use_cache: bool = True,
         *,
         additions: list[Addition] | tuple[Addition, ...] = (),
+        is_money: bool = True,
     ):
+        """
+        :param is_money: The total is an amount of money; it's computed in
+            integer minor units if :data:`EXACT_MONEY` is enabled.
+            In this mode the *additions* receive and return the total in minor units too.
+        """
         super().__init__()
         self.bone_node = bone_node
         self.bone_leaf = bone_leaf
         self.multiply_quantity = multiply_quantity
         self.precision = precision
         self.use_cache = use_cache
+        self.is_money = is_money
         self.additions = additions
 
+    @property
+    def is_exact(self) -> bool:
+        """Compute this total in integer minor units (see :data:`EXACT_MONEY`)"""
+        return self.is_money and EXACT_MONEY.get()
+
     def _get_children(self, parent_cart_key: db.Key) -> list[SkeletonInstance]:
         if self.use_cache:
             return SHOP_INSTANCE.get().cart.get_children_from_cache(parent_cart_key)
@@ -62,21 +112,27 @@ class TotalFactory:
         skel = without_render_preparation(skel)
         if skel["is_frozen"] and (frozen_values := skel["frozen_values"]) and bone_name in frozen_values:
             return frozen_values[bone_name]
+        if (materialized_values := get_materialized_values(skel)) and bone_name in materialized_values:
+            return materialized_values[bone_name]
         children = self._get_children(skel["key"])
+        exact = self.is_exact
         total = 0
         for child in children:
             # logger.debug(f"{child = }")
             if issubclass(child.skeletonCls, CartNodeSkel):
                 if callable(self.bone_node):
-                    total += self.bone_node(child)
+                    value = self.bone_node(child)
                 else:
-                    total += child[self.bone_node]
+                    value = child[self.bone_node]
+                total += money.to_cents(value) if exact else value
             elif issubclass(child.skeletonCls, CartItemSkel):
                 if callable(self.bone_leaf):
                     value = self.bone_leaf(child)
                 else:
                     value = child[self.bone_leaf]
                 if value:
+                    if exact:
+                        value = money.to_cents(value)
                     if self.multiply_quantity:
                         value *= child["quantity"]
                     total += value
@@ -84,6 +140,8 @@ class TotalFactory:
         for addition in self.additions:
             total = addition(self, total, skel, bone)
 
+        if exact:
+            total = money.from_cents(total)
         return round(
             total,
             self.precision if self.precision is not None else bone.precision
@@ -97,14 +155,20 @@ def add_discount(factory: TotalFactory, total: float, skel: "SkeletonInstance",
             condition["dest"]["application_domain"] == ApplicationDomain.BASKET
             for condition in discount["dest"]["condition"]
         ):
-            total = Price.apply_discount(discount["dest"], total)
+            if factory.is_exact:
+                total = money.apply_discount(discount["dest"], total)
+            else:
+                total = Price.apply_discount(discount["dest"], total)
     return total
 
 
 # @toolkit.debug
 def add_shipping(factory: TotalFactory, total: float, skel: "SkeletonInstance", bone: BaseBone) -> float:
     if shipping := skel["shipping"]:
-        total += shipping["dest"]["shipping_cost"] or 0.0
+        if factory.is_exact:
+            total += money.to_cents(shipping["dest"]["shipping_cost"] or 0.0)
+        else:
+            total += shipping["dest"]["shipping_cost"] or 0.0
     return total
 
 
@@ -120,7 +184,11 @@ def get_vat_for_node(skel: "CartNodeSkel", bone: RecordBone) -> list[dict]:
     skel = without_render_preparation(skel)
     if skel["is_frozen"] and (frozen_values := skel["frozen_values"]) and "vat" in frozen_values:
         return frozen_values["vat"]
+    if (materialized_values := get_materialized_values(skel)) and "vat" in materialized_values:
+        return materialized_values["vat"]
     children = SHOP_INSTANCE.get().cart.get_children_from_cache(skel["key"])
+    # In exact mode the values are summed up in integer minor units
+    to_value = money.to_cents if (exact := EXACT_MONEY.get()) else (lambda value: value)
     cat2value = collections.defaultdict(lambda: 0)
     cat2rate = {}
     # logger.debug(f"{skel=}")
@@ -129,12 +197,14 @@ def get_vat_for_node(skel: "CartNodeSkel", bone: RecordBone) -> list[dict]:
         if issubclass(child.skeletonCls, CartNodeSkel):
             for entry in child["vat"] or []:
                 # logger.debug(f'{child["shop_vat_rate_category"]} | {entry=}')
-                cat2value[entry["category"]] += entry["value"]
+                cat2value[entry["category"]] += to_value(entry["value"])
                 cat2rate[entry["category"]] = entry["percentage"]
         elif issubclass(child.skeletonCls, CartItemSkel):
             try:
-                cat2value[child["shop_vat_rate_category"]] += child.price_.vat_included * child["quantity"]
-                cat2rate[child["shop_vat_rate_category"]] = child.price_.vat_rate_percentage
+                cat2value[child["shop_vat_rate_category"]] += (
+                    to_value(get_leaf_price_value(child, "vat_included")) * child["quantity"]
+                )
+                cat2rate[child["shop_vat_rate_category"]] = get_leaf_price_value(child, "vat_rate_percentage")
             except TypeError as e:
                 logger.warning(e)
         else:
@@ -148,14 +218,19 @@ def get_vat_for_node(skel: "CartNodeSkel", bone: RecordBone) -> list[dict]:
         vat_percentage = SHOP_INSTANCE.get().vat_rate.get_vat_rate_for_country(
             country=shipping_country, category=VatRateCategory.STANDARD,
         )
-        vat_value = Price.gross_to_vat(shipping["dest"]["shipping_cost"] or 0.0, vat_percentage / 100.0)
+        if exact:
+            vat_value = money.gross_to_vat(money.to_cents(shipping["dest"]["shipping_cost"] or 0.0),
+                                           vat_percentage / 100.0)
+        else:
+            vat_value = Price.gross_to_vat(shipping["dest"]["shipping_cost"] or 0.0, vat_percentage / 100.0)
         cat2rate[VatRateCategory.STANDARD] = vat_percentage / 100.0
         cat2value[VatRateCategory.STANDARD] += vat_value
 
     return [
         {
             "category": cat,
-            "value": toolkit.round_decimal(value, bone.using.percentage.precision),
+            "value": toolkit.round_decimal(money.from_cents(value) if exact else value,
+                                           bone.using.percentage.precision),
             "percentage": cat2rate[cat],
         }
         for cat, value in cat2value.items()
@@ -175,6 +250,11 @@ def get_price_for_leaf(skel: SkeletonInstance_T["CartItemSkel"]) -> dict:
     """
     if skel["is_frozen"] and (frozen_values := skel["frozen_values"]) and frozen_values.get("price"):
         return frozen_values["price"]
+    if (
+        (pricing := SHOP_INSTANCE.get().cart.get_cart_pricing(skel)) is not None
+        and (price := pricing.get(skel["key"])) is not None
+    ):
+        return price
     return skel.price_.to_dict()
 
 
@@ -209,6 +289,9 @@ class RelationalBoneShipping(RelationalBone):
         if getattr(self, "_prevent_compute", False):  # avoid recursion errors
             return False
 
+        if get_materialized_values(skel) is not None:  # unserialize the materialized shipping from entity
+            return False
+
         if skel["shipping_status"] == ShippingStatus.USER and self._is_valid_user_shipping(skel):
             return False  # should be unserialized from entity
 
@@ -270,6 +353,9 @@ class CartNodeSkel(TreeSkel):
 
     subSkels = {
         "discount": ["key", "discount", "parententry"],  # for modules.cart.get_discount_for_leaf
+        "materialized": [  # for modules.cart.refresh_materialized_values
+            "key", "is_frozen", "shipping", "shipping_status", "materialized_values",
+        ],
     }
 
     is_root_node = BooleanBone(
@@ -279,7 +365,7 @@ class CartNodeSkel(TreeSkel):
     total = NumericBone(
         precision=2,
         compute=Compute(
-            TotalFactory("total", lambda child: child.price_.current, True,
+            TotalFactory("total", lambda child: get_leaf_price_value(child, "current"), True,
                          additions=[add_shipping]),
             ComputeInterval(ComputeMethod.Always),
         ),
@@ -288,7 +374,7 @@ class CartNodeSkel(TreeSkel):
     total_raw = NumericBone(
         precision=2,
         compute=Compute(
-            TotalFactory("total", lambda child: child.price_.current, True),
+            TotalFactory("total", lambda child: get_leaf_price_value(child, "current"), True),
             ComputeInterval(ComputeMethod.Always),
         ),
     )
@@ -296,7 +382,7 @@ class CartNodeSkel(TreeSkel):
     total_discount_price = NumericBone(
         precision=2,
         compute=Compute(
-            TotalFactory("total_discount_price", lambda child: child.price_.current, True,
+            TotalFactory("total_discount_price", lambda child: get_leaf_price_value(child, "current"), True,
                          additions=[add_discount, add_shipping]),
             ComputeInterval(ComputeMethod.Always),
         ),
@@ -315,7 +401,7 @@ class CartNodeSkel(TreeSkel):
     total_quantity = NumericBone(
         precision=0,
         compute=Compute(
-            TotalFactory("total_quantity", lambda child: 1, True),
+            TotalFactory("total_quantity", lambda child: 1, True, is_money=False),
             ComputeInterval(ComputeMethod.Always)
         ),
         defaultValue=0,
@@ -406,6 +492,12 @@ class CartNodeSkel(TreeSkel):
         visible=False,
     )
 
+    materialized_values = JsonBone(
+        readOnly=True,
+        visible=False,
+    )
+    """Aggregated values stored on each cart mutation (see :attr:`Cart.materialize_totals`)"""
+
     @classmethod
     def refresh_shipping_address(cls, skel: SkeletonInstance) -> SkeletonInstance:
         """
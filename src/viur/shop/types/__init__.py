@@ -15,12 +15,14 @@ class SkeletonInstance_T(_SkeletonInstance, t.Generic[SkeletonCls_co]):
 
 del _Skeleton, _SkeletonInstance
 
+from .cart_tree import CartTree  # noqa
 from .data import ClientError, Supplier  # noqa
 from .dc_scope import (  # noqa
     DiscountConditionScope,
     ConditionValidator,
     DiscountValidator,
 )
+from .discount_index import AutomaticallyDiscountIndex  # noqa
 from .enums import (  # noqa
     AddressType,
     ApplicationDomain,
@@ -56,6 +58,7 @@ from .exceptions import (  # noqa
     ViURShopHttpException,
 )
 from .price import Price  # noqa
-from .response import ExtendedCustomJsonEncoder, JsonResponse  # noqa
+from .cart_pricing import CartPricing  # noqa, needs .price
+from .response import ExtendedCustomJsonEncoder, JsonResponse, RenderedJsonResponse  # noqa
 from .results import (OrderViewResult, PaymentProviderResult, StatusError)  # noqa
-from .typed_dicts import (PaymentTransaction, PaymentTransactionSpecific)  # noqa
+from .typed_dicts import (ArticleOperation, PaymentTransaction, PaymentTransactionSpecific)  # noqa
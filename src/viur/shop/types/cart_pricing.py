@@ -0,0 +1,243 @@
+"""
+Batched price computation for all leafs of a cart.
+
+:meth:`Price.to_dict` derives every value of a leaf through its own
+property, each one converting gross/net and rounding again, chooses the
+discounts for every leaf on its own and encodes them separately --
+although all leafs of a node share the same cart discounts.
+
+The :class:`CartPricing` chooses the discounts in one pass over the cart:
+the automatic article discount once per article, the discount
+combinations once per set of cart discounts and the vat rate once per
+country and vat rate category.  The resulting inputs (retail,
+recommended and current price, vat rate) are kept as columns, from which
+the columns of the price dicts are derived; every discount is encoded
+only once per cart.  The rules are the ones of :class:`Price`, so the
+results are identical to :meth:`Price.to_dict`
+(see ``benchmarks/test_cart_pricing.py``).
+"""
+
+import functools
+import json
+import typing as t  # noqa
+
+from viur import toolkit
+from viur.core import db, utils
+from viur.core.skeleton import SkeletonInstance
+from .price import PRICE_PRECISION, Price
+from ..globals import EXACT_MONEY, SHOP_INSTANCE, SHOP_LOGGER
+
+logger = SHOP_LOGGER.getChild(__name__)
+
+PRICE_FIELDS: t.Final[tuple[str, ...]] = tuple(
+    attr_name
+    for attr_name, attr_value in vars(Price).items()
+    if isinstance(attr_value, (property, functools.cached_property)) and not attr_name.startswith("_")
+)
+"""The public values of a :class:`Price`, in the order of :meth:`Price.to_dict`"""
+
+
+class CartPricing:
+    """
+    The prices of many cart leafs, computed column by column.
+
+    Leafs whose price can't be computed in the batch (frozen leafs, invalid
+    vat rates, errors while choosing the discounts, ...) are left out;
+    :meth:`get` returns ``None`` for them and the caller has to fall back to
+    :meth:`Price.to_dict`, which raises the error (if any) as before.
+    In the :data:`EXACT_MONEY` mode all leafs are left out, the integer
+    arithmetic of this mode is not duplicated here.
+    """
+
+    def __init__(self, leaf_skels: t.Iterable[SkeletonInstance]):
+        super().__init__()
+        self._index: dict[db.Key, int] = {}
+        self.retail: list[float | None] = []
+        self.recommended: list[float | None] = []
+        self.current: list[float | None] = []
+        self.vat_rate_percentage: list[float] = []
+        self.cart_discounts: list[list[SkeletonInstance]] = []
+        self.article_discounts: list[SkeletonInstance | None] = []
+        self._discount_json: dict[int, str] = {}
+
+        if not EXACT_MONEY.get():
+            self._add_leafs(leaf_skels)
+        self.columns: dict[str, list] = self._compute_columns()
+
+    def _add_leafs(self, leaf_skels: t.Iterable[SkeletonInstance]) -> None:
+        cart = SHOP_INSTANCE.get().cart
+        article_discounts: dict[db.Key, SkeletonInstance | None] = {}
+        permutations: dict[tuple[db.Key, ...], list[list[SkeletonInstance]]] = {}
+        countries: dict[db.Key, str | None] = {}
+        vat_rates: dict[tuple[str | None, t.Any], float] = {}
+
+        for leaf_skel in leaf_skels:
+            if leaf_skel["is_frozen"]:
+                continue  # the price snapshot is used
+            try:
+                article_skel = toolkit.without_render_preparation(leaf_skel.article_skel_full)
+                retail = article_skel["shop_price_retail"]
+
+                # The automatic discount depends only on the article
+                if (article_key := article_skel["key"]) not in article_discounts:
+                    best_discount = Price.get_best_article_discount(article_skel)
+                    article_discounts[article_key] = best_discount and best_discount[1]
+                article_discount = article_discounts[article_key]
+
+                try:
+                    cart_discounts = cart.get_discount_skels_for_leaf(leaf_skel)
+                except Exception as exc:  # like Price.__init__
+                    logger.exception(exc)
+                    cart_discounts = []
+
+                if cart_discounts:
+                    # The combinations depend only on the set of cart discounts,
+                    # per combination only the article discounts change the price
+                    if (discount_keys := tuple(d["key"] for d in cart_discounts)) not in permutations:
+                        permutations[discount_keys] = [
+                            [discount for discount in permutation if Price.is_article_discount(discount)]
+                            for permutation in Price.get_discount_permutations(cart_discounts)
+                        ]
+                    best_price = retail
+                    for permutation in permutations[discount_keys]:
+                        price = retail  # start always from the retail price
+                        for discount in permutation:
+                            price = Price.apply_discount(discount, price)
+                        if price < best_price:
+                            best_price = price
+                    current = toolkit.round_decimal(best_price, PRICE_PRECISION)
+                elif article_discount:
+                    current = toolkit.round_decimal(Price.apply_discount(article_discount, retail), PRICE_PRECISION)
+                else:
+                    current = retail
+
+                # The country depends only on the nodes above the leaf
+                if (parent_key := leaf_skel["parententry"]) not in countries:
+                    node_skel = cart.get_closest_node(
+                        leaf_skel,
+                        condition=lambda skel: skel["shipping_address"] is not None,
+                    )
+                    try:
+                        countries[parent_key] = node_skel["shipping_address"]["dest"]["country"]
+                    except (KeyError, TypeError):
+                        countries[parent_key] = None
+                vat_key = countries[parent_key], article_skel["shop_vat_rate_category"]
+                if vat_key not in vat_rates:
+                    vat_rates[vat_key] = Price.get_vat_rate_percentage(*vat_key)
+                if not (0 <= vat_rates[vat_key] <= 1):
+                    continue
+            except Exception as exc:
+                logger.debug(f'Leaving {leaf_skel["key"]!r} out of the batch: {exc!r}')
+                continue
+
+            self._index[leaf_skel["key"]] = len(self.retail)
+            self.retail.append(retail)
+            self.recommended.append(article_skel["shop_price_recommended"])
+            self.current.append(current)
+            self.vat_rate_percentage.append(vat_rates[vat_key])
+            self.cart_discounts.append(cart_discounts)
+            self.article_discounts.append(article_discount)
+
+    def _compute_columns(self) -> dict[str, list]:
+        round_decimal = toolkit.round_decimal
+        gross_to_net = Price.gross_to_net
+        gross_to_vat = Price.gross_to_vat
+
+        retail = self.retail
+        recommended = self.recommended
+        current = self.current
+        vat = self.vat_rate_percentage
+
+        saved = [
+            0 if r is None or c is None else round_decimal(r - c, PRICE_PRECISION)
+            for r, c in zip(retail, current)
+        ]
+        saved_percentage = []
+        for s, r in zip(saved, retail):
+            try:
+                saved_percentage.append(round_decimal(s / r, PRICE_PRECISION))
+            except (ZeroDivisionError, TypeError):  # One value is None
+                saved_percentage.append(0.0)
+        vat_included = []
+        for c, v in zip(current, vat):
+            try:
+                vat_included.append(round_decimal(gross_to_vat(c, v), PRICE_PRECISION))
+            except TypeError:  # One value is None
+                vat_included.append(0.0)
+
+        return {
+            "retail": retail,
+            "retail_net": [round_decimal(gross_to_net(r, v), PRICE_PRECISION) for r, v in zip(retail, vat)],
+            "recommended": recommended,
+            "recommended_net": [round_decimal(gross_to_net(r, v), PRICE_PRECISION) for r, v in zip(recommended, vat)],
+            "saved": saved,
+            "saved_net": [round_decimal(gross_to_net(s, v), PRICE_PRECISION) for s, v in zip(saved, vat)],
+            "saved_percentage": saved_percentage,
+            "current": current,
+            "current_net": [round_decimal(gross_to_net(c, v), PRICE_PRECISION) for c, v in zip(current, vat)],
+            "vat_rate_percentage": vat,
+            "vat_included": vat_included,
+        }
+
+    def __contains__(self, leaf_key: db.Key) -> bool:
+        return leaf_key in self._index
+
+    def __len__(self) -> int:
+        return len(self.retail)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} of {len(self)} leafs>"
+
+    def get_value(self, leaf_key: db.Key, name: str) -> t.Any:
+        """
+        Get a single value of the price of a leaf.
+
+        :param leaf_key: Key of the cart leaf.
+        :param name: Name of the :class:`Price` property.
+        :raises KeyError: If the leaf is not part of this batch.
+        """
+        return self.columns[name][self._index[leaf_key]]
+
+    def get(self, leaf_key: db.Key) -> dict | None:
+        """
+        Get the price dict of a leaf, like :meth:`Price.to_dict`.
+
+        Every call returns a new dict, so the result can be stored
+        in a skeleton without sharing it with other leafs.
+
+        :param leaf_key: Key of the cart leaf.
+        :return: The price dict or ``None`` if the leaf is not part of this batch.
+        """
+        if (idx := self._index.get(leaf_key)) is None:
+            return None
+        values = {name: self.columns[name][idx] for name in PRICE_FIELDS}
+        cart_discounts = ", ".join(self._encode_discount(skel) for skel in self.cart_discounts[idx])
+        return values | utils.json.loads(
+            f'{{"cart_discounts": [{cart_discounts}], '
+            f'"article_discount": {self._encode_discount(self.article_discounts[idx])}}}'
+        )
+
+    def _encode_discount(self, discount_skel: SkeletonInstance | None) -> str:
+        from viur.shop.types import ExtendedCustomJsonEncoder
+        try:
+            return self._discount_json[id(discount_skel)]
+        except KeyError:
+            encoded = json.dumps(discount_skel, cls=ExtendedCustomJsonEncoder)
+            # The skeletons are kept alive by the discount columns, so their ids are stable
+            self._discount_json[id(discount_skel)] = encoded
+            return encoded
+
+    def verify(self, leaf_skels: t.Iterable[SkeletonInstance]) -> list[db.Key]:
+        """
+        Compare the batch with :meth:`Price.to_dict` of every leaf.
+
+        :param leaf_skels: The leafs the batch has been built from.
+        :return: The keys of the leafs with different results.
+        """
+        mismatches = []
+        for leaf_skel in leaf_skels:
+            if leaf_skel["key"] not in self:
+                continue
+            if utils.json.dumps(self.get(leaf_skel["key"])) != utils.json.dumps(Price(leaf_skel).to_dict()):
+                mismatches.append(leaf_skel["key"])
+        return mismatches
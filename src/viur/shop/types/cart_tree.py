@@ -0,0 +1,141 @@
+"""
+In-memory representation of an entire cart tree.
+
+Walking a cart level by level with :meth:`Cart.get_children` costs two
+queries (nodes and leafs) per node.  The :class:`CartTree` loads all nodes
+and leafs of a root node at once -- every entry of a cart carries the root
+node key in its ``parentrepo`` -- and indexes them by their ``parententry``,
+so the computations of totals, VAT and shippings walk the tree without
+touching the datastore again.
+"""
+
+import collections
+import typing as t  # noqa
+
+from viur import toolkit
+from viur.core import db
+from viur.core.skeleton import SkeletonInstance
+from ..globals import SHOP_INSTANCE, SHOP_LOGGER
+
+logger = SHOP_LOGGER.getChild(__name__)
+
+
+class CartTree:
+    """
+    All nodes and leafs of a cart, indexed by their parent node.
+
+    Use :meth:`load` (or rather :meth:`Cart.get_cart_tree` which caches the
+    tree request-local) to create an instance.
+
+    Children are ordered the same way :meth:`Cart.get_children` yields them:
+    first the nodes, then the leafs, each ordered by ``sortindex``.
+    """
+
+    def __init__(
+        self,
+        root_skel: SkeletonInstance,
+        nodes: t.Iterable[SkeletonInstance],
+        leafs: t.Iterable[SkeletonInstance],
+    ):
+        super().__init__()
+        self.root_skel = root_skel
+        self.nodes: dict[db.Key, SkeletonInstance] = {root_skel["key"]: root_skel}
+        self.leafs: dict[db.Key, SkeletonInstance] = {}
+        self._children: dict[db.Key, list[SkeletonInstance]] = collections.defaultdict(list)
+        self._ancestor_discounts: dict[db.Key, list[SkeletonInstance]] = {}
+
+        for skel in sorted(nodes, key=self._sort_key):
+            if skel["key"] == root_skel["key"]:
+                continue
+            self.nodes[skel["key"]] = skel
+            self._children[skel["parententry"]].append(skel)
+
+        for skel in sorted(leafs, key=self._sort_key):
+            self.leafs[skel["key"]] = skel
+            self._children[skel["parententry"]].append(skel)
+
+    @staticmethod
+    def _sort_key(skel: SkeletonInstance) -> float:
+        return skel["sortindex"] or 0
+
+    @property
+    def key(self) -> db.Key:
+        """Key of the root node"""
+        return self.root_skel["key"]
+
+    def __contains__(self, key: db.Key) -> bool:
+        return key in self.nodes or key in self.leafs
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} of {self.key!r} with {len(self.nodes)} nodes and {len(self.leafs)} leafs>"
+
+    def get_node(self, key: db.Key) -> SkeletonInstance | None:
+        """Get a node of this tree (or ``None`` if the key is not a node of this tree)"""
+        return self.nodes.get(key)
+
+    def get_children(self, parent_cart_key: db.Key) -> list[SkeletonInstance]:
+        """Get the direct children (nodes and leafs) of a node"""
+        return list(self._children.get(parent_cart_key, ()))
+
+    def iter_subtree(self, parent_cart_key: db.Key) -> t.Iterator[SkeletonInstance]:
+        """
+        Iterate over all descendants (nodes and leafs) of a node.
+
+        Every node is yielded before its own children (pre-order).
+        """
+        for child in self._children.get(parent_cart_key, ()):
+            yield child
+            if child["key"] in self.nodes:
+                yield from self.iter_subtree(child["key"])
+
+    def iter_leafs(self, parent_cart_key: db.Key) -> t.Iterator[SkeletonInstance]:
+        """Iterate over all leafs below a node (in all levels)"""
+        for child in self.iter_subtree(parent_cart_key):
+            if child["key"] in self.leafs:
+                yield child
+
+    def get_ancestor_discounts(self, node_key: db.Key) -> list[SkeletonInstance]:
+        """
+        Get the discounts of a node and all its ancestors, the closest first.
+
+        Equivalent to :meth:`Cart.get_discount_for_leaf` for a leaf of this
+        node, but without any datastore access and memoized per node.
+        The walk stops at broken links (cycles or nodes outside of this tree).
+
+        :param node_key: Key of the node to start from (itself included).
+        :return: The discount ref-skels of the nodes.
+        """
+        if node_key not in self._ancestor_discounts:
+            discounts = []
+            seen_keys = set()
+            key = node_key
+            while key and key not in seen_keys:
+                seen_keys.add(key)
+                if (node_skel := self.nodes.get(key)) is None:
+                    logger.warning(f"Node {key=} is not part of {self!r}; stopping walk")
+                    break
+                if discount := node_skel["discount"]:
+                    discounts.append(discount["dest"])
+                key = node_skel["parententry"]
+            self._ancestor_discounts[node_key] = discounts
+        return list(self._ancestor_discounts[node_key])
+
+    @classmethod
+    def load(cls, root_key: db.Key) -> t.Self | None:
+        """
+        Load the entire tree of a root node.
+
+        Costs one read for the root node and one query (iterated without the
+        fetch limit) for all nodes and all leafs of the tree.
+
+        :param root_key: Key of the root node.
+        :return: The tree or ``None`` if the root node does not exist (anymore).
+        """
+        cart = SHOP_INSTANCE.get().cart
+        root_skel = cart.viewSkel("node")
+        if not root_skel.read(root_key):
+            logger.warning(f"Root node {root_key=} doesn't exist (anymore)")
+            return None
+        nodes = toolkit.iter_skel(cart.viewSkel("node").all().filter("parentrepo =", root_skel["key"]))
+        leafs = toolkit.iter_skel(cart.viewSkel("leaf").all().filter("parentrepo =", root_skel["key"]))
+        return cls(root_skel, nodes, leafs)
@@ -0,0 +1,201 @@
+"""
+Precompiled index for the automatically applied discounts.
+
+Evaluating a discount with the :class:`DiscountValidator` is expensive: each
+call builds a validator tree with an instance of every registered
+:class:`DiscountConditionScope`.  Doing this for every automatically
+discount and every article of a listing dominates the price computation.
+
+The :class:`AutomaticallyDiscountIndex` compiles the automatically discounts
+once into cheap prefilters for those scopes which depend only on the
+article and the request (article keys, language, country, date window,
+low-price combinability, ...).  A lookup returns only the candidates which
+can possibly match; these still have to be validated completely with
+:meth:`Discount.can_apply`.  The prefilters are necessary conditions of the
+scopes only, so the result of the full validation is never changed.
+"""
+
+import dataclasses
+import heapq
+import typing as t  # noqa
+from datetime import datetime
+
+from viur.core import current, db, utils
+from viur.core.skeleton import SkeletonInstance
+from .dc_scope import (
+    ConditionValidator,
+    ScopeArticle,
+    ScopeCode,
+    ScopeCombinableLowPrice,
+    ScopeCountry,
+    ScopeDateEnd,
+    ScopeDateStart,
+    ScopeLanguage,
+    ScopeMinimumOrderValue,
+)
+from .enums import CodeType, ConditionOperator
+from .exceptions import DispatchError
+from ..globals import SENTINEL, SHOP_INSTANCE, SHOP_LOGGER
+from ..services import HOOK_SERVICE, Hook
+
+logger = SHOP_LOGGER.getChild(__name__)
+
+
+class _LookupContext:
+    """The values of the current request and article the prefilters are checked against"""
+
+    def __init__(self, article_skel: SkeletonInstance):
+        super().__init__()
+        self.article_skel = article_skel
+        self.now = utils.utcNow()
+        self.language = current.language.get()
+        self._country = SENTINEL
+
+    @property
+    def country(self) -> str | None:
+        """The current country, resolved only if any condition needs it (like :class:`ScopeCountry`)"""
+        if self._country is SENTINEL:
+            try:
+                self._country = HOOK_SERVICE.dispatch(Hook.CURRENT_COUNTRY)("article")
+            except DispatchError:
+                self._country = None
+        return self._country
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class _ConditionFilter:
+    """The prefilters of a single condition, ``None`` means not restricted"""
+
+    never: bool = False
+    article_keys: frozenset[db.Key] | None = None
+    languages: frozenset[str] | None = None
+    countries: frozenset[str] | None = None
+    date_start: datetime | None = None
+    date_end: datetime | None = None
+    combinable_low_price: bool | None = None
+    minimum_order_value: float | None = None
+
+    @classmethod
+    def from_skel(cls, condition_skel: SkeletonInstance) -> t.Self:
+        """Compile the prefilters of the scopes which are (still) registered"""
+        scopes = ConditionValidator.scopes
+        values = {}
+        if ScopeCode in scopes and condition_skel["code_type"] == CodeType.UNIVERSAL:
+            values["never"] = True  # automatically discounts are evaluated without a code
+        if ScopeArticle in scopes and condition_skel["scope_article"]:
+            values["article_keys"] = frozenset(article["dest"]["key"] for article in condition_skel["scope_article"])
+        if ScopeLanguage in scopes and condition_skel["scope_language"]:
+            values["languages"] = frozenset(condition_skel["scope_language"])
+        if ScopeCountry in scopes and condition_skel["scope_country"]:
+            values["countries"] = frozenset(condition_skel["scope_country"])
+        if ScopeDateStart in scopes:
+            values["date_start"] = condition_skel["scope_date_start"]
+        if ScopeDateEnd in scopes:
+            values["date_end"] = condition_skel["scope_date_end"]
+        if ScopeCombinableLowPrice in scopes:
+            values["combinable_low_price"] = condition_skel["scope_combinable_low_price"]
+        if ScopeMinimumOrderValue in scopes:
+            values["minimum_order_value"] = condition_skel["scope_minimum_order_value"]
+        return cls(**values)
+
+    def may_match(self, context: _LookupContext) -> bool:
+        if self.never:
+            return False
+        if self.article_keys is not None and context.article_skel["key"] not in self.article_keys:
+            return False
+        if self.languages is not None and context.language not in self.languages:
+            return False
+        if self.date_start is not None and self.date_start > context.now:
+            return False
+        if self.date_end is not None and self.date_end < context.now:
+            return False
+        if (
+            self.combinable_low_price is not None
+            and context.article_skel["shop_is_low_price"] and not self.combinable_low_price
+        ):
+            return False
+        if (
+            self.minimum_order_value is not None
+            and (price := context.article_skel["shop_price_retail"]) is not None
+            and self.minimum_order_value > price
+        ):
+            return False
+        if self.countries is not None and context.country not in self.countries:
+            return False
+        return True
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class _IndexEntry:
+    position: int
+    discount_skel: SkeletonInstance
+    condition_operator: ConditionOperator
+    conditions: tuple[_ConditionFilter, ...]
+
+    def may_match(self, context: _LookupContext) -> bool:
+        if self.condition_operator == ConditionOperator.ALL:
+            return all(condition.may_match(context) for condition in self.conditions)
+        elif self.condition_operator == ConditionOperator.ONE_OF:
+            return any(condition.may_match(context) for condition in self.conditions)
+        return True  # unknown operator, the full validation has to decide
+
+    @property
+    def article_keys(self) -> frozenset[db.Key] | None:
+        """The article keys this discount is restricted to (over all conditions)"""
+        keys = [condition.article_keys for condition in self.conditions if not condition.never]
+        if self.condition_operator == ConditionOperator.ALL:
+            restricted = [article_keys for article_keys in keys if article_keys is not None]
+            return frozenset.intersection(*restricted) if restricted else None
+        elif self.condition_operator == ConditionOperator.ONE_OF:
+            if not keys or any(article_keys is None for article_keys in keys):
+                return None
+            return frozenset.union(*keys)
+        return None
+
+
+class AutomaticallyDiscountIndex:
+    """
+    Index of the automatically discounts, bucketed by the articles they are restricted to.
+
+    The candidates are returned in the order of the source list, so the
+    choice of the best discount doesn't change on equal prices.
+    """
+
+    def __init__(self, discounts: list[SkeletonInstance]):
+        super().__init__()
+        self.discounts = discounts
+        self._by_article_key: dict[db.Key, list[_IndexEntry]] = {}
+        self._unrestricted: list[_IndexEntry] = []
+
+        get_condition_skel = SHOP_INSTANCE.get().discount_condition.get_skel
+        for position, discount_skel in enumerate(discounts):
+            conditions = []
+            for condition in discount_skel["condition"] or []:
+                if condition_skel := get_condition_skel(condition["dest"]["key"]):
+                    conditions.append(_ConditionFilter.from_skel(condition_skel))
+                else:
+                    conditions.append(_ConditionFilter())  # broken relation, the full validation has to decide
+            entry = _IndexEntry(position, discount_skel, discount_skel["condition_operator"], tuple(conditions))
+            if (article_keys := entry.article_keys) is None:
+                self._unrestricted.append(entry)
+            else:
+                for article_key in article_keys:
+                    self._by_article_key.setdefault(article_key, []).append(entry)
+
+        logger.debug(f"Compiled {len(discounts)} automatically discounts: {len(self._unrestricted)} unrestricted, "
+                     f"{len(self._by_article_key)} restricted articles")
+
+    def get_candidates(self, article_skel: SkeletonInstance) -> list[SkeletonInstance]:
+        """
+        Get the discounts which can possibly be applied to the article.
+
+        :param article_skel: The article (or a RefSkel of it) to check.
+        :return: The candidates; still to be validated with :meth:`Discount.can_apply`.
+        """
+        context = _LookupContext(article_skel)
+        entries = heapq.merge(
+            self._by_article_key.get(article_skel["key"], ()),
+            self._unrestricted,
+            key=lambda entry: entry.position,
+        )
+        return [entry.discount_skel for entry in entries if entry.may_match(context)]
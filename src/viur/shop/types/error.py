@@ -5,6 +5,7 @@ in order to produce reasonable API error responses.
 
 import functools
 import string
+import sys
 import traceback
 import types
 import typing as t
@@ -14,12 +15,6 @@ from viur.core import current, errors as core_errors, i18n
 from .response import JsonResponse
 from ..globals import SHOP_LOGGER
 
-try:
-    from unzer import ErrorResponse as UnzerErrorResponse
-except ImportError:  # extra not installed
-    class UnzerErrorResponse(Exception):
-        ...
-
 logger = SHOP_LOGGER.getChild(__name__)
 
 P = t.ParamSpec("P")
@@ -108,7 +103,8 @@ class ErrorResponse:
         *,
         exception: Exception,
     ) -> t.Self:
-        if isinstance(exception, UnzerErrorResponse):
+        # Don't import the SDK for this check, without an import there can't be any of its errors
+        if (unzer := sys.modules.get("unzer")) is not None and isinstance(exception, unzer.ErrorResponse):
             return cls(
                 errors=[
                     Error(
@@ -0,0 +1,124 @@
+"""
+Exact money arithmetic in integer minor units (cents).
+
+By default prices and totals are computed with floats and rounded with
+:func:`toolkit.round_decimal` after every step.  With :data:`EXACT_MONEY`
+enabled, :class:`Price`, the :class:`TotalFactory` of the cart nodes and
+:func:`get_vat_for_node` compute in integer minor units instead: all sums are
+exact and every division (net values, percentages) is rounded exactly once,
+half away from zero (commercial rounding).  The results are still returned
+as floats with :data:`PRICE_PRECISION` digits.
+
+The inputs (prices, discount amounts and percentages, vat rates) are
+stored with two decimal digits, so their conversion with :func:`to_cents`
+and :func:`to_basis_points` is exact.
+"""
+
+import typing as t  # noqa
+
+from viur.core.skeleton import SkeletonInstance
+from .enums import DiscountType
+from ..globals import SHOP_LOGGER
+
+logger = SHOP_LOGGER.getChild(__name__)
+
+PRICE_PRECISION: t.Final[int] = 2
+"""Precision, how many digits are used to round prices"""
+
+MINOR_UNITS: t.Final[int] = 10 ** PRICE_PRECISION
+"""Minor units (cents) per major unit"""
+
+BASIS_POINTS: t.Final[int] = 10_000
+"""Basis points per 1.0 (100 %)"""
+
+
+def div_round(numerator: int, denominator: int) -> int:
+    """Divide two integers, round half away from zero"""
+    if denominator < 0:
+        numerator, denominator = -numerator, -denominator
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def to_cents(value: float | None) -> int | None:
+    """Convert an amount to minor units, ``None`` stays ``None``"""
+    if value is None:
+        return None
+    return round(value * MINOR_UNITS)
+
+
+def from_cents(cents: int | None) -> float | None:
+    """Convert minor units to an amount, ``None`` stays ``None``"""
+    if cents is None:
+        return None
+    return cents / MINOR_UNITS
+
+
+def to_basis_points(fraction: float) -> int:
+    """Convert a fraction (e.g. a vat rate of 0.19) to basis points (1900)"""
+    return round(fraction * BASIS_POINTS)
+
+
+def gross_to_net(gross_cents: int | None, vat_value: float) -> int:
+    """
+    Convert a gross amount to net, like :meth:`Price.gross_to_net`.
+
+    :param gross_cents: Gross amount in minor units.
+    :param vat_value: VAT rate (0.0 - 1.0).
+    :return: Net amount in minor units.
+    :raises ValueError: If VAT value is out of range.
+    """
+    if not (0 <= vat_value <= 1):
+        raise ValueError(f"Invalid vat value: {vat_value}")
+    if not gross_cents:
+        return 0
+    return div_round(gross_cents * BASIS_POINTS, BASIS_POINTS + to_basis_points(vat_value))
+
+
+def gross_to_vat(gross_cents: int | None, vat_value: float) -> int:
+    """
+    Extract the VAT amount from a gross amount, like :meth:`Price.gross_to_vat`.
+
+    The VAT is the difference of gross and net, so net and VAT add up to gross.
+
+    :param gross_cents: Gross amount in minor units.
+    :param vat_value: VAT rate (0.0 - 1.0).
+    :return: VAT amount in minor units.
+    :raises ValueError: If VAT value is out of range.
+    """
+    if not gross_cents:
+        if not (0 <= vat_value <= 1):
+            raise ValueError(f"Invalid vat value: {vat_value}")
+        return 0
+    return gross_cents - gross_to_net(gross_cents, vat_value)
+
+
+def ratio(numerator_cents: int, denominator_cents: int) -> float:
+    """
+    Get the ratio of two amounts, rounded to :data:`PRICE_PRECISION` digits.
+
+    :raises ZeroDivisionError: If the denominator is zero.
+    """
+    return div_round(numerator_cents * MINOR_UNITS, denominator_cents) / MINOR_UNITS
+
+
+def apply_discount(discount_skel: SkeletonInstance, price_cents: int) -> int:
+    """
+    Apply a discount to a price, like :meth:`Price.apply_discount`.
+
+    :param discount_skel: Discount skeleton to apply.
+    :param price_cents: Price in minor units.
+    :return: New price in minor units.
+    :raises NotImplementedError: If the discount type is not supported.
+    """
+    if discount_skel["discount_type"] == DiscountType.FREE_ARTICLE:
+        return 0
+    elif discount_skel["discount_type"] == DiscountType.ABSOLUTE:
+        return price_cents - to_cents(discount_skel["absolute"])
+    elif discount_skel["discount_type"] == DiscountType.PERCENTAGE:
+        # percentage is stored in percent, to_cents() gives hundredths of a percent
+        return price_cents - div_round(price_cents * to_cents(discount_skel["percentage"]), 100 * MINOR_UNITS)
+    logger.info(f"NotSupported discount: {discount_skel=}")
+    raise NotImplementedError
@@ -22,9 +22,11 @@ import typing as t  # noqa
 from viur import toolkit
 from viur.core import conf, current, db, utils
 from viur.core.skeleton import SkeletonInstance
+from . import money
 from .enums import ApplicationDomain, ConditionOperator, DiscountType
 from .exceptions import InvalidStateError
-from ..globals import SHOP_INSTANCE, SHOP_LOGGER
+from .money import PRICE_PRECISION
+from ..globals import EXACT_MONEY, SHOP_INSTANCE, SHOP_LOGGER
 from ..types import ConfigurationError, DiscountValidationContext
 
 if t.TYPE_CHECKING:
@@ -62,9 +64,7 @@ else:
 
 # TODO: Use decimal package instead of floats?
 #       -> decimal mode in NumericBone?
-
-PRICE_PRECISION: t.Final[int] = 2
-"""Precision, how many digits are used to round prices"""
+#       For now there's the opt-in EXACT_MONEY mode, computing in integer cents (see .money)
 
 
 class Price:
@@ -103,22 +103,13 @@ class Price:
             self.cart_leaf = src_object
             self.article_skel = toolkit.without_render_preparation(src_object.article_skel_full)
             try:
-                self.cart_discounts = shop.cart.get_discount_for_leaf(src_object)
+                # Full skeletons, resolved once per cart and request; dangling
+                # relations (the discount entity has been deleted meanwhile) are
+                # dropped, they would crash the discount evaluation later.
+                self.cart_discounts = shop.cart.get_discount_skels_for_leaf(src_object)
             except Exception as exc:  # FIXME: some entities are broken?
                 logger.exception(exc)
                 self.cart_discounts = []
-            # Resolve the ref-skels to full skeletons and drop dangling
-            # relations (the discount entity has been deleted meanwhile,
-            # e.g. with RelationalConsistency.Ignore); an unloadable skel
-            # has no key and would crash the discount evaluation later.
-            cart_discounts = []
-            for ref_skel in self.cart_discounts:
-                full_skel = toolkit.get_full_skel_from_ref_skel(ref_skel)
-                if not full_skel["key"]:
-                    logger.warning(f'Ignoring dangling discount relation {ref_skel["key"]!r}')
-                    continue
-                cart_discounts.append(full_skel)
-            self.cart_discounts = cart_discounts
         elif is_skeletoninstance_of(src_object, shop.article_skel):
             self.is_in_cart = False
             self.article_skel = toolkit.without_render_preparation(src_object)
@@ -152,6 +143,8 @@ class Price:
 
         :return: Retail price without VAT.
         """
+        if EXACT_MONEY.get():
+            return money.from_cents(money.gross_to_net(money.to_cents(self.retail), self.vat_rate_percentage))
         return toolkit.round_decimal(self.gross_to_net(self.retail, self.vat_rate_percentage), PRICE_PRECISION)
 
     @property
@@ -170,6 +163,8 @@ class Price:
 
         :return: Net recommended price.
         """
+        if EXACT_MONEY.get():
+            return money.from_cents(money.gross_to_net(money.to_cents(self.recommended), self.vat_rate_percentage))
         return toolkit.round_decimal(self.gross_to_net(self.recommended, self.vat_rate_percentage), PRICE_PRECISION)
 
     @property
@@ -181,6 +176,8 @@ class Price:
         """
         if self.retail is None or self.current is None:
             return 0
+        if EXACT_MONEY.get():
+            return money.from_cents(money.to_cents(self.retail) - money.to_cents(self.current))
         return toolkit.round_decimal(self.retail - self.current, PRICE_PRECISION)
 
     @property
@@ -190,6 +187,8 @@ class Price:
 
         :return: Net savings amount.
         """
+        if EXACT_MONEY.get():
+            return money.from_cents(money.gross_to_net(money.to_cents(self.saved), self.vat_rate_percentage))
         return toolkit.round_decimal(self.gross_to_net(self.saved, self.vat_rate_percentage), PRICE_PRECISION)
 
     @property
@@ -200,6 +199,8 @@ class Price:
         :return: Savings percentage (0.0 - 1.0).
         """
         try:
+            if EXACT_MONEY.get():
+                return money.ratio(money.to_cents(self.saved), money.to_cents(self.retail))
             return toolkit.round_decimal(self.saved / self.retail, PRICE_PRECISION)
         except (ZeroDivisionError, TypeError):  # One value is None
             return 0.0
@@ -214,6 +215,8 @@ class Price:
         """
         if (not self.is_in_cart or not self.cart_discounts) and self.article_discount:
             # only the article_discount is applicable
+            if EXACT_MONEY.get():
+                return money.from_cents(money.apply_discount(self.article_discount, money.to_cents(self.retail)))
             return toolkit.round_decimal(self.apply_discount(self.article_discount, self.retail), PRICE_PRECISION)
         if self.is_in_cart and self.cart_discounts:
             # TODO: if self.article_discount:
@@ -228,21 +231,34 @@ class Price:
 
         :return: Current price without VAT.
         """
+        if EXACT_MONEY.get():
+            return money.from_cents(money.gross_to_net(money.to_cents(self.current), self.vat_rate_percentage))
         return toolkit.round_decimal(self.gross_to_net(self.current, self.vat_rate_percentage), PRICE_PRECISION)
 
     def shop_current_discount(self, article_skel: SkeletonInstance) -> None | tuple[float, "SkeletonInstance"]:
         """
         Find the best automatic (permanent) discount currently available for the article.
 
+        :param article_skel: The article skeleton to check.
+        :return: Tuple of (discounted price, discount skeleton) or None if no discounts apply.
+        """
+        return self.get_best_article_discount(article_skel)
+
+    @staticmethod
+    def get_best_article_discount(article_skel: SkeletonInstance) -> None | tuple[float, "SkeletonInstance"]:
+        """
+        Find the best automatic (permanent) discount currently available for an article.
+
         :param article_skel: The article skeleton to check.
         :return: Tuple of (discounted price, discount skeleton) or None if no discounts apply.
         """
         best_discount = None
-        article_price = self.retail or 0.0  # FIXME(discuss): how to handle None prices?
+        article_price = article_skel["shop_price_retail"] or 0.0  # FIXME(discuss): how to handle None prices?
         if not article_price:
             return None
         discount_module: "Discount" = SHOP_INSTANCE.get().discount
-        for skel in SHOP_INSTANCE.get().discount.current_automatically_discounts:
+        # Validate only the discounts which can possibly match this article
+        for skel in discount_module.automatically_discount_index.get_candidates(article_skel):
             applicable, dv = discount_module.can_apply(
                 skel, article_skel=article_skel,
                 context=DiscountValidationContext.AUTOMATICALLY_LIVE
@@ -251,7 +267,7 @@ class Price:
             if not applicable:
                 logger.debug(f'{skel["name"]} is NOT applicable')
                 continue
-            price = self.apply_discount(skel, article_price)
+            price = Price.apply_discount(skel, article_price)
             if best_discount is None or price < best_discount[0]:
                 best_discount = price, skel
         return best_discount
@@ -263,10 +279,41 @@ class Price:
         :return: Tuple of (best price, list of discount skeletons applied).
         """
         # TODO: consider self.article_discount
-        all_permutations = [[d] for d in self.cart_discounts]
+        all_permutations = self.get_discount_permutations(self.cart_discounts)
+        if exact := EXACT_MONEY.get():
+            retail, apply_discount = money.to_cents(self.retail), money.apply_discount
+        else:
+            retail, apply_discount = self.retail, self.apply_discount
+        best_price = retail
+        best_discounts = None
+        for permutation in all_permutations:
+            price = retail  # start always from the retail price
+            for discount in permutation:
+                # only add if ApplicationDomain.ARTICLE
+                if self.is_article_discount(discount):
+                    price = apply_discount(discount, price)
+            if price < best_price:  # Is this discount better?
+                best_price = price
+                best_discounts = permutation
+
+        if exact:
+            best_price = money.from_cents(best_price)
+        return best_price, best_discounts
+
+    @staticmethod
+    def get_discount_permutations(cart_discounts: list[SkeletonInstance]) -> list[list[SkeletonInstance]]:
+        """
+        Get the combinations of cart discounts which are tried by :meth:`choose_best_discount_set`.
+
+        Each discount alone and all combinable discounts together.
+
+        :param cart_discounts: The discount skeletons of the cart.
+        :return: List of the discount combinations.
+        """
+        all_permutations = [[d] for d in cart_discounts]
         combinables = []
         """ALl discounts which are combineable together"""
-        for discount in self.cart_discounts:
+        for discount in cart_discounts:
             # Collect all combineable discounts as one permutation
             # logger.debug(f"{discount=}")
             if discount["condition_operator"] == ConditionOperator.ALL \
@@ -283,22 +330,15 @@ class Price:
                 logger.info(f"Not suitable for combinables")
                 continue
         all_permutations.append(combinables)
-        best_price = self.retail
-        best_discounts = None
-        for permutation in all_permutations:
-            price = self.retail  # start always from the retail price
-            for discount in permutation:
-                # only add if ApplicationDomain.ARTICLE
-                if any(
-                    condition["dest"]["application_domain"] == ApplicationDomain.ARTICLE
-                    for condition in discount["condition"]
-                ):
-                    price = self.apply_discount(discount, price)
-            if price < best_price:  # Is this discount better?
-                best_price = price
-                best_discounts = permutation
+        return all_permutations
 
-        return best_price, best_discounts
+    @staticmethod
+    def is_article_discount(discount_skel: SkeletonInstance) -> bool:
+        """Is the discount applied on the article price (one of its conditions has ``ApplicationDomain.ARTICLE``)?"""
+        return any(
+            condition["dest"]["application_domain"] == ApplicationDomain.ARTICLE
+            for condition in discount_skel["condition"]
+        )
 
     # @property
     @functools.cached_property
@@ -313,13 +353,27 @@ class Price:
         except (KeyError, TypeError):
             country = None
         # logger.debug(f"Using country: {country}")
+        # FIXME: self.article_skel has here sometimes renderPreparation set,
+        #        but toolkit.without_render_preparation is already called in __init__
+        #        What's going on here?
+        return self.get_vat_rate_percentage(
+            country,
+            toolkit.without_render_preparation(self.article_skel)["shop_vat_rate_category"],
+        )
+
+    @staticmethod
+    def get_vat_rate_percentage(country: str | None, category: t.Any) -> float:
+        """
+        Get the VAT rate of a vat rate category in a country as a float (e.g. 0.19 for 19 %).
+
+        :param country: The country code, ``None`` for the default country.
+        :param category: The vat rate category of the article.
+        :return: VAT rate as float between 0.0 and 1.0.
+        """
         try:
-            # FIXME: self.article_skel has here sometimes renderPreparation set,
-            #        but toolkit.without_render_preparation is already called in __init__
-            #        What's going on here?
             vat_rate = SHOP_INSTANCE.get().vat_rate.get_vat_rate_for_country(
                 country=country,
-                category=toolkit.without_render_preparation(self.article_skel)["shop_vat_rate_category"],
+                category=category,
             )
         except (ConfigurationError, ValueError) as e:  # TODO(discussion): Or re-raise or implement fallback?
             # ValueError: e.g. an invalid country code from a dangling shipping_address relation
@@ -335,6 +389,8 @@ class Price:
         :return: Included VAT value.
         """
         try:
+            if EXACT_MONEY.get():
+                return money.from_cents(money.gross_to_vat(money.to_cents(self.current), self.vat_rate_percentage))
             return toolkit.round_decimal(self.gross_to_vat(self.current, self.vat_rate_percentage), PRICE_PRECISION)
         except TypeError:  # One value is None
             return 0.0
@@ -48,6 +48,10 @@ class JsonResponse(t.Generic[T]):
         # logger.debug(f"Called __str__ on JsonResponse")
         current.request.get().response.status_code = self.status_code
         current.request.get().response.headers["Content-Type"] = self.content_type
+        return self.dumps()
+
+    def dumps(self) -> str:
+        """Render the data to the JSON string of the response body"""
         return json.dumps(
             self.json_data,
             sort_keys=self.json_sort,
@@ -56,6 +60,15 @@ class JsonResponse(t.Generic[T]):
         )
 
 
+class RenderedJsonResponse(JsonResponse[str]):
+    """A response of already rendered JSON (see :meth:`JsonResponse.dumps`), served as it is"""
+
+    __slots__ = ()
+
+    def dumps(self) -> str:
+        return self.json_data
+
+
 def make_json_dumpable(value):  # TODO: better solution
     return json.loads(json.dumps(
         value,
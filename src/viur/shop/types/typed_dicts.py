@@ -1,5 +1,8 @@
 import typing as t
 
+from viur.core import db
+from .enums import QuantityMode
+
 
 class PaymentTransactionSpecific(t.TypedDict):
     # must be set in payment provider
@@ -13,3 +16,11 @@ class PaymentTransaction(PaymentTransactionSpecific):
     uuid: str
     client_ip: str
     user_agent: str
+
+
+class ArticleOperation(t.TypedDict):
+    """One operation of :meth:`Cart.articles_bulk_update`"""
+    article_key: db.Key
+    parent_cart_key: db.Key
+    quantity: int
+    quantity_mode: t.NotRequired[QuantityMode]  # default: QuantityMode.REPLACE